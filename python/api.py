@@ -23,6 +23,7 @@ import sqlite3
 import shutil
 import threading
 import time
+from functools import lru_cache
 from mutagen.mp3 import MP3
 from mutagen.id3 import ID3
 from mutagen.id3._frames import APIC, TIT2, TPE1, TALB, TDRC
@@ -31,7 +32,7 @@ from PIL import Image
 import io
 import platform
 import psutil
-from download_queue_manager import download_queue_manager, DownloadTask, DownloadPriority, DownloadStatus
+from download_queue_manager import get_download_queue_manager, DownloadTask, DownloadPriority, DownloadStatus
 from automix_api import get_automix_api
 
 #
@@ -146,7 +147,7 @@ if not apiSigningKey:
 db_manager = DatabaseManager()
 
 # Setup download queue manager callbacks
-def setup_download_queue_callbacks():
+def setup_download_queue_callbacks(download_queue_manager):
     """Setup callbacks for the download queue manager"""
     
     def progress_callback(task):
@@ -204,8 +205,12 @@ def setup_download_queue_callbacks():
     download_queue_manager.add_completion_callback(completion_callback)
     download_queue_manager.add_error_callback(error_callback)
 
-# Initialize callbacks
-setup_download_queue_callbacks()
+@lru_cache(maxsize=None)
+def download_queue():
+    """Get the shared download queue manager, registering the callbacks on first use."""
+    download_queue_manager = get_download_queue_manager()
+    setup_download_queue_callbacks(download_queue_manager)
+    return download_queue_manager
 
 app = Flask(__name__)
 app.add_url_rule("/graphql/", view_func=view_func)
@@ -246,6 +251,10 @@ def get_request_signing_key():
     except Exception:
         return None
 
+# Prime psutil's CPU counters so the non-blocking reading in the health check
+# has a baseline on the first request
+psutil.cpu_percent(interval=None)
+
 # Health check endpoint for monitoring database and service health
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -253,10 +262,7 @@ def health_check():
     try:
         start_time = time.time()
         
-        # Check database connectivity and get stats
-        db_manager = DatabaseManager()
-        
-        # Get basic database stats
+        # Check database connectivity and get stats on the shared connection
         with db_manager.get_connection() as conn:
             cursor = conn.cursor()
             
@@ -276,8 +282,9 @@ def health_check():
             cursor.execute("SELECT COUNT(*) FROM music_files WHERE status = 'error' AND last_checked > datetime('now', '-1 hour')")
             recent_errors = cursor.fetchone()[0]
         
-        # Get system resources
-        cpu_percent = psutil.cpu_percent(interval=1)
+        # Get system resources; CPU usage is measured since the previous
+        # call instead of blocking the request for a one-second sample
+        cpu_percent = psutil.cpu_percent(interval=None)
         memory = psutil.virtual_memory()
         disk = psutil.disk_usage('/')
         
@@ -319,7 +326,7 @@ def health_check():
             "services": {
                 "database": "healthy",
                 "music_analyzer": "healthy",
-                "download_queue": "healthy" if download_queue_manager.is_running else "stopped"
+                "download_queue": "healthy" if download_queue().is_running else "stopped"
             }
         }
         
@@ -346,6 +353,17 @@ def health_check():
 # Global store for active downloads
 active_downloads = {}
 
+# Cancel events of the enhanced downloads currently running, by download id.
+# /youtube/cancel-download sets the event and the yt-dlp progress hook aborts
+# the transfer on its next chunk; the download route removes its entry when
+# it returns, so ids never outlive their download.
+running_downloads = {}
+
+# Key/BPM analysis after a download is CPU-bound and mostly holds the GIL;
+# cap how many downloads analyze at once so the rest keep their network
+# transfers moving instead of queuing behind librosa
+analysis_slots = threading.BoundedSemaphore(2)
+
 # WebSocket event handlers with robust error handling
 @socketio.on('connect')
 def handle_connect():
@@ -1123,9 +1141,9 @@ def upload_and_analyze():
             else:
                 # Check for duplicate content by hash
                 file_hash = db_manager.calculate_file_hash(permanent_path)
-                duplicate = db_manager.find_duplicate_by_hash(file_hash)
+                duplicate = db_manager.find_duplicate_by_hash(file_hash, exclude_path=permanent_path)
                 
-                if duplicate and duplicate['file_path'] != permanent_path:
+                if duplicate:
                     # Found duplicate content - copy analysis from existing file
                     print(f"🔄 Found duplicate content - copying analysis from existing file")
                     print(f"📊 Duplicate metadata: Key={duplicate.get('camelot_key')}, BPM={duplicate.get('bpm')}, Energy={duplicate.get('energy_level')}")
@@ -2274,6 +2292,9 @@ def download_with_ytdlp(url, output_path, title, artist):
 def download_with_ytdlp_enhanced(url, output_path, title, artist, download_id):
     """Enhanced download using yt-dlp with real-time progress and metadata extraction"""
     try:
+        # Set by /youtube/cancel-download while this download is running
+        cancel_event = running_downloads.get(download_id)
+        
         # Emit initial progress
         emit_progress(download_id, {
             'stage': 'initializing',
@@ -2281,12 +2302,26 @@ def download_with_ytdlp_enhanced(url, output_path, title, artist, download_id):
             'message': 'Initializing download...'
         })
         
+        # yt-dlp calls the hook for every chunk it writes; forward at most one
+        # 'downloading' update per 200ms so fast connections don't flood the
+        # socket and log. The last chunk and the finished/error states always
+        # go through.
+        last_emit = 0.0
+        
         def progress_hook(d):
+            nonlocal last_emit
+            if cancel_event is not None and cancel_event.is_set():
+                raise yt_dlp.utils.DownloadCancelled('Download cancelled by user')
             if d['status'] == 'downloading':
                 total_bytes = d.get('total_bytes') or d.get('total_bytes_estimate', 0)
                 downloaded_bytes = d.get('downloaded_bytes', 0)
                 speed = d.get('speed', 0)
                 
+                now = time.monotonic()
+                if now - last_emit < 0.2 and (total_bytes <= 0 or downloaded_bytes < total_bytes):
+                    return
+                last_emit = now
+                
                 if total_bytes > 0:
                     # Enhanced progress calculation with more granular updates
                     progress = min(int((downloaded_bytes / total_bytes) * 90), 90)  # Cap at 90% for download
@@ -2424,6 +2459,9 @@ def download_with_ytdlp_enhanced(url, output_path, title, artist, download_id):
             
             try:
                 ydl.download([url])
+            except yt_dlp.utils.DownloadCancelled:
+                print(f"🚫 Download {download_id} cancelled")
+                return False, metadata, None
             except Exception as download_exception:
                 print(f"❌ yt-dlp download exception: {str(download_exception)}")
                 emit_progress(download_id, {
@@ -2932,7 +2970,8 @@ def youtube_download():
         # Analyze the downloaded file
         print(f"🔍 Analyzing downloaded file...")
         try:
-            analysis_result = analyze_music_file(final_path)
+            with analysis_slots:
+                analysis_result = analyze_music_file(final_path)
             
             # Verify actual audio quality
             actual_bitrate = verify_audio_quality(final_path)
@@ -3061,6 +3100,7 @@ def youtube_download_enhanced():
     if signing_key != apiSigningKey:
         return jsonify({"error": "invalid signature"}), 401
     
+    cancel_event = None
     try:
         url = request_json.get('url')
         title = request_json.get('title', 'Unknown Title')
@@ -3090,6 +3130,10 @@ def youtube_download_enhanced():
         print(f"🔗 URL: {url}")
         print(f"🆔 Download ID: {download_id}")
         
+        # Register the run so /youtube/cancel-download can stop it
+        cancel_event = threading.Event()
+        running_downloads[download_id] = cancel_event
+        
         # Emit initial progress
         emit_progress(download_id, {
             'stage': 'initializing',
@@ -3121,6 +3165,13 @@ def youtube_download_enhanced():
             print(f"🔗 URL being processed: {url}")
             success, metadata, actual_temp_path = download_with_ytdlp_enhanced(url, temp_path, title, artist, download_id)
             
+            if not success and cancel_event.is_set():
+                return jsonify({
+                    "status": "cancelled",
+                    "message": "Download cancelled by user",
+                    "download_id": download_id
+                })
+            
             if not success:
                 print(f"❌ Download failed for URL: {url}")
                 emit_progress(download_id, {
@@ -3207,7 +3258,8 @@ def youtube_download_enhanced():
         
         analysis_result = {}
         try:
-            analysis_result = analyze_music_file(final_path)
+            with analysis_slots:
+                analysis_result = analyze_music_file(final_path)
             print(f"✅ Music analysis completed")
             
             # Emit analysis completion
@@ -3387,6 +3439,10 @@ def youtube_download_enhanced():
             "error": f"Enhanced download failed: {str(e)}",
             "status": "error"
         }), 500
+    finally:
+        # Unregister only our own run; a later request may reuse the id
+        if cancel_event is not None and running_downloads.get(download_id) is cancel_event:
+            del running_downloads[download_id]
 
 @app.route('/youtube/download-queued', methods=['POST'])
 def youtube_download_queued():
@@ -3447,7 +3503,12 @@ def youtube_download_queued():
         )
         
         # Add to queue
-        task_id = download_queue_manager.add_download(task)
+        task_id = download_queue().add_download(task)
+        if task_id is None:
+            return jsonify({
+                "error": f"A download with ID {download_id} is already queued",
+                "status": "error"
+            }), 409
         
         print(f"🚀 Added download to queue: {title} by {artist} (Priority: {priority})")
         print(f"📁 Download path: {download_path}")
@@ -3455,7 +3516,7 @@ def youtube_download_queued():
         print(f"🆔 Download ID: {task_id}")
         
         # Get queue stats
-        stats = download_queue_manager.get_queue_stats()
+        stats = download_queue().get_queue_stats()
         
         return jsonify({
             "status": "queued",
@@ -3482,8 +3543,8 @@ def get_queue_status():
         return jsonify({"error": "invalid signature"}), 401
     
     try:
-        stats = download_queue_manager.get_queue_stats()
-        all_downloads = download_queue_manager.get_all_downloads()
+        stats = download_queue().get_queue_stats()
+        all_downloads = download_queue().get_all_downloads()
         
         # Convert downloads to serializable format
         downloads_list = []
@@ -3507,7 +3568,7 @@ def get_queue_status():
                 'retry_count': task.retry_count,
                 'can_cancel': task.can_cancel,
                 'can_retry': task.can_retry,
-                'created_at': task.created_at
+                'created_at': task.created_wall
             })
         
         return jsonify({
@@ -3537,7 +3598,7 @@ def cancel_queued_download():
         if not download_id:
             return jsonify({"error": "No download ID provided"}), 400
         
-        success = download_queue_manager.cancel_download(download_id)
+        success = download_queue().cancel_download(download_id)
         
         if success:
             return jsonify({
@@ -3571,7 +3632,7 @@ def retry_queued_download():
         if not download_id:
             return jsonify({"error": "No download ID provided"}), 400
         
-        success = download_queue_manager.retry_download(download_id)
+        success = download_queue().retry_download(download_id)
         
         if success:
             return jsonify({
@@ -3604,14 +3665,14 @@ def clear_queue():
         clear_type = request_json.get('type', 'completed')  # 'completed', 'failed', or 'all'
         
         if clear_type == 'completed':
-            download_queue_manager.clear_completed_downloads()
+            download_queue().clear_completed_downloads()
             message = "Cleared completed downloads"
         elif clear_type == 'failed':
-            download_queue_manager.clear_failed_downloads()
+            download_queue().clear_failed_downloads()
             message = "Cleared failed downloads"
         elif clear_type == 'all':
-            download_queue_manager.clear_completed_downloads()
-            download_queue_manager.clear_failed_downloads()
+            download_queue().clear_completed_downloads()
+            download_queue().clear_failed_downloads()
             message = "Cleared all completed and failed downloads"
         else:
             return jsonify({"error": "Invalid clear type. Use 'completed', 'failed', or 'all'"}), 400
@@ -3644,7 +3705,7 @@ def update_queue_settings():
             if not isinstance(max_concurrent, int) or max_concurrent < 1 or max_concurrent > 10:
                 return jsonify({"error": "max_concurrent_downloads must be an integer between 1 and 10"}), 400
             
-            download_queue_manager.update_max_concurrent_downloads(max_concurrent)
+            download_queue().update_max_concurrent_downloads(max_concurrent)
             
             return jsonify({
                 "status": "success",
@@ -3678,6 +3739,13 @@ def youtube_cancel_download():
         
         print(f"🚫 Cancelling download: {download_id}")
         
+        # Stop the transfer if it is still running: the yt-dlp progress hook
+        # aborts on its next chunk, and a queued download is skipped
+        cancel_event = running_downloads.get(download_id)
+        if cancel_event is not None:
+            cancel_event.set()
+        download_queue().cancel_download(download_id)
+        
         # Emit cancellation progress
         emit_progress(download_id, {
             'stage': 'cancelled',
@@ -4251,7 +4319,7 @@ def serve_waveform(filename):
             # Try to find the file in the database first
             try:
                 # Query database for file with matching filename
-                db_files = db_manager.get_all_music_files()
+                db_files = db_manager.get_all_music_files(fields=('filename', 'file_path'))
                 for db_file in db_files:
                     if db_file['filename'] == decoded_filename:
                         db_file_path = db_file['file_path']
@@ -4321,7 +4389,7 @@ def serve_audio(filename):
             path = uploaded_files.get(decoded_filename)
             if not path or not os.path.exists(path):
                 try:
-                    db_files = db_manager.get_all_music_files()
+                    db_files = db_manager.get_all_music_files(fields=('filename', 'file_path'))
                     for db_file in db_files:
                         if db_file['filename'] == decoded_filename:
                             db_file_path = db_file['file_path']
@@ -4904,13 +4972,15 @@ def create_playlist():
             return jsonify({"error": "Failed to create playlist"}), 500
         
         # Add songs to playlist if provided
+        song_ids = []
         for song in songs:
             if isinstance(song, dict) and 'id' in song:
                 # Song object with id
-                db_manager.add_song_to_playlist(playlist_id, int(song['id']))
+                song_ids.append(int(song['id']))
             elif isinstance(song, (int, str)):
                 # Just song ID
-                db_manager.add_song_to_playlist(playlist_id, int(song))
+                song_ids.append(int(song))
+        db_manager.add_songs_to_playlist(playlist_id, song_ids)
         
         # Get the created playlist with songs
         playlist = db_manager.get_playlist(playlist_id)
@@ -0,0 +1,6 @@
+"""
+Constants shared between the analyzer, the tagger and the demo scripts.
+"""
+
+# Camelot key -> ID3 track number (the key's position on the wheel, 1-12)
+CAMELOT_TRACK_NUMBERS = {f"{number}{mode}": number for number in range(1, 13) for mode in ("A", "B")}
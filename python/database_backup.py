@@ -298,7 +298,9 @@ class DatabaseBackupManager:
         def run_scheduler():
             while True:
                 schedule.run_pending()
-                time.sleep(60)  # Check every minute
+                # Sleep until the next job is due rather than waking every minute
+                idle_seconds = schedule.idle_seconds()
+                time.sleep(60 if idle_seconds is None else max(idle_seconds, 0))
         
         scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)
         scheduler_thread.start()
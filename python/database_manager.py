@@ -1,17 +1,318 @@
 import sqlite3
 import os
 import json
-import sqlite3
-from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import lru_cache
+from itertools import repeat
+from typing import Iterator, List, Dict, Optional, Sequence, Tuple
 import logging
 
+logger = logging.getLogger(__name__)
+
+# UPDATE ... RETURNING needs SQLite 3.35+; older libraries (e.g. the one
+# bundled with the Python 3.7 environment) re-select the row instead
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35)
+
+# Try to import blake3 for SIMD-accelerated file content hashing
+try:
+    from blake3 import blake3
+    BLAKE3_AVAILABLE = True
+except ImportError:
+    BLAKE3_AVAILABLE = False
+
+# Hex length of calculate_file_hash digests; stored hashes of another length
+# were made with the other algorithm and are recomputed on the next update
+FILE_HASH_HEX_LENGTH = 64 if BLAKE3_AVAILABLE else 32
+
+# Try to import orjson for fast JSON encoding of metadata blobs
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+def _json_dumps(value) -> str:
+    """Serialize value to a JSON string, using orjson's C encoder when installed."""
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(value).decode()
+        except TypeError:
+            # orjson rejects some inputs json accepts (e.g. non-str keys)
+            pass
+    # Same compact, UTF-8 output as orjson so stored text doesn't depend on
+    # which encoder wrote it
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+
+def _json_loads(text: str):
+    """Parse a JSON string, using orjson's decoder when installed."""
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            # json.dumps may have written NaN/Infinity, which orjson rejects
+            pass
+    return json.loads(text)
+
+@lru_cache(maxsize=4096)
+def _track_id_impl(file_path: str, file_size: int, file_mtime: float, filename: str) -> str:
+    """Build a track ID; size and mtime are part of the cache key so edits invalidate it."""
+    # Create a unique hash based on file path, size, and modification time.
+    # Track IDs are stored and matched against existing rows, so this must be
+    # the same function everywhere: always MD5, whatever packages are installed.
+    unique_bytes = f"{file_path}:{file_size}:{file_mtime}".encode()
+    track_hash = hashlib.md5(unique_bytes).hexdigest()[:12]
+    
+    # Create a readable track ID
+    clean_filename = "".join(c for c in filename if c.isalnum() or c in (' ', '-', '_')).strip()
+    clean_filename = clean_filename[:20]  # Limit length
+    
+    return f"{clean_filename}_{track_hash}"
+
+# Column order of _UPSERT_MUSIC_SQL, split into runs that are plain
+# file_data / id3 lookups so _music_file_params can build them with map()
+_ANALYSIS_FIELDS = ('key', 'scale', 'key_name', 'camelot_key', 'bpm',
+                    'energy_level', 'duration', 'analysis_date')
+_ANALYSIS_DEFAULTS = ('', '', '', '', 0.0, 0.0, 0.0, None)
+_ID3_FIELDS = ('title', 'artist', 'album', 'albumartist', 'date', 'year',
+               'genre', 'composer', 'tracknumber', 'discnumber', 'comment',
+               'initialkey', 'bpm', 'website', 'isrc', 'language',
+               'organization', 'copyright', 'encodedby')
+_ID3_DEFAULTS = ('',) * len(_ID3_FIELDS)
+
+# Analysis fields callers actually read from a looked-up track, used instead
+# of SELECT * so the cover art and metadata blobs are not decoded
+_MUSIC_FILE_COLS = ('id, file_path, filename, file_size, file_hash, track_id, status, '
+                    'key_signature, scale, key_name, camelot_key, bpm, energy_level, duration, '
+                    'analysis_date, analysis_status, id3_tags_written, prevent_reanalysis, cue_points')
+
+# Columns should_skip_analysis bases its decision on
+_SKIP_ANALYSIS_COLUMNS = ('id, filename, analysis_status, id3_tags_written, '
+                          'prevent_reanalysis, analysis_attempts, last_analysis_attempt, '
+                          'key_signature, camelot_key, bpm, energy_level, duration')
+
+# verify_file_locations stats fewer paths than this without a thread pool
+_MIN_PARALLEL_STATS = 8
+
+# Rows per page read by the iter_* methods, one lock hold each
+_ITER_CHUNK_SIZE = 500
+
+# Hot per-track lookups, prepared once and then served from the
+# connection's statement cache (cached_statements=256). Python's sqlite3
+# has no SQLITE_PREPARE_PERSISTENT flag, so fixed SQL text is the hint.
+_SQL_GET_BY_ID = "SELECT * FROM music_files WHERE id = ?"
+
+_SQL_CHECK_METADATA = """
+    SELECT id, filename, key_signature, camelot_key, bpm, energy_level, duration, analysis_date
+    FROM music_files 
+    WHERE file_path = ?
+"""
+
+_SQL_SHOULD_SKIP = f"""
+    SELECT {_SKIP_ANALYSIS_COLUMNS}
+    FROM music_files 
+    WHERE file_path = ?
+"""
+
+# SQL form of the "has key, BPM, energy and duration" test in
+# check_song_has_metadata / _skip_decision; NULL comparisons count as false
+_COMPLETE_METADATA_CONDITION = ("(key_signature != '' OR camelot_key != '') "
+                                "AND bpm > 0 AND energy_level > 0 AND duration > 0")
+
+_SQL_IS_ANALYSIS_SKIPPABLE = f"""
+    SELECT 1 FROM music_files
+    WHERE file_path = ?
+      AND (prevent_reanalysis = 1
+           OR (analysis_status = 'completed' AND id3_tags_written = 1)
+           OR ({_COMPLETE_METADATA_CONDITION}))
+"""
+
+_SQL_HAS_COMPLETE_METADATA = f"""
+    SELECT 1 FROM music_files
+    WHERE file_path = ? AND {_COMPLETE_METADATA_CONDITION}
+"""
+
+# Per-track status updates issued once or more per analyzed file. Kept as
+# constants so every call hands the connection's statement cache the same
+# text and reuses the compiled statement.
+_SQL_MARK_STARTED = """
+    UPDATE music_files 
+    SET analysis_status = 'analyzing', 
+        last_analysis_attempt = CURRENT_TIMESTAMP,
+        analysis_attempts = analysis_attempts + 1,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE file_path = ?
+"""
+
+_SQL_MARK_COMPLETED = """
+    UPDATE music_files 
+    SET analysis_status = 'completed', updated_at = CURRENT_TIMESTAMP
+    WHERE file_path = ?
+"""
+
+_SQL_MARK_COMPLETED_WITH_RESULTS = """
+    UPDATE music_files 
+    SET analysis_status = 'completed',
+        key_signature = ?, camelot_key = ?, bpm = ?, 
+        energy_level = ?, duration = ?, analysis_date = CURRENT_TIMESTAMP,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE file_path = ?
+"""
+
+_SQL_MARK_ID3_WRITTEN = """
+    UPDATE music_files 
+    SET id3_tags_written = 1, updated_at = CURRENT_TIMESTAMP
+    WHERE file_path = ?
+"""
+
+_SQL_MARK_FAILED = """
+    UPDATE music_files 
+    SET analysis_status = 'failed', 
+        error_message = ?, 
+        updated_at = CURRENT_TIMESTAMP
+    WHERE file_path = ?
+"""
+
+_SQL_SET_PREVENT_REANALYSIS = """
+    UPDATE music_files 
+    SET prevent_reanalysis = ?, updated_at = CURRENT_TIMESTAMP
+    WHERE file_path = ?
+"""
+
+_SQL_UPDATE_COVER_ART = """
+    UPDATE music_files 
+    SET cover_art = ?, cover_art_extracted = 1, updated_at = CURRENT_TIMESTAMP
+    WHERE file_path = ?
+"""
+
+# The CASE only reads the (large) cover_art value once
+# cover_art_extracted says there is one worth returning
+_SQL_GET_COVER_ART = """
+    SELECT CASE WHEN cover_art_extracted THEN cover_art END
+    FROM music_files 
+    WHERE file_path = ?
+"""
+
+_SQL_HAS_COVER_ART = "SELECT cover_art_extracted FROM music_files WHERE file_path = ?"
+
+# file_path is NOT NULL, so "IS NOT NULL" matches every row
+_SQL_FIND_DUPLICATE_BY_HASH = f"""
+    SELECT {_MUSIC_FILE_COLS} FROM music_files 
+    WHERE file_hash = ? AND file_hash != '' AND file_path IS NOT ?
+    LIMIT 1
+"""
+
+_SQL_UPDATE_TRACK_ID = """
+    UPDATE music_files 
+    SET track_id = ?, updated_at = ?
+    WHERE id = ?
+"""
+
+_SQL_CREATE_PLAYLIST = """
+    INSERT INTO playlists (name, description, color, is_query_based, query_criteria)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+# The MAX subquery for an unspecified position runs in the same statement
+# off idx_playlist_items_playlist_position
+_SQL_ADD_PLAYLIST_ITEM = """
+    INSERT INTO playlist_items (playlist_id, music_file_id, position)
+    VALUES (?, ?, COALESCE(?, (
+        SELECT COALESCE(MAX(position), 0) + 1
+        FROM playlist_items
+        WHERE playlist_id = ?
+    )))
+"""
+
+_SQL_LAST_PLAYLIST_POSITION = """
+    SELECT COALESCE(MAX(position), 0)
+    FROM playlist_items 
+    WHERE playlist_id = ?
+"""
+
+_SQL_INSERT_PLAYLIST_ITEM = """
+    INSERT INTO playlist_items (playlist_id, music_file_id, position)
+    VALUES (?, ?, ?)
+"""
+
+_SQL_REMOVE_PLAYLIST_ITEM = """
+    DELETE FROM playlist_items 
+    WHERE playlist_id = ? AND music_file_id = ?
+"""
+
 class DatabaseManager:
     """
     Database manager for Mixed In Key application.
     Tracks music file locations, analysis results, and user library data.
     """
     
+    # Upsert used by add_music_file(s), kept as a constant so the connection's
+    # statement cache reuses the compiled form instead of re-parsing each call.
+    # One statement inserts a new path or updates the existing row in place.
+    _UPSERT_MUSIC_SQL = '''
+        INSERT INTO music_files (
+            filename, file_path, file_size, key_signature, scale,
+            key_name, camelot_key, bpm, energy_level, duration,
+            analysis_date, cue_points, status, last_checked,
+            title, artist, album, albumartist, date, year,
+            genre, composer, tracknumber, discnumber, comment,
+            initialkey, bpm_from_tags, website, isrc, language,
+            organization, copyright, encodedby, id3_metadata,
+            analysis_status, id3_tags_written, file_hash, prevent_reanalysis,
+            cover_art, cover_art_extracted, file_mtime
+        ) VALUES (
+            ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,
+            COALESCE(?, CURRENT_TIMESTAMP), ?, ?, CURRENT_TIMESTAMP,
+            ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,
+            ?, ?, ?, ?, ?, ?, ?
+        )
+        ON CONFLICT(file_path) DO UPDATE SET
+            filename = excluded.filename, file_size = excluded.file_size,
+            key_signature = excluded.key_signature, scale = excluded.scale,
+            key_name = excluded.key_name, camelot_key = excluded.camelot_key,
+            bpm = excluded.bpm, energy_level = excluded.energy_level,
+            duration = excluded.duration, analysis_date = excluded.analysis_date,
+            cue_points = excluded.cue_points, status = excluded.status,
+            last_checked = excluded.last_checked, updated_at = CURRENT_TIMESTAMP,
+            title = excluded.title, artist = excluded.artist, album = excluded.album,
+            albumartist = excluded.albumartist, date = excluded.date, year = excluded.year,
+            genre = excluded.genre, composer = excluded.composer,
+            tracknumber = excluded.tracknumber, discnumber = excluded.discnumber,
+            comment = excluded.comment, initialkey = excluded.initialkey,
+            bpm_from_tags = excluded.bpm_from_tags, website = excluded.website,
+            isrc = excluded.isrc, language = excluded.language,
+            organization = excluded.organization, copyright = excluded.copyright,
+            encodedby = excluded.encodedby, id3_metadata = excluded.id3_metadata,
+            analysis_status = excluded.analysis_status, id3_tags_written = excluded.id3_tags_written,
+            file_hash = excluded.file_hash, prevent_reanalysis = excluded.prevent_reanalysis,
+            cover_art = excluded.cover_art, cover_art_extracted = excluded.cover_art_extracted,
+            file_mtime = excluded.file_mtime
+    '''
+    
+    # Stored in PRAGMA user_version once _create_schema has run; bump it
+    # whenever the schema changes so existing databases are migrated
+    SCHEMA_VERSION = 2
+    
+    # executemany cannot return rows, so only single upserts ask for the id
+    _UPSERT_MUSIC_RETURNING_SQL = _UPSERT_MUSIC_SQL + 'RETURNING id'
+    
+    # Frontend field names accepted by update_music_file_metadata, mapped to
+    # their database columns
+    _METADATA_FIELD_MAPPING = {
+        'key': 'key_signature',
+        'scale': 'scale',
+        'key_name': 'key_name',
+        'camelot_key': 'camelot_key',
+        'bpm': 'bpm',
+        'energy_level': 'energy_level',
+        'duration': 'duration',
+        'cue_points': 'cue_points'
+    }
+    
     def __init__(self, db_path: Optional[str] = None):
         """Initialize database manager with SQLite database."""
         if db_path is None:
@@ -22,373 +323,504 @@ class DatabaseManager:
             db_path = os.path.join(app_dir, "music_library.db")
         
         self.db_path = db_path
+        
+        # One long-lived connection shared by all methods; the lock serializes
+        # access since Flask may call in from several request threads
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=256)
+        self._conn.row_factory = sqlite3.Row
+        
+        # Configure connection once for better performance and reliability
+        self._conn.execute("PRAGMA journal_mode=WAL")  # Write-Ahead Logging
+        self._conn.execute("PRAGMA synchronous=NORMAL")  # One fsync per checkpoint, not per commit
+        self._conn.execute("PRAGMA temp_store=MEMORY")  # Store temp tables in memory
+        self._conn.execute("PRAGMA cache_size=-65536")  # 64 MiB page cache
+        self._conn.execute("PRAGMA mmap_size=268435456")  # Memory-map up to 256 MiB for reads
+        self._conn.execute("PRAGMA foreign_keys=ON")  # Enforce playlist_items foreign keys
+        
+        # UPDATE text per edited-field tuple for update_music_file_metadata
+        self._update_sql_cache: Dict[Tuple[str, ...], str] = {}
         self.init_database()
         
+        # Write-through cache of app_settings; this manager is its only writer
+        with self.get_connection() as conn:
+            self._settings = dict(conn.execute('SELECT key, value FROM app_settings').fetchall())
+    
+    @contextmanager
+    def get_connection(self):
+        """Yield the shared connection; commits on success, rolls back on error.
+        
+        Inside batch() the enclosing transaction does the committing instead.
+        """
+        with self._lock:
+            if self._batch_depth:
+                yield self._conn
+            else:
+                with self._conn:
+                    yield self._conn
+    
+    @contextmanager
+    def batch(self):
+        """Run many writes as one transaction, committed (one fsync) on exit.
+        
+        Methods called inside the block skip their own commit; an exception
+        rolls the whole batch back. Other threads wait until it finishes.
+        
+            with db_manager.batch():
+                for path in paths:
+                    db_manager.mark_analysis_started(path)
+        """
+        with self._lock:
+            if self._batch_depth:
+                # Nested batch: the outermost one commits
+                self._batch_depth += 1
+                try:
+                    yield
+                finally:
+                    self._batch_depth -= 1
+                return
+            
+            with self._conn:
+                self._conn.execute('BEGIN IMMEDIATE')
+                self._batch_depth = 1
+                try:
+                    yield
+                finally:
+                    self._batch_depth = 0
+    
+    def _exec(self, sql: str, params: Sequence = ()) -> int:
+        """Run one write statement on the shared connection and commit; returns the rowcount."""
+        with self.get_connection() as conn:
+            return conn.execute(sql, params).rowcount
+        
     def init_database(self):
         """Initialize database tables if they don't exist."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.get_connection() as conn:
             cursor = conn.cursor()
             
-            # Music files table - tracks file locations and analysis
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS music_files (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    filename TEXT NOT NULL,
-                    file_path TEXT NOT NULL UNIQUE,
-                    file_size INTEGER,
-                    file_hash TEXT,
-                    track_id TEXT UNIQUE,  -- Unique track identifier
-                    rating INTEGER DEFAULT 0,
-                    
-                    -- Music analysis data
-                    key_signature TEXT,
-                    scale TEXT,
-                    key_name TEXT,
-                    camelot_key TEXT,
-                    bpm REAL,
-                    energy_level REAL,
-                    duration REAL,
-                    
-                    -- Analysis metadata
-                    analysis_date TEXT,
-                    analysis_version TEXT,
-                    cue_points TEXT,  -- JSON string of cue points array
-                    
-                    -- File status
-                    status TEXT DEFAULT 'found',  -- found, missing, analyzing, error
-                    last_checked TEXT,
-                    error_message TEXT,
-                    
-                    -- Timestamps
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
+            # An up-to-date database skips the CREATE/ALTER statements entirely
+            cursor.execute('PRAGMA user_version')
+            if cursor.fetchone()[0] < self.SCHEMA_VERSION:
+                self._create_schema(cursor)
+                cursor.execute(f'PRAGMA user_version = {self.SCHEMA_VERSION}')
             
-            # Add track_id column if it doesn't exist (for existing databases)
-            try:
-                cursor.execute('ALTER TABLE music_files ADD COLUMN track_id TEXT UNIQUE')
-                print("✅ Added track_id column to existing database")
-            except sqlite3.OperationalError:
-                # Column already exists
-                pass
-            # Add rating column if it doesn't exist (for existing databases)
-            try:
-                cursor.execute('ALTER TABLE music_files ADD COLUMN rating INTEGER DEFAULT 0')
-                print("✅ Added rating column to existing database")
-            except sqlite3.OperationalError:
-                # Column already exists
-                pass
-            
-            # Add ID3 metadata columns if they don't exist (for existing databases)
-            id3_columns = [
-                ('title', 'TEXT'),
-                ('artist', 'TEXT'),
-                ('album', 'TEXT'),
-                ('albumartist', 'TEXT'),
-                ('date', 'TEXT'),
-                ('year', 'TEXT'),
-                ('genre', 'TEXT'),
-                ('composer', 'TEXT'),
-                ('tracknumber', 'TEXT'),
-                ('discnumber', 'TEXT'),
-                ('comment', 'TEXT'),
-                ('initialkey', 'TEXT'),
-                ('bpm_from_tags', 'TEXT'),
-                ('website', 'TEXT'),
-                ('isrc', 'TEXT'),
-                ('language', 'TEXT'),
-                ('organization', 'TEXT'),
-                ('copyright', 'TEXT'),
-                ('encodedby', 'TEXT'),
-                ('id3_metadata', 'TEXT'),  # JSON blob for all metadata
-                # Analysis tracking columns
-                ('analysis_status', 'TEXT DEFAULT "pending"'),  # pending, analyzing, completed, failed
-                ('id3_tags_written', 'BOOLEAN DEFAULT 0'),  # Track if ID3 tags have been written
-                ('last_analysis_attempt', 'TEXT'),  # Timestamp of last analysis attempt
-                ('analysis_attempts', 'INTEGER DEFAULT 0'),  # Number of analysis attempts
-                ('file_hash', 'TEXT'),  # MD5 hash of file content for duplicate detection
-                ('prevent_reanalysis', 'BOOLEAN DEFAULT 0'),  # Flag to prevent re-analysis
-                ('cover_art', 'TEXT'),  # Base64 encoded cover art
-                ('cover_art_extracted', 'BOOLEAN DEFAULT 0')  # Flag to track if cover art has been extracted
-            ]
-            
-            for column_name, column_type in id3_columns:
-                try:
-                    cursor.execute(f'ALTER TABLE music_files ADD COLUMN {column_name} {column_type}')
-                    print(f"✅ Added {column_name} column to existing database")
-                except sqlite3.OperationalError:
-                    # Column already exists
-                    pass
-            
-            # Playlists table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS playlists (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    description TEXT,
-                    color TEXT,
-                    is_query_based BOOLEAN DEFAULT 0,
-                    query_criteria TEXT,  -- JSON string for query criteria
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Add new columns for query-based playlists if they don't exist
-            try:
-                cursor.execute('ALTER TABLE playlists ADD COLUMN is_query_based BOOLEAN DEFAULT 0')
-                print("✅ Added is_query_based column to playlists table")
-            except sqlite3.OperationalError:
-                # Column already exists
-                pass
+            # Remember the schema so callers' column projections can be validated
+            cursor.execute('PRAGMA table_info(music_files)')
+            column_names = [row[1] for row in cursor.fetchall()]
+            self._music_file_columns = frozenset(column_names)
+            self._playlist_song_columns = ', '.join(
+                f'mf.{name}' for name in column_names if name not in ('cover_art', 'id3_metadata')
+            )
+    
+    def _create_schema(self, cursor: sqlite3.Cursor):
+        """Create missing tables, columns and indexes."""
+        # Music files table - tracks file locations and analysis
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS music_files (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                filename TEXT NOT NULL,
+                file_path TEXT NOT NULL UNIQUE,
+                file_size INTEGER,
+                file_hash TEXT,
+                track_id TEXT UNIQUE,  -- Unique track identifier
+                rating INTEGER DEFAULT 0,
+                
+                -- Music analysis data
+                key_signature TEXT,
+                scale TEXT,
+                key_name TEXT,
+                camelot_key TEXT,
+                bpm REAL,
+                energy_level REAL,
+                duration REAL,
+                
+                -- Analysis metadata
+                analysis_date TEXT,
+                analysis_version TEXT,
+                cue_points TEXT,  -- JSON string of cue points array
+                
+                -- File status
+                status TEXT DEFAULT 'found',  -- found, missing, analyzing, error
+                last_checked TEXT,
+                error_message TEXT,
+                
+                -- Timestamps
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Add columns missing from existing databases
+        music_file_columns = [
+            # SQLite cannot add a UNIQUE column; uniqueness comes from an index below
+            ('track_id', 'TEXT'),
+            ('rating', 'INTEGER DEFAULT 0'),
+            # ID3 metadata columns
+            ('title', 'TEXT'),
+            ('artist', 'TEXT'),
+            ('album', 'TEXT'),
+            ('albumartist', 'TEXT'),
+            ('date', 'TEXT'),
+            ('year', 'TEXT'),
+            ('genre', 'TEXT'),
+            ('composer', 'TEXT'),
+            ('tracknumber', 'TEXT'),
+            ('discnumber', 'TEXT'),
+            ('comment', 'TEXT'),
+            ('initialkey', 'TEXT'),
+            ('bpm_from_tags', 'TEXT'),
+            ('website', 'TEXT'),
+            ('isrc', 'TEXT'),
+            ('language', 'TEXT'),
+            ('organization', 'TEXT'),
+            ('copyright', 'TEXT'),
+            ('encodedby', 'TEXT'),
+            ('id3_metadata', 'TEXT'),  # JSON blob for all metadata
+            # Analysis tracking columns
+            ('analysis_status', 'TEXT DEFAULT "pending"'),  # pending, analyzing, completed, failed
+            ('id3_tags_written', 'BOOLEAN DEFAULT 0'),  # Track if ID3 tags have been written
+            ('last_analysis_attempt', 'TEXT'),  # Timestamp of last analysis attempt
+            ('analysis_attempts', 'INTEGER DEFAULT 0'),  # Number of analysis attempts
+            ('file_hash', 'TEXT'),  # BLAKE3 (or MD5) hash of file content for duplicate detection
+            ('prevent_reanalysis', 'BOOLEAN DEFAULT 0'),  # Flag to prevent re-analysis
+            ('cover_art', 'TEXT'),  # Base64 encoded cover art
+            ('cover_art_extracted', 'BOOLEAN DEFAULT 0'),  # Flag to track if cover art has been extracted
+            ('file_mtime', 'REAL')  # File modification time when file_hash was calculated
+        ]
+        
+        added_columns = self._add_missing_columns(cursor, 'music_files', music_file_columns)
+        for column_name in added_columns:
+            logger.info("Added %s column to existing database", column_name)
+        
+        # track_id lookups need an index; databases that gained the column by
+        # ALTER TABLE have none, and older ones may already hold duplicates
+        cursor.execute("""
+            SELECT 1 FROM pragma_index_list('music_files') AS il, pragma_index_info(il.name) AS ii
+            WHERE ii.name = 'track_id'
+        """)
+        if cursor.fetchone() is None:
             try:
-                cursor.execute('ALTER TABLE playlists ADD COLUMN query_criteria TEXT')
-                print("✅ Added query_criteria column to playlists table")
-            except sqlite3.OperationalError:
-                # Column already exists
-                pass
-            
-            # Playlist items table (many-to-many relationship)
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS playlist_items (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    playlist_id INTEGER,
-                    music_file_id INTEGER,
-                    position INTEGER,
-                    added_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (playlist_id) REFERENCES playlists (id) ON DELETE CASCADE,
-                    FOREIGN KEY (music_file_id) REFERENCES music_files (id) ON DELETE CASCADE
-                )
-            ''')
-            
-            # Scan locations table - remember where user has scanned for music
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS scan_locations (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    path TEXT NOT NULL UNIQUE,
-                    name TEXT,
-                    last_scanned TEXT,
-                    files_found INTEGER DEFAULT 0,
-                    is_active BOOLEAN DEFAULT 1,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Application settings table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS app_settings (
-                    key TEXT PRIMARY KEY,
-                    value TEXT,
-                    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Create indexes for better performance
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_music_files_path ON music_files(file_path)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_music_files_camelot ON music_files(camelot_key)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_music_files_status ON music_files(status)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_playlist_items_playlist ON playlist_items(playlist_id)')
-            
-            conn.commit()
-            
+                cursor.execute('CREATE UNIQUE INDEX idx_music_files_track_id ON music_files(track_id)')
+            except sqlite3.IntegrityError:
+                cursor.execute('CREATE INDEX idx_music_files_track_id ON music_files(track_id)')
+        
+        # Playlists table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS playlists (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                description TEXT,
+                color TEXT,
+                is_query_based BOOLEAN DEFAULT 0,
+                query_criteria TEXT,  -- JSON string for query criteria
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Add new columns for query-based playlists if they don't exist
+        playlist_columns = [
+            ('is_query_based', 'BOOLEAN DEFAULT 0'),
+            ('query_criteria', 'TEXT')
+        ]
+        for column_name in self._add_missing_columns(cursor, 'playlists', playlist_columns):
+            logger.info("Added %s column to playlists table", column_name)
+        
+        # Playlist items table (many-to-many relationship)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS playlist_items (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                playlist_id INTEGER,
+                music_file_id INTEGER,
+                position INTEGER,
+                added_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (playlist_id) REFERENCES playlists (id) ON DELETE CASCADE,
+                FOREIGN KEY (music_file_id) REFERENCES music_files (id) ON DELETE CASCADE
+            )
+        ''')
+        
+        # Scan locations table - remember where user has scanned for music
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS scan_locations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                path TEXT NOT NULL UNIQUE,
+                name TEXT,
+                last_scanned TEXT,
+                files_found INTEGER DEFAULT 0,
+                is_active BOOLEAN DEFAULT 1,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Application settings table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS app_settings (
+                key TEXT PRIMARY KEY,
+                value TEXT,
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Create indexes for better performance
+        # file_path is UNIQUE, so its automatic index already serves path lookups
+        cursor.execute('DROP INDEX IF EXISTS idx_music_files_path')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_music_files_camelot ON music_files(camelot_key)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_music_files_status ON music_files(status)')
+        # (playlist_id, position) lets get_playlist_songs read items already in order
+        cursor.execute('DROP INDEX IF EXISTS idx_playlist_items_playlist')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_playlist_items_playlist_position ON playlist_items(playlist_id, position)')
+        # Child-key index so ON DELETE CASCADE from music_files is not a table scan
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_playlist_items_music_file ON playlist_items(music_file_id)')
+        # Covering index so narrow key lookups never touch the wide table rows
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_music_files_camelot_cover ON music_files(camelot_key, status, filename, bpm, id)')
+        # Empty hashes are never looked up, so keep them out of the hash index
+        cursor.execute('DROP INDEX IF EXISTS idx_music_files_hash')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_music_files_hash_nonempty ON music_files(file_hash) WHERE file_hash != ''")
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_music_files_camelot_bpm ON music_files(camelot_key, bpm)')
+        # Partial indexes stay small: only the pending queue and rated tracks
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_music_files_analysis_status ON music_files(analysis_status) WHERE analysis_status IN ('pending', 'analyzing')")
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_music_files_rating ON music_files(rating) WHERE rating > 0')
+
+    
+    def _add_missing_columns(self, cursor: sqlite3.Cursor, table: str,
+                             columns: List[Tuple[str, str]]) -> List[str]:
+        """Add the columns table lacks in a single executescript; returns the added names."""
+        cursor.execute(f'PRAGMA table_info({table})')
+        existing = {row[1] for row in cursor.fetchall()}
+        missing = [(name, column_type) for name, column_type in columns if name not in existing]
+        if missing:
+            cursor.executescript(''.join(
+                f'ALTER TABLE {table} ADD COLUMN {name} {column_type};\n' for name, column_type in missing
+            ))
+        return [name for name, _ in missing]
+    
+    def _projection(self, fields: Optional[Sequence[str]]) -> str:
+        """Build a SELECT column list, validating names against the music_files schema."""
+        if not fields:
+            return '*'
+        unknown = set(fields) - self._music_file_columns
+        if unknown:
+            raise ValueError(f"Unknown music_files columns: {sorted(unknown)}")
+        return ', '.join(fields)
+    
+    def _music_file_params(self, file_data: Dict, file_size: int, file_hash: str,
+                           file_mtime: Optional[float]) -> Tuple:
+        """Build the column values for _UPSERT_MUSIC_SQL, minus file_path.
+
+        Timestamps are left to SQLite's CURRENT_TIMESTAMP instead of being
+        formatted in Python.
+        """
+        get = file_data.get
+        id3_data = get('id3', {})
+        
+        return (
+            (get('filename', ''), file_size)
+            + tuple(map(get, _ANALYSIS_FIELDS, _ANALYSIS_DEFAULTS))
+            + (_json_dumps(get('cue_points', [])), get('status', 'found'))
+            + tuple(map(id3_data.get, _ID3_FIELDS, _ID3_DEFAULTS))
+            + (
+                _json_dumps(id3_data),  # Store complete metadata as JSON
+                # Analysis tracking fields
+                get('analysis_status', 'pending'),
+                get('id3_tags_written', 0),
+                file_hash,
+                get('prevent_reanalysis', 0),
+                get('cover_art', ''),
+                get('cover_art_extracted', 0),
+                file_mtime,
+            )
+        )
+    
+    def _upsert_params(self, file_data: Dict, stored: Optional[sqlite3.Row]) -> Tuple:
+        """Parameters for _UPSERT_MUSIC_SQL.
+        
+        stored is the existing row's (file_size, file_mtime, file_hash), if any.
+        Its hash is reused when size and mtime are unchanged, so rescanning an
+        unchanged library does not re-read every file.
+        """
+        file_path = file_data['file_path']
+        file_size = file_data.get('file_size', 0)
+        try:
+            file_stat = os.stat(file_path)
+        except OSError:
+            file_stat = None
+        
+        if file_stat is None:
+            file_hash = ''
+            file_mtime = None
+        else:
+            file_size = file_size or file_stat.st_size
+            file_mtime = file_stat.st_mtime
+            if file_data.get('file_hash'):
+                # Caller already hashed the content
+                file_hash = file_data['file_hash']
+            elif (stored is not None and stored['file_hash']
+                  and len(stored['file_hash']) == FILE_HASH_HEX_LENGTH
+                  and stored['file_size'] == file_size and stored['file_mtime'] == file_mtime):
+                file_hash = stored['file_hash']
+            else:
+                # Calculate file hash for duplicate detection
+                file_hash = self.calculate_file_hash(file_path)
+        
+        params = self._music_file_params(file_data, file_size, file_hash, file_mtime)
+        return params[:1] + (file_path,) + params[1:]
+    
+    def _get_rows_by_path(self, cursor: sqlite3.Cursor, file_paths: List[str],
+                          columns: str) -> Dict[str, sqlite3.Row]:
+        """Look up columns for many file paths, chunked to stay under SQLite's variable limit."""
+        rows_by_path = {}
+        for start in range(0, len(file_paths), 500):
+            chunk = file_paths[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            cursor.execute(f'SELECT file_path, {columns} FROM music_files WHERE file_path IN ({placeholders})', chunk)
+            rows_by_path.update((row['file_path'], row) for row in cursor.fetchall())
+        return rows_by_path
+    
     def add_music_file(self, file_data: Dict) -> int:
         """Add or update a music file in the database."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.get_connection() as conn:
             cursor = conn.cursor()
-            
-            # Check if file already exists
-            cursor.execute('SELECT id FROM music_files WHERE file_path = ?', (file_data['file_path'],))
-            existing = cursor.fetchone()
-            
-            current_time = datetime.now().isoformat()
-            
-            if existing:
-                # Update existing file
-                file_id = existing[0]
-                # Extract ID3 metadata
-                id3_data = file_data.get('id3', {})
-                
-                # Calculate file hash for duplicate detection if file exists
-                file_hash = self.calculate_file_hash(file_data['file_path']) if os.path.exists(file_data['file_path']) else ''
-                
-                cursor.execute('''
-                    UPDATE music_files SET
-                        filename = ?, file_size = ?, key_signature = ?, scale = ?,
-                        key_name = ?, camelot_key = ?, bpm = ?, energy_level = ?,
-                        duration = ?, analysis_date = ?, cue_points = ?,
-                        status = ?, last_checked = ?, updated_at = ?,
-                        title = ?, artist = ?, album = ?, albumartist = ?, date = ?, year = ?,
-                        genre = ?, composer = ?, tracknumber = ?, discnumber = ?, comment = ?,
-                        initialkey = ?, bpm_from_tags = ?, website = ?, isrc = ?, language = ?,
-                        organization = ?, copyright = ?, encodedby = ?, id3_metadata = ?,
-                        analysis_status = ?, id3_tags_written = ?, file_hash = ?, prevent_reanalysis = ?,
-                        cover_art = ?, cover_art_extracted = ?
-                    WHERE id = ?
-                ''', (
-                    file_data.get('filename', ''),
-                    file_data.get('file_size', 0),
-                    file_data.get('key', ''),
-                    file_data.get('scale', ''),
-                    file_data.get('key_name', ''),
-                    file_data.get('camelot_key', ''),
-                    file_data.get('bpm', 0.0),
-                    file_data.get('energy_level', 0.0),
-                    file_data.get('duration', 0.0),
-                    file_data.get('analysis_date', current_time),
-                    json.dumps(file_data.get('cue_points', [])),
-                    file_data.get('status', 'found'),
-                    current_time,
-                    current_time,
-                    # ID3 metadata fields
-                    id3_data.get('title', ''),
-                    id3_data.get('artist', ''),
-                    id3_data.get('album', ''),
-                    id3_data.get('albumartist', ''),
-                    id3_data.get('date', ''),
-                    id3_data.get('year', ''),
-                    id3_data.get('genre', ''),
-                    id3_data.get('composer', ''),
-                    id3_data.get('tracknumber', ''),
-                    id3_data.get('discnumber', ''),
-                    id3_data.get('comment', ''),
-                    id3_data.get('initialkey', ''),
-                    id3_data.get('bpm', ''),
-                    id3_data.get('website', ''),
-                    id3_data.get('isrc', ''),
-                    id3_data.get('language', ''),
-                    id3_data.get('organization', ''),
-                    id3_data.get('copyright', ''),
-                    id3_data.get('encodedby', ''),
-                    json.dumps(id3_data),  # Store complete metadata as JSON
-                    # Analysis tracking fields
-                    file_data.get('analysis_status', 'pending'),
-                    file_data.get('id3_tags_written', 0),
-                    file_hash,
-                    file_data.get('prevent_reanalysis', 0),
-                    file_data.get('cover_art', ''),
-                    file_data.get('cover_art_extracted', 0),
-                    file_id
-                ))
+            cursor.execute('SELECT file_size, file_mtime, file_hash FROM music_files WHERE file_path = ?',
+                           (file_data['file_path'],))
+            stored = cursor.fetchone()
+            params = self._upsert_params(file_data, stored)
+            if _HAS_RETURNING:
+                cursor.execute(self._UPSERT_MUSIC_RETURNING_SQL, params)
             else:
-                # Insert new file
-                # Extract ID3 metadata
-                id3_data = file_data.get('id3', {})
-                
-                # Calculate file hash for duplicate detection
-                file_hash = self.calculate_file_hash(file_data['file_path']) if os.path.exists(file_data['file_path']) else ''
-                
-                cursor.execute('''
-                    INSERT INTO music_files (
-                        filename, file_path, file_size, key_signature, scale,
-                        key_name, camelot_key, bpm, energy_level, duration,
-                        analysis_date, cue_points, status, last_checked,
-                        title, artist, album, albumartist, date, year,
-                        genre, composer, tracknumber, discnumber, comment,
-                        initialkey, bpm_from_tags, website, isrc, language,
-                        organization, copyright, encodedby, id3_metadata,
-                        analysis_status, id3_tags_written, file_hash, prevent_reanalysis,
-                        cover_art, cover_art_extracted
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    file_data.get('filename', ''),
-                    file_data['file_path'],
-                    file_data.get('file_size', 0),
-                    file_data.get('key', ''),
-                    file_data.get('scale', ''),
-                    file_data.get('key_name', ''),
-                    file_data.get('camelot_key', ''),
-                    file_data.get('bpm', 0.0),
-                    file_data.get('energy_level', 0.0),
-                    file_data.get('duration', 0.0),
-                    file_data.get('analysis_date', current_time),
-                    json.dumps(file_data.get('cue_points', [])),
-                    file_data.get('status', 'found'),
-                    current_time,
-                    # ID3 metadata fields
-                    id3_data.get('title', ''),
-                    id3_data.get('artist', ''),
-                    id3_data.get('album', ''),
-                    id3_data.get('albumartist', ''),
-                    id3_data.get('date', ''),
-                    id3_data.get('year', ''),
-                    id3_data.get('genre', ''),
-                    id3_data.get('composer', ''),
-                    id3_data.get('tracknumber', ''),
-                    id3_data.get('discnumber', ''),
-                    id3_data.get('comment', ''),
-                    id3_data.get('initialkey', ''),
-                    id3_data.get('bpm', ''),
-                    id3_data.get('website', ''),
-                    id3_data.get('isrc', ''),
-                    id3_data.get('language', ''),
-                    id3_data.get('organization', ''),
-                    id3_data.get('copyright', ''),
-                    id3_data.get('encodedby', ''),
-                    json.dumps(id3_data),  # Store complete metadata as JSON
-                    # Analysis tracking fields
-                    file_data.get('analysis_status', 'pending'),
-                    file_data.get('id3_tags_written', 0),
-                    file_hash,
-                    file_data.get('prevent_reanalysis', 0),
-                    file_data.get('cover_art', ''),
-                    file_data.get('cover_art_extracted', 0)
-                ))
-                file_id = cursor.lastrowid
-                if file_id is None:
-                    raise RuntimeError("Failed to insert music file")
-            
-            conn.commit()
-            return file_id
+                cursor.execute(self._UPSERT_MUSIC_SQL, params)
+                cursor.execute('SELECT id FROM music_files WHERE file_path = ?', (file_data['file_path'],))
+            row = cursor.fetchone()
+            if row is None:
+                raise RuntimeError("Failed to insert music file")
+            return row[0]
     
-    def get_all_music_files(self, status_filter: Optional[str] = None) -> List[Dict]:
-        """Get all music files from database."""
-        with sqlite3.connect(self.db_path) as conn:
+    def add_music_files(self, files: List[Dict]) -> List[int]:
+        """Add or update many music files in a single transaction.
+        
+        Bulk counterpart of add_music_file for directory scans: rows are
+        upserted with executemany, existing rows are found with one lookup per
+        chunk of paths (only new paths are looked up again for their ids) and
+        the whole batch is committed once.
+        Returns the row ids in the same order as files.
+        """
+        if not files:
+            return []
+        
+        file_paths = [file_data['file_path'] for file_data in files]
+        
+        with self.get_connection() as conn:
             cursor = conn.cursor()
+            if not conn.in_transaction:
+                cursor.execute('BEGIN IMMEDIATE')
             
-            query = 'SELECT * FROM music_files'
-            params = []
+            # The last entry wins if a path is listed more than once
+            unique_files = {file_data['file_path']: file_data for file_data in files}
+            stored_by_path = self._get_rows_by_path(cursor, list(unique_files), 'id, file_size, file_mtime, file_hash')
+            cursor.executemany(self._UPSERT_MUSIC_SQL, [
+                self._upsert_params(file_data, stored_by_path.get(file_path))
+                for file_path, file_data in unique_files.items()
+            ])
             
-            if status_filter:
-                query += ' WHERE status = ?'
-                params.append(status_filter)
-                
-            query += ' ORDER BY filename'
+            # Updated rows keep their id, so only newly inserted paths need reading back
+            ids_by_path = {file_path: row['id'] for file_path, row in stored_by_path.items()}
+            new_paths = [file_path for file_path in unique_files if file_path not in ids_by_path]
+            if new_paths:
+                ids_by_path.update(
+                    (file_path, row['id']) for file_path, row in self._get_rows_by_path(cursor, new_paths, 'id').items()
+                )
+            return [ids_by_path[file_path] for file_path in file_paths]
+    
+    def iter_all_music_files(self, status_filter: Optional[str] = None,
+                             fields: Optional[Sequence[str]] = None) -> Iterator[Dict]:
+        """Yield music files one at a time, in filename order.
+        
+        Pass fields to fetch only those columns instead of the whole (wide) row.
+        See _iter_rows for how the connection lock is held.
+        """
+        where, params = self._status_condition(status_filter)
+        return self._iter_rows(self._projection(fields), 'music_files', where, params, ('filename', 'id'))
+    
+    @staticmethod
+    def _status_condition(status_filter: Optional[str]) -> Tuple[str, tuple]:
+        """WHERE condition and parameters for an optional music_files status filter."""
+        if status_filter:
+            return 'status = ?', (status_filter,)
+        return '1', ()
+    
+    def _iter_rows(self, columns: str, tables: str, where: str, params: Sequence,
+                   keys: Sequence[str]) -> Iterator[Dict]:
+        """Yield the rows of a query in keys order, a page of _ITER_CHUNK_SIZE at a time.
+        
+        Each page is its own statement, run under the connection lock and
+        read in full; the next one starts after the keys of the last row
+        (keyset paging), so the lock is free and no cursor is left open while
+        the caller works through the rows. Rows other threads change in the
+        meantime may or may not be seen. keys must be NOT NULL and unique
+        together.
+        """
+        order = ', '.join(keys)
+        key_columns = ', '.join(f'{key} AS _key{i}' for i, key in enumerate(keys))
+        select = f'SELECT {columns}, {key_columns} FROM {tables} WHERE {where}'
+        query = f'{select} ORDER BY {order} LIMIT ?'
+        page_params = (*params, _ITER_CHUNK_SIZE)
+        
+        while True:
+            with self.get_connection() as conn:
+                rows = conn.execute(query, page_params).fetchall()
             
-            cursor.execute(query, params)
-            rows = cursor.fetchall()
+            for row in rows:
+                record = dict(row)
+                last_keys = tuple(record.pop(f'_key{i}') for i in range(len(keys)))
+                yield record
             
-            columns = [desc[0] for desc in cursor.description]
-            return [dict(zip(columns, row)) for row in rows]
+            if len(rows) < _ITER_CHUNK_SIZE:
+                return
+            query = f'{select} AND ({order}) > ({", ".join("?" * len(keys))}) ORDER BY {order} LIMIT ?'
+            page_params = (*params, *last_keys, _ITER_CHUNK_SIZE)
+    
+    def get_all_music_files(self, status_filter: Optional[str] = None,
+                            fields: Optional[Sequence[str]] = None) -> List[Dict]:
+        """Get all music files from database, optionally only the given columns.
+        
+        Everything is read at once anyway, so this is one query rather than
+        iter_all_music_files' pages, each of which re-sorts the table.
+        """
+        where, params = self._status_condition(status_filter)
+        with self.get_connection() as conn:
+            return [dict(row) for row in conn.execute(
+                f'SELECT {self._projection(fields)} FROM music_files WHERE {where} ORDER BY filename, id', params)]
     
-    def get_music_file_by_path(self, file_path: str) -> Optional[Dict]:
-        """Get a music file by its path."""
-        with sqlite3.connect(self.db_path) as conn:
+    def get_music_file_by_path(self, file_path: str, fields: Optional[Sequence[str]] = None) -> Optional[Dict]:
+        """Get a music file by its path, optionally only the given columns."""
+        with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('SELECT * FROM music_files WHERE file_path = ?', (file_path,))
+            cursor.execute(f'SELECT {self._projection(fields)} FROM music_files WHERE file_path = ?', (file_path,))
             row = cursor.fetchone()
             
             if row:
-                columns = [desc[0] for desc in cursor.description]
-                return dict(zip(columns, row))
+                return dict(row)
             return None
     
-    def get_files_by_camelot_key(self, camelot_key: str) -> List[Dict]:
-        """Get all files with a specific Camelot key."""
-        with sqlite3.connect(self.db_path) as conn:
+    def get_files_by_camelot_key(self, camelot_key: str, fields: Optional[Sequence[str]] = None) -> List[Dict]:
+        """Get all files with a specific Camelot key, optionally only the given columns.
+        
+        Projecting onto (camelot_key, status, filename, bpm, id) is answered
+        from idx_music_files_camelot_cover alone.
+        """
+        with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
-                'SELECT * FROM music_files WHERE camelot_key = ? AND status = "found" ORDER BY filename',
+                f'SELECT {self._projection(fields)} FROM music_files WHERE camelot_key = ? AND status = "found" ORDER BY filename',
                 (camelot_key,)
             )
             rows = cursor.fetchall()
             
-            columns = [desc[0] for desc in cursor.description]
-            return [dict(zip(columns, row)) for row in rows]
+            return [dict(row) for row in rows]
     
     def add_scan_location(self, path: str, name: Optional[str] = None) -> int:
         """Add a scan location to remember where music was found."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.get_connection() as conn:
             cursor = conn.cursor()
             
             if name is None:
@@ -396,10 +828,9 @@ class DatabaseManager:
             
             cursor.execute('''
                 INSERT OR REPLACE INTO scan_locations (path, name, last_scanned)
-                VALUES (?, ?, ?)
-            ''', (path, name, datetime.now().isoformat()))
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+            ''', (path, name))
             
-            conn.commit()
             location_id = cursor.lastrowid
             if location_id is None:
                 raise RuntimeError("Failed to insert scan location")
@@ -407,74 +838,92 @@ class DatabaseManager:
     
     def get_scan_locations(self) -> List[Dict]:
         """Get all remembered scan locations."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('SELECT * FROM scan_locations WHERE is_active = 1 ORDER BY last_scanned DESC')
             rows = cursor.fetchall()
             
-            columns = [desc[0] for desc in cursor.description]
-            return [dict(zip(columns, row)) for row in rows]
+            return [dict(row) for row in rows]
     
     def update_file_status(self, file_path: str, status: str, error_message: Optional[str] = None):
         """Update the status of a music file (found, missing, error, etc.)."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 UPDATE music_files SET 
                     status = ?, 
                     error_message = ?, 
-                    last_checked = ?,
-                    updated_at = ?
+                    last_checked = CURRENT_TIMESTAMP,
+                    updated_at = CURRENT_TIMESTAMP
                 WHERE file_path = ?
             ''', (
                 status, 
                 error_message, 
-                datetime.now().isoformat(),
-                datetime.now().isoformat(),
                 file_path
             ))
-            conn.commit()
     
     def verify_file_locations(self) -> Tuple[int, int]:
         """Verify that all files in database still exist. Returns (found, missing) counts."""
-        files = self.get_all_music_files()
+        with self.get_connection() as conn:
+            files = conn.execute('SELECT id, file_path, status FROM music_files').fetchall()
+        
+        # Stat files concurrently outside the lock; the GIL is released during
+        # stat, which matters on network shares where each call is slow.
+        # A handful of paths isn't worth starting threads for.
+        paths = [file_path for _, file_path, _ in files]
+        if len(paths) < _MIN_PARALLEL_STATS:
+            exists = list(map(os.path.exists, paths))
+        else:
+            with ThreadPoolExecutor(max_workers=min(32, len(paths))) as executor:
+                exists = list(executor.map(os.path.exists, paths))
+        
         found_count = 0
         missing_count = 0
+        status_updates = []
         
-        for file_record in files:
-            file_path = file_record['file_path']
-            if os.path.exists(file_path):
-                if file_record['status'] != 'found':
-                    self.update_file_status(file_path, 'found')
+        for (file_id, _, status), file_exists in zip(files, exists):
+            new_status = 'found' if file_exists else 'missing'
+            if new_status == 'found':
                 found_count += 1
             else:
-                if file_record['status'] != 'missing':
-                    self.update_file_status(file_path, 'missing')
                 missing_count += 1
+            if status != new_status:
+                status_updates.append((new_status, file_id))
+        
+        # Apply all status changes in a single transaction
+        if status_updates:
+            with self.get_connection() as conn:
+                conn.executemany('''
+                    UPDATE music_files SET
+                        status = ?,
+                        error_message = NULL,
+                        last_checked = CURRENT_TIMESTAMP,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                ''', status_updates)
         
         return found_count, missing_count
     
     def get_library_stats(self) -> Dict:
         """Get statistics about the music library."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.get_connection() as conn:
             cursor = conn.cursor()
             
-            # Total files
-            cursor.execute('SELECT COUNT(*) FROM music_files')
-            total_files = cursor.fetchone()[0]
-            
-            # Files by status
-            cursor.execute('SELECT status, COUNT(*) FROM music_files GROUP BY status')
-            status_counts = dict(cursor.fetchall())
+            # Counts and found-track duration per status in one pass;
+            # grouping keeps every status value, not just the known ones
+            cursor.execute('SELECT status, COUNT(*), SUM(duration) FROM music_files GROUP BY status')
+            status_counts = {}
+            total_duration = 0
+            for status, count, duration in cursor.fetchall():
+                status_counts[status] = count
+                if status == 'found':
+                    total_duration = duration or 0
+            total_files = sum(status_counts.values())
             
             # Files by key
             cursor.execute('SELECT camelot_key, COUNT(*) FROM music_files WHERE status = "found" GROUP BY camelot_key')
             key_distribution = dict(cursor.fetchall())
             
-            # Total duration
-            cursor.execute('SELECT SUM(duration) FROM music_files WHERE status = "found"')
-            total_duration = cursor.fetchone()[0] or 0
-            
             return {
                 'total_files': total_files,
                 'status_counts': status_counts,
@@ -484,87 +933,61 @@ class DatabaseManager:
     
     def set_setting(self, key: str, value: str):
         """Set an application setting."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 INSERT OR REPLACE INTO app_settings (key, value, updated_at)
-                VALUES (?, ?, ?)
-            ''', (key, value, datetime.now().isoformat()))
-            conn.commit()
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+            ''', (key, value))
+            self._settings[key] = value
     
     def get_setting(self, key: str) -> Optional[str]:
         """Get an application setting."""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT value FROM app_settings WHERE key = ?', (key,))
-            result = cursor.fetchone()
-            return result[0] if result else None
+        return self._settings.get(key)
     
     def delete_setting(self, key: str):
         """Delete an application setting."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('DELETE FROM app_settings WHERE key = ?', (key,))
-            conn.commit()
+            self._settings.pop(key, None)
     
     def delete_music_file_by_id(self, song_id: str) -> bool:
         """Delete a music file from the database by ID."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                # First get the file path to check if file exists
-                cursor.execute('SELECT file_path FROM music_files WHERE id = ?', (song_id,))
-                result = cursor.fetchone()
-                
-                if not result:
-                    return False
-                
-                file_path = result[0]
-                
-                # Delete from database
+                # Delete from database; playlist items go with it via ON DELETE CASCADE
                 cursor.execute('DELETE FROM music_files WHERE id = ?', (song_id,))
                 
-                # Also remove from playlist items
-                cursor.execute('DELETE FROM playlist_items WHERE music_file_id = ?', (song_id,))
-                
-                conn.commit()
+                if cursor.rowcount == 0:
+                    return False
                 
-                print(f"🗑️ Deleted song ID {song_id} from database")
+                logger.debug("Deleted song ID %s from database", song_id)
                 return True
                 
-        except Exception as e:
-            print(f"❌ Error deleting song by ID {song_id}: {str(e)}")
+        except Exception:
+            logger.exception("Error deleting song by ID %s", song_id)
             return False
     
     def delete_music_file_by_path(self, file_path: str) -> bool:
         """Delete a music file from the database by file path."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                # First get the ID to check if file exists
-                cursor.execute('SELECT id FROM music_files WHERE file_path = ?', (file_path,))
-                result = cursor.fetchone()
-                
-                if not result:
-                    return False
-                
-                song_id = result[0]
-                
-                # Delete from database
+                # Delete from database; playlist items go with it via ON DELETE CASCADE
                 cursor.execute('DELETE FROM music_files WHERE file_path = ?', (file_path,))
                 
-                # Also remove from playlist items
-                cursor.execute('DELETE FROM playlist_items WHERE music_file_id = ?', (song_id,))
-                
-                conn.commit()
+                if cursor.rowcount == 0:
+                    return False
                 
-                print(f"🗑️ Deleted song with path {file_path} from database")
+                logger.debug("Deleted song with path %s from database", file_path)
                 return True
                 
-        except Exception as e:
-            print(f"❌ Error deleting song by path {file_path}: {str(e)}")
+        except Exception:
+            logger.exception("Error deleting song by path %s", file_path)
             return False
     
     def update_music_file_metadata(self, file_id: str, metadata_updates: dict) -> Optional[dict]:
@@ -574,536 +997,509 @@ class DatabaseManager:
             try:
                 file_id_int = int(file_id)
             except (ValueError, TypeError):
-                print(f"Invalid file_id format: {file_id}")
+                logger.debug("Invalid file_id format: %s", file_id)
                 return None
             
-            with sqlite3.connect(self.db_path) as conn:
+            with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                # Build dynamic update query
-                update_fields = []
-                params = []
+                # Fields are taken in _METADATA_FIELD_MAPPING order, so the same
+                # set of edited fields always yields the same SQL text and params
+                fields = tuple(field for field in self._METADATA_FIELD_MAPPING if field in metadata_updates)
                 
-                # Map frontend field names to database column names
-                field_mapping = {
-                    'key': 'key_signature',
-                    'scale': 'scale',
-                    'key_name': 'key_name',
-                    'camelot_key': 'camelot_key',
-                    'bpm': 'bpm',
-                    'energy_level': 'energy_level',
-                    'duration': 'duration',
-                    'cue_points': 'cue_points'
-                }
-                
-                for field, value in metadata_updates.items():
-                    if field in field_mapping:
-                        db_field = field_mapping[field]
-                        update_fields.append(f"{db_field} = ?")
-                        
-                        # Handle special cases
-                        if field == 'cue_points' and isinstance(value, list):
-                            params.append(json.dumps(value))
-                        elif field in ['bpm', 'energy_level', 'duration']:
-                            # Ensure numeric values are properly converted
-                            try:
-                                if value is not None and value != '':
-                                    if field == 'energy_level':
-                                        params.append(int(float(value)))
-                                    else:
-                                        params.append(float(value))
-                                else:
-                                    params.append(None)
-                            except (ValueError, TypeError):
-                                params.append(None)
-                        else:
-                            # Handle string values
+                if not fields:
+                    logger.debug("No valid fields to update for file_id: %s", file_id_int)
+                    return None
+                
+                params = []
+                for field in fields:
+                    value = metadata_updates[field]
+                    
+                    # Handle special cases
+                    if field == 'cue_points' and isinstance(value, list):
+                        params.append(_json_dumps(value))
+                    elif field in ['bpm', 'energy_level', 'duration']:
+                        # Ensure numeric values are properly converted
+                        try:
                             if value is not None and value != '':
-                                params.append(str(value))
+                                if field == 'energy_level':
+                                    params.append(int(float(value)))
+                                else:
+                                    params.append(float(value))
                             else:
                                 params.append(None)
-                
-                if not update_fields:
-                    print(f"No valid fields to update for file_id: {file_id_int}")
-                    return None
-                
-                # Add updated_at timestamp and analysis_date
-                update_fields.append("updated_at = CURRENT_TIMESTAMP")
-                update_fields.append("analysis_date = CURRENT_TIMESTAMP")
+                        except (ValueError, TypeError):
+                            params.append(None)
+                    else:
+                        # Handle string values
+                        if value is not None and value != '':
+                            params.append(str(value))
+                        else:
+                            params.append(None)
                 
                 # Add file_id to params
                 params.append(file_id_int)
                 
-                query = f"""
-                    UPDATE music_files 
-                    SET {', '.join(update_fields)}
-                    WHERE id = ?
-                """
+                query = self._update_sql_cache.get(fields)
+                if query is None:
+                    assignments = ', '.join(f"{self._METADATA_FIELD_MAPPING[field]} = ?" for field in fields)
+                    query = f"""
+                        UPDATE music_files 
+                        SET {assignments}, updated_at = CURRENT_TIMESTAMP, analysis_date = CURRENT_TIMESTAMP
+                        WHERE id = ?
+                    """
+                    self._update_sql_cache[fields] = query
                 
-                print(f"Executing update query: {query}")
-                print(f"Parameters: {params}")
+                logger.debug("Executing update query: %s", query)
+                logger.debug("Parameters: %s", params)
                 
-                cursor.execute(query, params)
-                conn.commit()
+                row = self._update_returning_row(cursor, query, params, file_id_int)
                 
-                if cursor.rowcount > 0:
-                    print(f"Successfully updated {cursor.rowcount} rows for file_id: {file_id_int}")
-                    # Return updated record
-                    return self.get_music_file_by_id(str(file_id_int))
+                if row:
+                    logger.debug("Successfully updated file_id: %s", file_id_int)
+                    return dict(row)
                 else:
-                    print(f"No rows updated for file_id: {file_id_int}")
+                    logger.debug("No rows updated for file_id: %s", file_id_int)
                     return None
                     
-        except Exception as e:
-            print(f"Error updating music file metadata: {str(e)}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Error updating music file metadata")
             return None
 
+    @staticmethod
+    def _update_returning_row(cursor: sqlite3.Cursor, query: str, params: Sequence,
+                              file_id: int) -> Optional[sqlite3.Row]:
+        """Run an UPDATE of one music_files row by id and return the updated row."""
+        if _HAS_RETURNING:
+            # RETURNING hands back the updated record without a second lookup
+            cursor.execute(query + 'RETURNING *', params)
+            return cursor.fetchone()
+        
+        cursor.execute(query, params)
+        if cursor.rowcount == 0:
+            return None
+        cursor.execute('SELECT * FROM music_files WHERE id = ?', (file_id,))
+        return cursor.fetchone()
+
     def update_music_file_path(self, file_id: int, new_file_path: str) -> Optional[dict]:
         """Update file path for a music file (after renaming)."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
                 # Update both file_path and filename
                 new_filename = os.path.basename(new_file_path)
                 
-                cursor.execute("""
+                row = self._update_returning_row(cursor, """
                     UPDATE music_files 
                     SET file_path = ?, filename = ?, updated_at = CURRENT_TIMESTAMP
                     WHERE id = ?
-                """, (new_file_path, new_filename, file_id))
-                
-                conn.commit()
+                """, (new_file_path, new_filename, file_id), file_id)
                 
-                if cursor.rowcount > 0:
-                    # Return updated record
-                    return self.get_music_file_by_id(file_id)
-                else:
-                    return None
+                # Return updated record
+                return dict(row) if row else None
                     
-        except Exception as e:
-            print(f"Error updating music file path: {str(e)}")
+        except Exception:
+            logger.exception("Error updating music file path")
             return None
 
-    def get_music_file_by_id(self, file_id: str) -> Optional[dict]:
-        """Get a music file by its ID."""
+    def get_music_file_by_id(self, file_id: str, fields: Optional[Sequence[str]] = None) -> Optional[dict]:
+        """Get a music file by its ID, optionally only the given columns."""
         try:
             # Convert file_id to integer if it's a string
             try:
                 file_id_int = int(file_id)
             except (ValueError, TypeError):
-                print(f"Invalid file_id format: {file_id}")
+                logger.debug("Invalid file_id format: %s", file_id)
                 return None
             
-            with sqlite3.connect(self.db_path) as conn:
+            with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute("""
-                    SELECT * FROM music_files WHERE id = ?
-                """, (file_id_int,))
+                if fields:
+                    cursor.execute(f'SELECT {self._projection(fields)} FROM music_files WHERE id = ?', (file_id_int,))
+                else:
+                    cursor.execute(_SQL_GET_BY_ID, (file_id_int,))
                 
                 row = cursor.fetchone()
                 if row:
-                    columns = [description[0] for description in cursor.description]
-                    return dict(zip(columns, row))
+                    return dict(row)
                 else:
-                    print(f"No music file found with ID: {file_id_int}")
+                    logger.debug("No music file found with ID: %s", file_id_int)
                     return None
                     
-        except Exception as e:
-            print(f"Error getting music file by ID: {str(e)}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Error getting music file by ID")
             return None
     
     def close(self):
         """Close database connection."""
-        # SQLite connections are automatically closed when using context managers
-        pass
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+    
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
 
     def check_song_has_metadata(self, file_path: str) -> dict:
         """Check if a song already has key and BPM metadata."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute("""
-                    SELECT id, filename, key_signature, camelot_key, bpm, energy_level, duration, analysis_date
-                    FROM music_files 
-                    WHERE file_path = ?
-                """, (file_path,))
+                cursor.execute(_SQL_CHECK_METADATA, (file_path,))
                 
                 row = cursor.fetchone()
-                if row:
-                    columns = [description[0] for description in cursor.description]
-                    song_data = dict(zip(columns, row))
-                    
-                    # Check if song has complete metadata
-                    has_key = bool(song_data.get('key_signature') or song_data.get('camelot_key'))
-                    has_bpm = bool(song_data.get('bpm') and song_data.get('bpm') > 0)
-                    has_energy = bool(song_data.get('energy_level') and song_data.get('energy_level') > 0)
-                    has_duration = bool(song_data.get('duration') and song_data.get('duration') > 0)
-                    
-                    return {
-                        'exists': True,
-                        'song_id': song_data['id'],
-                        'filename': song_data['filename'],
-                        'has_complete_metadata': has_key and has_bpm and has_energy and has_duration,
-                        'has_key': has_key,
-                        'has_bpm': has_bpm,
-                        'has_energy': has_energy,
-                        'has_duration': has_duration,
-                        'key_signature': song_data.get('key_signature'),
-                        'camelot_key': song_data.get('camelot_key'),
-                        'bpm': song_data.get('bpm'),
-                        'energy_level': song_data.get('energy_level'),
-                        'duration': song_data.get('duration'),
-                        'analysis_date': song_data.get('analysis_date'),
-                        'status': 'complete' if (has_key and has_bpm and has_energy and has_duration) else 'partial'
-                    }
-                else:
-                    return {
-                        'exists': False,
-                        'status': 'not_found'
-                    }
+                return self._metadata_summary(dict(row) if row else None)
                     
         except Exception as e:
-            print(f"Error checking song metadata: {str(e)}")
+            logger.exception("Error checking song metadata")
             return {
                 'exists': False,
                 'status': 'error',
                 'error': str(e)
             }
 
+    @staticmethod
+    def _metadata_summary(song_data: Optional[dict]) -> dict:
+        """Summarize which analysis fields a stored track has; song_data is None for unknown files."""
+        if song_data is None:
+            return {
+                'exists': False,
+                'status': 'not_found'
+            }
+        
+        # Check if song has complete metadata
+        has_key = bool(song_data.get('key_signature') or song_data.get('camelot_key'))
+        has_bpm = bool(song_data.get('bpm') and song_data.get('bpm') > 0)
+        has_energy = bool(song_data.get('energy_level') and song_data.get('energy_level') > 0)
+        has_duration = bool(song_data.get('duration') and song_data.get('duration') > 0)
+        
+        return {
+            'exists': True,
+            'song_id': song_data['id'],
+            'filename': song_data['filename'],
+            'has_complete_metadata': has_key and has_bpm and has_energy and has_duration,
+            'has_key': has_key,
+            'has_bpm': has_bpm,
+            'has_energy': has_energy,
+            'has_duration': has_duration,
+            'key_signature': song_data.get('key_signature'),
+            'camelot_key': song_data.get('camelot_key'),
+            'bpm': song_data.get('bpm'),
+            'energy_level': song_data.get('energy_level'),
+            'duration': song_data.get('duration'),
+            'analysis_date': song_data.get('analysis_date'),
+            'status': 'complete' if (has_key and has_bpm and has_energy and has_duration) else 'partial'
+        }
+
     def generate_unique_track_id(self, file_path: str, filename: str) -> str:
         """Generate a unique track ID based on file path and content."""
         try:
-            import hashlib
-            import os
-            
             # Get file size and modification time for uniqueness
             file_stat = os.stat(file_path)
-            file_size = file_stat.st_size
-            file_mtime = file_stat.st_mtime
-            
-            # Create a unique hash based on file path, size, and modification time
-            unique_string = f"{file_path}:{file_size}:{file_mtime}"
-            track_hash = hashlib.md5(unique_string.encode()).hexdigest()[:12]
-            
-            # Create a readable track ID
-            clean_filename = "".join(c for c in filename if c.isalnum() or c in (' ', '-', '_')).strip()
-            clean_filename = clean_filename[:20]  # Limit length
-            
-            unique_track_id = f"{clean_filename}_{track_hash}"
+            return _track_id_impl(file_path, file_stat.st_size, file_stat.st_mtime, filename)
             
-            return unique_track_id
-            
-        except Exception as e:
-            print(f"Error generating unique track ID: {str(e)}")
+        except Exception:
+            logger.exception("Error generating unique track ID")
             # Fallback to timestamp-based ID
-            import time
             return f"track_{int(time.time())}"
 
-    def get_song_by_track_id(self, track_id: str) -> Optional[dict]:
-        """Get a song by its unique track ID."""
+    def get_song_by_track_id(self, track_id: str, fields: Optional[Sequence[str]] = None) -> Optional[dict]:
+        """Get a song by its unique track ID, optionally only the given columns."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute("""
-                    SELECT * FROM music_files 
+                cursor.execute(f"""
+                    SELECT {self._projection(fields)} FROM music_files 
                     WHERE track_id = ?
                 """, (track_id,))
                 
                 row = cursor.fetchone()
                 if row:
-                    columns = [description[0] for description in cursor.description]
-                    return dict(zip(columns, row))
+                    return dict(row)
                 else:
                     return None
                     
-        except Exception as e:
-            print(f"Error getting song by track ID: {str(e)}")
+        except Exception:
+            logger.exception("Error getting song by track ID")
             return None
 
-    def update_track_id(self, file_id: str, track_id: str) -> bool:
-        """Update the track_id for a song."""
+    def load_track_id_index(self) -> Dict[str, int]:
+        """Load a track_id -> id map of the whole library.
+
+        Scans that check many tracks for existence should call this once and
+        do dict lookups instead of one get_song_by_track_id query per track.
+        The returned dict is a snapshot; callers add ids of tracks they insert.
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT track_id, id FROM music_files WHERE track_id IS NOT NULL')
+            return dict(cursor.fetchall())
+
+    def update_track_id(self, file_id: str, track_id: str, updated_at: Optional[str] = None) -> bool:
+        """Update the track_id for a song.
+
+        Batch callers can compute updated_at once (in CURRENT_TIMESTAMP format)
+        and pass it for every row instead of having it generated per call.
+        """
         try:
             file_id_int = int(file_id)
+            if updated_at is None:
+                updated_at = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
             
-            with sqlite3.connect(self.db_path) as conn:
+            with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute("""
-                    UPDATE music_files 
-                    SET track_id = ?, updated_at = CURRENT_TIMESTAMP
-                    WHERE id = ?
-                """, (track_id, file_id_int))
+                cursor.execute(_SQL_UPDATE_TRACK_ID, (track_id, updated_at, file_id_int))
                 
-                conn.commit()
                 return cursor.rowcount > 0
                 
-        except Exception as e:
-            print(f"Error updating track ID: {str(e)}")
+        except Exception:
+            logger.exception("Error updating track ID")
             return False
 
     def should_skip_analysis(self, file_path: str) -> dict:
         """Check if a file should be skipped for analysis based on various criteria."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute("""
-                    SELECT id, filename, analysis_status, id3_tags_written, 
-                           prevent_reanalysis, analysis_attempts, last_analysis_attempt,
-                           key_signature, camelot_key, bpm, energy_level, duration
-                    FROM music_files 
-                    WHERE file_path = ?
-                """, (file_path,))
+                cursor.execute(_SQL_SHOULD_SKIP, (file_path,))
                 
                 row = cursor.fetchone()
-                if row:
-                    columns = [description[0] for description in cursor.description]
-                    song_data = dict(zip(columns, row))
-                    
-                    # Check if re-analysis is explicitly prevented (highest priority)
-                    prevent_reanalysis = song_data.get('prevent_reanalysis', 0) == 1
-                    
-                    # Check if analysis is already completed and tags are written
-                    is_completed = (song_data.get('analysis_status') == 'completed' and 
-                                  song_data.get('id3_tags_written', 0) == 1)
-                    
-                    # Check if file has complete metadata
-                    has_complete_metadata = all([
-                        song_data.get('key_signature') or song_data.get('camelot_key'),
-                        song_data.get('bpm') and song_data.get('bpm') > 0,
-                        song_data.get('energy_level') and song_data.get('energy_level') > 0,
-                        song_data.get('duration') and song_data.get('duration') > 0
-                    ])
-                    
-                    should_skip = prevent_reanalysis or is_completed or has_complete_metadata
-                    
-                    return {
-                        'should_skip': should_skip,
-                        'reason': 'prevented' if prevent_reanalysis else 
-                                 'completed' if is_completed else 
-                                 'has_metadata' if has_complete_metadata else 'none',
-                        'song_data': song_data,
-                        'analysis_status': song_data.get('analysis_status'),
-                        'id3_tags_written': song_data.get('id3_tags_written', 0) == 1,
-                        'has_complete_metadata': has_complete_metadata
-                    }
-                else:
-                    return {
-                        'should_skip': False,
-                        'reason': 'not_found',
-                        'song_data': None
-                    }
+                return self._skip_decision(dict(row) if row else None)
                     
         except Exception as e:
-            print(f"Error checking if should skip analysis: {str(e)}")
+            logger.exception("Error checking if should skip analysis")
             return {
                 'should_skip': False,
                 'reason': 'error',
                 'error': str(e)
             }
 
+    def should_skip_analysis_batch(self, file_paths: List[str]) -> Dict[str, dict]:
+        """should_skip_analysis for many files with one query per chunk of paths.
+        
+        Returns a dict keyed by file path holding the same result
+        should_skip_analysis gives for that path.
+        """
+        try:
+            with self.get_connection() as conn:
+                rows_by_path = self._get_rows_by_path(conn.cursor(), list(dict.fromkeys(file_paths)),
+                                                      _SKIP_ANALYSIS_COLUMNS)
+            return {
+                file_path: self._skip_decision(dict(rows_by_path[file_path]) if file_path in rows_by_path else None)
+                for file_path in file_paths
+            }
+                    
+        except Exception as e:
+            logger.exception("Error checking if should skip analysis")
+            return {
+                file_path: {'should_skip': False, 'reason': 'error', 'error': str(e)}
+                for file_path in file_paths
+            }
+
+    def is_analysis_skippable(self, file_path: str) -> bool:
+        """Boolean-only should_skip_analysis for callers that don't need the details."""
+        try:
+            with self.get_connection() as conn:
+                return conn.execute(_SQL_IS_ANALYSIS_SKIPPABLE, (file_path,)).fetchone() is not None
+        except Exception:
+            logger.exception("Error checking if should skip analysis")
+            return False
+
+    def has_complete_metadata(self, file_path: str) -> bool:
+        """Boolean-only check_song_has_metadata: key, BPM, energy and duration are all set."""
+        try:
+            with self.get_connection() as conn:
+                return conn.execute(_SQL_HAS_COMPLETE_METADATA, (file_path,)).fetchone() is not None
+        except Exception:
+            logger.exception("Error checking song metadata")
+            return False
+
+    @staticmethod
+    def _skip_decision(song_data: Optional[dict]) -> dict:
+        """Decide whether a stored track needs analysis; song_data is None for unknown files."""
+        if song_data is None:
+            return {
+                'should_skip': False,
+                'reason': 'not_found',
+                'song_data': None
+            }
+        
+        # Check if re-analysis is explicitly prevented (highest priority)
+        prevent_reanalysis = song_data.get('prevent_reanalysis', 0) == 1
+        
+        # Check if analysis is already completed and tags are written
+        is_completed = (song_data.get('analysis_status') == 'completed' and 
+                      song_data.get('id3_tags_written', 0) == 1)
+        
+        # Check if file has complete metadata
+        has_complete_metadata = all([
+            song_data.get('key_signature') or song_data.get('camelot_key'),
+            song_data.get('bpm') and song_data.get('bpm') > 0,
+            song_data.get('energy_level') and song_data.get('energy_level') > 0,
+            song_data.get('duration') and song_data.get('duration') > 0
+        ])
+        
+        should_skip = prevent_reanalysis or is_completed or has_complete_metadata
+        
+        return {
+            'should_skip': should_skip,
+            'reason': 'prevented' if prevent_reanalysis else 
+                     'completed' if is_completed else 
+                     'has_metadata' if has_complete_metadata else 'none',
+            'song_data': song_data,
+            'analysis_status': song_data.get('analysis_status'),
+            'id3_tags_written': song_data.get('id3_tags_written', 0) == 1,
+            'has_complete_metadata': has_complete_metadata
+        }
+
     def mark_analysis_started(self, file_path: str) -> bool:
         """Mark that analysis has started for a file."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                cursor.execute("""
-                    UPDATE music_files 
-                    SET analysis_status = 'analyzing', 
-                        last_analysis_attempt = CURRENT_TIMESTAMP,
-                        analysis_attempts = analysis_attempts + 1,
-                        updated_at = CURRENT_TIMESTAMP
-                    WHERE file_path = ?
-                """, (file_path,))
-                
-                conn.commit()
-                return cursor.rowcount > 0
+            return self._exec(_SQL_MARK_STARTED, (file_path,)) > 0
                 
-        except Exception as e:
-            print(f"Error marking analysis started: {str(e)}")
+        except Exception:
+            logger.exception("Error marking analysis started")
             return False
 
     def mark_analysis_completed(self, file_path: str, analysis_data: dict = None) -> bool:
         """Mark that analysis has been completed for a file."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # If analysis_data is provided, update the analysis results as well
-                if analysis_data:
-                    cursor.execute("""
-                        UPDATE music_files 
-                        SET analysis_status = 'completed',
-                            key_signature = ?, camelot_key = ?, bpm = ?, 
-                            energy_level = ?, duration = ?, analysis_date = CURRENT_TIMESTAMP,
-                            updated_at = CURRENT_TIMESTAMP
-                        WHERE file_path = ?
-                    """, (
-                        analysis_data.get('key', ''),
-                        analysis_data.get('camelot_key', ''),
-                        analysis_data.get('bpm', 0.0),
-                        analysis_data.get('energy_level', 0.0),
-                        analysis_data.get('duration', 0.0),
-                        file_path
-                    ))
-                else:
-                    cursor.execute("""
-                        UPDATE music_files 
-                        SET analysis_status = 'completed', updated_at = CURRENT_TIMESTAMP
-                        WHERE file_path = ?
-                    """, (file_path,))
-                
-                conn.commit()
-                return cursor.rowcount > 0
-                
-        except Exception as e:
-            print(f"Error marking analysis completed: {str(e)}")
+            # If analysis_data is provided, update the analysis results as well
+            if analysis_data:
+                return self._exec(_SQL_MARK_COMPLETED_WITH_RESULTS, (
+                    analysis_data.get('key', ''),
+                    analysis_data.get('camelot_key', ''),
+                    analysis_data.get('bpm', 0.0),
+                    analysis_data.get('energy_level', 0.0),
+                    analysis_data.get('duration', 0.0),
+                    file_path
+                )) > 0
+            return self._exec(_SQL_MARK_COMPLETED, (file_path,)) > 0
+                
+        except Exception:
+            logger.exception("Error marking analysis completed")
             return False
 
     def mark_id3_tags_written(self, file_path: str) -> bool:
         """Mark that ID3 tags have been written for a file."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
+            return self._exec(_SQL_MARK_ID3_WRITTEN, (file_path,)) > 0
                 
-                cursor.execute("""
-                    UPDATE music_files 
-                    SET id3_tags_written = 1, updated_at = CURRENT_TIMESTAMP
-                    WHERE file_path = ?
-                """, (file_path,))
-                
-                conn.commit()
-                return cursor.rowcount > 0
-                
-        except Exception as e:
-            print(f"Error marking ID3 tags written: {str(e)}")
+        except Exception:
+            logger.exception("Error marking ID3 tags written")
             return False
 
     def mark_analysis_failed(self, file_path: str, error_message: str = None) -> bool:
         """Mark that analysis has failed for a file."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                cursor.execute("""
-                    UPDATE music_files 
-                    SET analysis_status = 'failed', 
-                        error_message = ?, 
-                        updated_at = CURRENT_TIMESTAMP
-                    WHERE file_path = ?
-                """, (error_message, file_path))
+            return self._exec(_SQL_MARK_FAILED, (error_message, file_path)) > 0
                 
-                conn.commit()
-                return cursor.rowcount > 0
-                
-        except Exception as e:
-            print(f"Error marking analysis failed: {str(e)}")
+        except Exception:
+            logger.exception("Error marking analysis failed")
             return False
 
     def set_prevent_reanalysis(self, file_path: str, prevent: bool = True) -> bool:
         """Set or unset the prevent_reanalysis flag for a file."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                cursor.execute("""
-                    UPDATE music_files 
-                    SET prevent_reanalysis = ?, updated_at = CURRENT_TIMESTAMP
-                    WHERE file_path = ?
-                """, (1 if prevent else 0, file_path))
-                
-                conn.commit()
-                return cursor.rowcount > 0
+            return self._exec(_SQL_SET_PREVENT_REANALYSIS, (1 if prevent else 0, file_path)) > 0
                 
-        except Exception as e:
-            print(f"Error setting prevent_reanalysis flag: {str(e)}")
+        except Exception:
+            logger.exception("Error setting prevent_reanalysis flag")
             return False
 
     def update_cover_art(self, file_path: str, cover_art: str) -> bool:
         """Update cover art for a music file."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
+            return self._exec(_SQL_UPDATE_COVER_ART, (cover_art, file_path)) > 0
                 
-                cursor.execute("""
-                    UPDATE music_files 
-                    SET cover_art = ?, cover_art_extracted = 1, updated_at = CURRENT_TIMESTAMP
-                    WHERE file_path = ?
-                """, (cover_art, file_path))
-                
-                conn.commit()
-                return cursor.rowcount > 0
-                
-        except Exception as e:
-            print(f"Error updating cover art: {str(e)}")
+        except Exception:
+            logger.exception("Error updating cover art")
             return False
 
     def get_cover_art(self, file_path: str) -> Optional[str]:
         """Get cover art for a music file."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute("""
-                    SELECT cover_art, cover_art_extracted 
-                    FROM music_files 
-                    WHERE file_path = ?
-                """, (file_path,))
+                cursor.execute(_SQL_GET_COVER_ART, (file_path,))
                 
                 result = cursor.fetchone()
-                if result and result[1]:  # cover_art_extracted is True
-                    return result[0]  # cover_art
-                return None
+                return result[0] if result else None
                 
-        except Exception as e:
-            print(f"Error getting cover art: {str(e)}")
+        except Exception:
+            logger.exception("Error getting cover art")
             return None
 
+    def has_cover_art(self, file_path: str) -> bool:
+        """Whether cover art has been extracted for a file, without reading it."""
+        try:
+            with self.get_connection() as conn:
+                row = conn.execute(_SQL_HAS_COVER_ART, (file_path,)).fetchone()
+                return bool(row and row[0])
+                
+        except Exception:
+            logger.exception("Error checking cover art")
+            return False
+
     def calculate_file_hash(self, file_path: str) -> str:
-        """Calculate MD5 hash of file content for duplicate detection."""
+        """Calculate a hash of file content for duplicate detection.
+        
+        Uses BLAKE3 (SIMD-accelerated) when the blake3 package is installed,
+        MD5 otherwise.
+        """
         try:
-            import hashlib
+            if BLAKE3_AVAILABLE:
+                # Memory-map the file and hash it on all cores, with no
+                # Python-level read loop
+                hasher = blake3(max_threads=blake3.AUTO)
+                hasher.update_mmap(file_path)
+                return hasher.hexdigest()
             
-            hash_md5 = hashlib.md5()
             with open(file_path, "rb") as f:
-                # Read file in chunks to handle large files
-                for chunk in iter(lambda: f.read(4096), b""):
+                if hasattr(hashlib, 'file_digest'):
+                    # Python 3.11+: hashes in C with the GIL released
+                    return hashlib.file_digest(f, 'md5').hexdigest()
+                hash_md5 = hashlib.md5()
+                # Read file in 1 MiB chunks to handle large files
+                for chunk in iter(lambda: f.read(1 << 20), b""):
                     hash_md5.update(chunk)
             return hash_md5.hexdigest()
             
-        except Exception as e:
-            print(f"Error calculating file hash: {str(e)}")
+        except Exception:
+            logger.exception("Error calculating file hash")
             return ""
 
-    def find_duplicate_by_hash(self, file_hash: str) -> Optional[dict]:
-        """Find a file with the same hash (duplicate content)."""
+    def find_duplicate_by_hash(self, file_hash: str, exclude_path: Optional[str] = None) -> Optional[dict]:
+        """Find a file with the same hash (duplicate content).
+        
+        Pass exclude_path to skip the file being checked, so a copy stored
+        under another path is still found when the file itself is in the
+        library.
+        """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute("""
-                    SELECT * FROM music_files 
-                    WHERE file_hash = ? AND file_hash != ''
-                """, (file_hash,))
+                cursor.execute(_SQL_FIND_DUPLICATE_BY_HASH, (file_hash, exclude_path))
                 
                 row = cursor.fetchone()
                 if row:
-                    columns = [description[0] for description in cursor.description]
-                    return dict(zip(columns, row))
+                    return dict(row)
                 else:
                     return None
                     
-        except Exception as e:
-            print(f"Error finding duplicate by hash: {str(e)}")
+        except Exception:
+            logger.exception("Error finding duplicate by hash")
             return None
 
     # Playlist Management Methods
@@ -1112,30 +1508,27 @@ class DatabaseManager:
                        is_query_based: bool = False, query_criteria: dict = None) -> int:
         """Create a new playlist and return its ID."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                query_criteria_json = json.dumps(query_criteria) if query_criteria else None
+                query_criteria_json = _json_dumps(query_criteria) if query_criteria else None
                 
-                cursor.execute("""
-                    INSERT INTO playlists (name, description, color, is_query_based, query_criteria)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (name, description, color, is_query_based, query_criteria_json))
+                cursor.execute(_SQL_CREATE_PLAYLIST,
+                               (name, description, color, is_query_based, query_criteria_json))
                 
                 playlist_id = cursor.lastrowid
-                conn.commit()
                 
-                print(f"✅ Created playlist: {name} (ID: {playlist_id})")
+                logger.debug("Created playlist: %s (ID: %s)", name, playlist_id)
                 return playlist_id
                 
-        except Exception as e:
-            print(f"Error creating playlist: {str(e)}")
+        except Exception:
+            logger.exception("Error creating playlist")
             return None
 
     def get_all_playlists(self) -> List[dict]:
         """Get all playlists with their metadata."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute("""
@@ -1144,29 +1537,28 @@ class DatabaseManager:
                 """)
                 
                 rows = cursor.fetchall()
-                columns = [description[0] for description in cursor.description]
                 
                 playlists = []
                 for row in rows:
-                    playlist = dict(zip(columns, row))
+                    playlist = dict(row)
                     # Parse query criteria JSON if it exists
                     if playlist.get('query_criteria'):
                         try:
-                            playlist['query_criteria'] = json.loads(playlist['query_criteria'])
+                            playlist['query_criteria'] = _json_loads(playlist['query_criteria'])
                         except json.JSONDecodeError:
                             playlist['query_criteria'] = None
                     playlists.append(playlist)
                 
                 return playlists
                 
-        except Exception as e:
-            print(f"Error getting playlists: {str(e)}")
+        except Exception:
+            logger.exception("Error getting playlists")
             return []
 
     def get_playlist(self, playlist_id: int) -> Optional[dict]:
         """Get a specific playlist by ID."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute("""
@@ -1176,13 +1568,12 @@ class DatabaseManager:
                 
                 row = cursor.fetchone()
                 if row:
-                    columns = [description[0] for description in cursor.description]
-                    playlist = dict(zip(columns, row))
+                    playlist = dict(row)
                     
                     # Parse query criteria JSON if it exists
                     if playlist.get('query_criteria'):
                         try:
-                            playlist['query_criteria'] = json.loads(playlist['query_criteria'])
+                            playlist['query_criteria'] = _json_loads(playlist['query_criteria'])
                         except json.JSONDecodeError:
                             playlist['query_criteria'] = None
                     
@@ -1190,15 +1581,15 @@ class DatabaseManager:
                 else:
                     return None
                     
-        except Exception as e:
-            print(f"Error getting playlist: {str(e)}")
+        except Exception:
+            logger.exception("Error getting playlist")
             return None
 
     def update_playlist(self, playlist_id: int, name: str = None, description: str = None, 
                        color: str = None, is_query_based: bool = None, query_criteria: dict = None) -> bool:
         """Update playlist metadata."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
                 # Build dynamic update query
@@ -1219,7 +1610,7 @@ class DatabaseManager:
                     params.append(is_query_based)
                 if query_criteria is not None:
                     updates.append("query_criteria = ?")
-                    params.append(json.dumps(query_criteria))
+                    params.append(_json_dumps(query_criteria))
                 
                 if not updates:
                     return True  # Nothing to update
@@ -1230,130 +1621,126 @@ class DatabaseManager:
                 query = f"UPDATE playlists SET {', '.join(updates)} WHERE id = ?"
                 cursor.execute(query, params)
                 
-                conn.commit()
                 return cursor.rowcount > 0
                 
-        except Exception as e:
-            print(f"Error updating playlist: {str(e)}")
+        except Exception:
+            logger.exception("Error updating playlist")
             return False
 
     def delete_playlist(self, playlist_id: int) -> bool:
         """Delete a playlist and all its items."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                # Delete playlist items first (CASCADE should handle this, but being explicit)
-                cursor.execute("DELETE FROM playlist_items WHERE playlist_id = ?", (playlist_id,))
-                
-                # Delete the playlist
+                # playlist_items rows go with it via ON DELETE CASCADE (foreign_keys=ON)
                 cursor.execute("DELETE FROM playlists WHERE id = ?", (playlist_id,))
                 
-                conn.commit()
                 return cursor.rowcount > 0
                 
-        except Exception as e:
-            print(f"Error deleting playlist: {str(e)}")
+        except Exception:
+            logger.exception("Error deleting playlist")
             return False
 
     def add_song_to_playlist(self, playlist_id: int, music_file_id: int, position: int = None) -> bool:
         """Add a song to a playlist."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
                 # If no position specified, add to end
-                if position is None:
-                    cursor.execute("""
-                        SELECT COALESCE(MAX(position), 0) + 1 
-                        FROM playlist_items 
-                        WHERE playlist_id = ?
-                    """, (playlist_id,))
-                    position = cursor.fetchone()[0]
-                
-                cursor.execute("""
-                    INSERT INTO playlist_items (playlist_id, music_file_id, position)
-                    VALUES (?, ?, ?)
-                """, (playlist_id, music_file_id, position))
+                cursor.execute(_SQL_ADD_PLAYLIST_ITEM, (playlist_id, music_file_id, position, playlist_id))
                 
-                conn.commit()
                 return True
                 
-        except Exception as e:
-            print(f"Error adding song to playlist: {str(e)}")
+        except Exception:
+            logger.exception("Error adding song to playlist")
             return False
 
-    def remove_song_from_playlist(self, playlist_id: int, music_file_id: int) -> bool:
-        """Remove a song from a playlist."""
+    def add_songs_to_playlist(self, playlist_id: int, music_file_ids: List[int]) -> bool:
+        """Append many songs to a playlist, in order, with one executemany."""
+        if not music_file_ids:
+            return True
+        
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute("""
-                    DELETE FROM playlist_items 
-                    WHERE playlist_id = ? AND music_file_id = ?
-                """, (playlist_id, music_file_id))
+                cursor.execute(_SQL_LAST_PLAYLIST_POSITION, (playlist_id,))
+                last_position = cursor.fetchone()[0]
                 
-                conn.commit()
-                return cursor.rowcount > 0
+                cursor.executemany(_SQL_INSERT_PLAYLIST_ITEM, zip(repeat(playlist_id), music_file_ids,
+                         range(last_position + 1, last_position + 1 + len(music_file_ids))))
                 
-        except Exception as e:
-            print(f"Error removing song from playlist: {str(e)}")
+                return True
+                
+        except Exception:
+            logger.exception("Error adding songs to playlist")
             return False
 
-    def get_playlist_songs(self, playlist_id: int) -> List[dict]:
-        """Get all songs in a playlist with their metadata."""
+    def remove_song_from_playlist(self, playlist_id: int, music_file_id: int) -> bool:
+        """Remove a song from a playlist."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute("""
-                    SELECT mf.*, pi.position, pi.added_at
-                    FROM music_files mf
-                    JOIN playlist_items pi ON mf.id = pi.music_file_id
-                    WHERE pi.playlist_id = ?
-                    ORDER BY pi.position ASC
-                """, (playlist_id,))
+                cursor.execute(_SQL_REMOVE_PLAYLIST_ITEM, (playlist_id, music_file_id))
                 
-                rows = cursor.fetchall()
-                columns = [description[0] for description in cursor.description]
-                
-                songs = []
-                for row in rows:
-                    song = dict(zip(columns, row))
-                    # Parse cue points JSON if it exists
-                    if song.get('cue_points'):
-                        try:
-                            song['cue_points'] = json.loads(song['cue_points'])
-                        except json.JSONDecodeError:
-                            song['cue_points'] = []
-                    songs.append(song)
+                return cursor.rowcount > 0
                 
-                return songs
+        except Exception:
+            logger.exception("Error removing song from playlist")
+            return False
+
+    def iter_playlist_songs(self, playlist_id: int, include_cover_art: bool = False) -> Iterator[dict]:
+        """Yield the songs in a playlist, in order.
+        
+        The base64 cover art and raw ID3 JSON are left out unless
+        include_cover_art is set, since they dwarf the rest of the row.
+        See _iter_rows for how the connection lock is held.
+        """
+        columns = self._playlist_song_columns
+        if include_cover_art:
+            columns += ', mf.cover_art, mf.id3_metadata'
+        
+        for song in self._iter_rows(f'{columns}, pi.position, pi.added_at',
+                                    'music_files mf JOIN playlist_items pi ON mf.id = pi.music_file_id',
+                                    'pi.playlist_id = ?', (playlist_id,), ('pi.position', 'pi.id')):
+            # Parse cue points JSON if it exists
+            if song.get('cue_points'):
+                try:
+                    song['cue_points'] = _json_loads(song['cue_points'])
+                except json.JSONDecodeError:
+                    song['cue_points'] = []
+            yield song
+
+    def get_playlist_songs(self, playlist_id: int, include_cover_art: bool = False) -> List[dict]:
+        """Get all songs in a playlist with their metadata (see iter_playlist_songs)."""
+        try:
+            return list(self.iter_playlist_songs(playlist_id, include_cover_art))
                 
-        except Exception as e:
-            print(f"Error getting playlist songs: {str(e)}")
+        except Exception:
+            logger.exception("Error getting playlist songs")
             return []
 
     def clear_playlist(self, playlist_id: int) -> bool:
         """Remove all songs from a playlist."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute("DELETE FROM playlist_items WHERE playlist_id = ?", (playlist_id,))
                 
-                conn.commit()
                 return True
                 
-        except Exception as e:
-            print(f"Error clearing playlist: {str(e)}")
+        except Exception:
+            logger.exception("Error clearing playlist")
             return False
 
     def clear_all_data(self) -> bool:
         """Clear all data from the database (songs, playlists, settings)."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
                 # Clear all tables in the correct order to avoid foreign key constraints
@@ -1366,10 +1753,10 @@ class DatabaseManager:
                 # Reset auto-increment counters
                 cursor.execute("DELETE FROM sqlite_sequence WHERE name IN ('music_files', 'playlists', 'playlist_items', 'scan_locations')")
                 
-                conn.commit()
-                print("✅ All database data cleared successfully")
+                self._settings.clear()
+                logger.info("All database data cleared")
                 return True
                 
-        except Exception as e:
-            print(f"❌ Error clearing all database data: {str(e)}")
+        except Exception:
+            logger.exception("Error clearing all database data")
             return False
\ No newline at end of file
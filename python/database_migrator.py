@@ -1,10 +1,17 @@
 import sqlite3
 import os
+import re
 import json
 import logging
+import heapq
+import threading
+import time
+from contextlib import contextmanager
+from functools import cached_property
 from datetime import datetime
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass
+from urllib.parse import quote
+from typing import Iterator, List, Dict, Any, Optional, Sequence, Tuple
+from dataclasses import dataclass, field
 from enum import Enum
 
 logger = logging.getLogger(__name__)
@@ -16,21 +23,147 @@ class MigrationStatus(Enum):
     FAILED = "failed"
     ROLLED_BACK = "rolled_back"
 
-@dataclass
+@dataclass(frozen=True)
 class Migration:
     version: str
     name: str
     description: str
     up_sql: str
     down_sql: str
-    dependencies: List[str] = None
-    created_at: datetime = None
+    dependencies: Tuple[str, ...] = ()
+    created_at: datetime = field(default_factory=datetime.now)
 
-    def __post_init__(self):
-        if self.dependencies is None:
-            self.dependencies = []
-        if self.created_at is None:
-            self.created_at = datetime.now()
+# This would typically load from migration files
+# For now, we'll define them inline, once per process
+_MIGRATIONS: Tuple[Migration, ...] = (
+    Migration(
+        version="001",
+        name="add_cover_art_columns",
+        description="Add cover art related columns to music_files table",
+        up_sql="""
+            ALTER TABLE music_files ADD COLUMN cover_art TEXT;
+            ALTER TABLE music_files ADD COLUMN cover_art_extracted INTEGER DEFAULT 0;
+        """,
+        down_sql="""
+            -- Note: SQLite doesn't support DROP COLUMN directly
+            -- This would require recreating the table
+        """
+    ),
+    Migration(
+        version="002", 
+        name="add_rating_column",
+        description="Add rating column to music_files table",
+        up_sql="""
+            ALTER TABLE music_files ADD COLUMN rating INTEGER DEFAULT 0;
+        """,
+        down_sql="""
+            -- Note: SQLite doesn't support DROP COLUMN directly
+        """
+    ),
+    Migration(
+        version="003",
+        name="add_track_id_column", 
+        description="Add track_id column for unique track identification",
+        # SQLite can't ADD COLUMN ... UNIQUE; a unique index does the same job
+        # (and skips the NULLs of rows that have no track_id yet)
+        up_sql="""
+            ALTER TABLE music_files ADD COLUMN track_id TEXT;
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_music_files_track_id
+                ON music_files(track_id) WHERE track_id IS NOT NULL;
+        """,
+        down_sql="""
+            -- Note: SQLite doesn't support DROP COLUMN directly
+        """
+    ),
+    Migration(
+        version="004",
+        name="add_id3_metadata_columns",
+        description="Add comprehensive ID3 metadata columns",
+        # ADD COLUMN only rewrites the schema entry, never the rows, and
+        # execute_migration runs all 20 in one transaction. A copy-and-
+        # rename rebuild would rewrite every row and drop the indexes
+        # and playlist_items foreign keys on music_files.
+        up_sql="""
+            ALTER TABLE music_files ADD COLUMN title TEXT;
+            ALTER TABLE music_files ADD COLUMN artist TEXT;
+            ALTER TABLE music_files ADD COLUMN album TEXT;
+            ALTER TABLE music_files ADD COLUMN albumartist TEXT;
+            ALTER TABLE music_files ADD COLUMN date TEXT;
+            ALTER TABLE music_files ADD COLUMN year TEXT;
+            ALTER TABLE music_files ADD COLUMN genre TEXT;
+            ALTER TABLE music_files ADD COLUMN composer TEXT;
+            ALTER TABLE music_files ADD COLUMN tracknumber TEXT;
+            ALTER TABLE music_files ADD COLUMN discnumber TEXT;
+            ALTER TABLE music_files ADD COLUMN comment TEXT;
+            ALTER TABLE music_files ADD COLUMN initialkey TEXT;
+            ALTER TABLE music_files ADD COLUMN bpm_from_tags TEXT;
+            ALTER TABLE music_files ADD COLUMN website TEXT;
+            ALTER TABLE music_files ADD COLUMN isrc TEXT;
+            ALTER TABLE music_files ADD COLUMN language TEXT;
+            ALTER TABLE music_files ADD COLUMN organization TEXT;
+            ALTER TABLE music_files ADD COLUMN copyright TEXT;
+            ALTER TABLE music_files ADD COLUMN encodedby TEXT;
+            ALTER TABLE music_files ADD COLUMN id3_metadata TEXT;
+        """,
+        down_sql="""
+            -- Note: SQLite doesn't support DROP COLUMN directly
+        """
+    ),
+    Migration(
+        version="005",
+        name="add_analysis_tracking_columns",
+        description="Add columns for tracking analysis status and preventing reanalysis",
+        up_sql="""
+            ALTER TABLE music_files ADD COLUMN analysis_status TEXT DEFAULT 'pending';
+            ALTER TABLE music_files ADD COLUMN id3_tags_written INTEGER DEFAULT 0;
+            ALTER TABLE music_files ADD COLUMN prevent_reanalysis INTEGER DEFAULT 0;
+        """,
+        down_sql="""
+            -- Note: SQLite doesn't support DROP COLUMN directly
+        """
+    )
+)
+
+_SQL_COMMENT_RE = re.compile(r'--[^\n]*')
+_ADD_COLUMN_RE = re.compile(r'ALTER\s+TABLE\s+(\w+)\s+ADD\s+COLUMN\s+(\w+)[^;]*;', re.IGNORECASE)
+
+# Columns validate_schema() expects music_files to have
+_REQUIRED_COLUMNS = frozenset((
+    'id', 'filename', 'file_path', 'camelot_key', 'bpm', 
+    'energy_level', 'cover_art', 'cover_art_extracted', 'rating'
+))
+
+def _topo_sort(migrations: Sequence[Migration]) -> Tuple[Migration, ...]:
+    """Order migrations so each runs after its dependencies (Kahn's algorithm).
+    
+    Ties are broken by numeric version, so migrations without dependencies
+    keep their natural 001, 002, ... order.
+    """
+    by_version = {m.version: m for m in migrations}
+    indegree = {m.version: 0 for m in migrations}
+    dependents: Dict[str, List[str]] = {m.version: [] for m in migrations}
+    for m in migrations:
+        for dependency in m.dependencies:
+            if dependency not in by_version:
+                raise ValueError(f"Migration {m.version} depends on unknown migration {dependency}")
+            dependents[dependency].append(m.version)
+            indegree[m.version] += 1
+    
+    ready = [(int(v), v) for v, degree in indegree.items() if degree == 0]
+    heapq.heapify(ready)
+    ordered = []
+    while ready:
+        _, version = heapq.heappop(ready)
+        ordered.append(by_version[version])
+        for dependent in dependents[version]:
+            indegree[dependent] -= 1
+            if indegree[dependent] == 0:
+                heapq.heappush(ready, (int(dependent), dependent))
+    
+    if len(ordered) != len(migrations):
+        cyclic = sorted(v for v, degree in indegree.items() if degree > 0)
+        raise ValueError(f"Migration dependency cycle among: {', '.join(cyclic)}")
+    return tuple(ordered)
 
 class DatabaseMigrator:
     """Handles database schema migrations with rollback capabilities"""
@@ -38,14 +171,101 @@ class DatabaseMigrator:
     def __init__(self, db_path: str):
         self.db_path = db_path
         self.migrations_table = "schema_migrations"
-        self.migrations: List[Migration] = []
-        self._init_migrations_table()
-        self._load_migrations()
+        # The table name can't be a bound parameter, so every statement on it
+        # is formatted once here and reused verbatim (and statement-cached)
+        self._completed_versions_sql = f"SELECT version FROM {self.migrations_table} WHERE status = 'completed'"
+        # Number of known versions -> completed-versions query with that many placeholders
+        self._pending_sql: Dict[int, str] = {}
+        self._status_sql = f"SELECT status FROM {self.migrations_table} WHERE version = ?"
+        self._record_migration_sql = f'''
+            INSERT OR REPLACE INTO {self.migrations_table} 
+            (version, name, description, status, executed_at, execution_time_ms, error_message)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        '''
+        self._update_status_sql = f"UPDATE {self.migrations_table} SET status = ? WHERE version = ?"
+        self._completed_summary_sql = (
+            f"SELECT COUNT(*), MAX(version) FROM {self.migrations_table} WHERE status = 'completed'")
+        self._history_sql = f'''
+            SELECT version, name, description, status, executed_at, 
+                   execution_time_ms, error_message, created_at
+            FROM {self.migrations_table}
+            ORDER BY version
+        '''
+        # One connection for the migrator's lifetime, in autocommit mode so
+        # transactions are only the explicit BEGIN/COMMIT pairs below
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._tune_connection(self._conn)
+        # Read-only connection for status and history queries, so a UI
+        # polling them doesn't queue behind a running migrate() (WAL lets
+        # it read the last committed state meanwhile)
+        self._ro_lock = threading.RLock()
+        self._ro_conn = sqlite3.connect(f"file:{quote(os.path.abspath(self.db_path))}?mode=ro",
+                                        uri=True, check_same_thread=False)
+        self._ro_conn.row_factory = sqlite3.Row
+        self._ro_conn.execute("PRAGMA query_only=1")
+        self._ro_conn.execute("PRAGMA temp_store=MEMORY")
+        self._ro_conn.execute("PRAGMA cache_size=-16000")
+        self._ro_conn.execute("PRAGMA busy_timeout=5000")
+        # (schema_version, tables, music_files columns) from the last validate_schema()
+        self._schema_cache = None
+        # Latest migration version this instance has seen fully applied, so
+        # repeated migrate() calls skip even the is_up_to_date() query
+        self._migrated_through: Optional[str] = None
+        # The migrations table and catalog are set up on first use, so
+        # callers that only validate or back up never touch them
+        self._migrations_table_ready = False
+    
+    @classmethod
+    def _tune_connection(cls, conn: sqlite3.Connection):
+        """Apply the performance PRAGMAs every migrator connection runs with"""
+        conn.execute("PRAGMA journal_mode=WAL")  # Write-Ahead Logging
+        conn.execute("PRAGMA synchronous=NORMAL")  # One fsync per checkpoint, not per commit
+        conn.execute("PRAGMA temp_store=MEMORY")  # Store temp tables in memory
+        conn.execute("PRAGMA cache_size=-64000")  # ~64 MB page cache
+        conn.execute("PRAGMA busy_timeout=5000")  # Wait up to 5s for the app's own writers
+        conn.execute("PRAGMA foreign_keys=ON")  # Enforce foreign key constraints
+    
+    @contextmanager
+    def _cursor(self) -> Iterator[sqlite3.Cursor]:
+        """Cursor on the shared connection, held under the migrator lock"""
+        with self._lock:
+            cursor = self._conn.cursor()
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+    
+    @contextmanager
+    def _read_cursor(self) -> Iterator[sqlite3.Cursor]:
+        """Cursor on the read-only connection, independent of the writer's lock"""
+        with self._ro_lock:
+            cursor = self._ro_conn.cursor()
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+    
+    def close(self):
+        """Close the migrator's database connections"""
+        with self._ro_lock:
+            self._ro_conn.close()
+        with self._lock:
+            self._conn.close()
     
     def _init_migrations_table(self):
-        """Initialize the migrations tracking table"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        """Initialize the migrations tracking table, once per migrator"""
+        if self._migrations_table_ready:
+            return
+        # Existing databases only need a read of sqlite_master, not a write
+        with self._read_cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
+                           (self.migrations_table,))
+            if cursor.fetchone() is not None:
+                self._migrations_table_ready = True
+                return
+        with self._cursor() as cursor:
             cursor.execute(f'''
                 CREATE TABLE IF NOT EXISTS {self.migrations_table} (
                     version TEXT PRIMARY KEY,
@@ -58,156 +278,90 @@ class DatabaseMigrator:
                     created_at TEXT DEFAULT CURRENT_TIMESTAMP
                 )
             ''')
-            conn.commit()
+        self._migrations_table_ready = True
     
-    def _load_migrations(self):
+    @cached_property
+    def migrations(self) -> Sequence[Migration]:
+        """All available migrations, loaded on first access"""
+        return self._load_migrations()
+    
+    def _load_migrations(self) -> Tuple[Migration, ...]:
         """Load all available migrations"""
-        # This would typically load from migration files
-        # For now, we'll define them inline
-        self.migrations = [
-            Migration(
-                version="001",
-                name="add_cover_art_columns",
-                description="Add cover art related columns to music_files table",
-                up_sql="""
-                    ALTER TABLE music_files ADD COLUMN cover_art TEXT;
-                    ALTER TABLE music_files ADD COLUMN cover_art_extracted INTEGER DEFAULT 0;
-                """,
-                down_sql="""
-                    -- Note: SQLite doesn't support DROP COLUMN directly
-                    -- This would require recreating the table
-                """
-            ),
-            Migration(
-                version="002", 
-                name="add_rating_column",
-                description="Add rating column to music_files table",
-                up_sql="""
-                    ALTER TABLE music_files ADD COLUMN rating INTEGER DEFAULT 0;
-                """,
-                down_sql="""
-                    -- Note: SQLite doesn't support DROP COLUMN directly
-                """
-            ),
-            Migration(
-                version="003",
-                name="add_track_id_column", 
-                description="Add track_id column for unique track identification",
-                up_sql="""
-                    ALTER TABLE music_files ADD COLUMN track_id TEXT UNIQUE;
-                """,
-                down_sql="""
-                    -- Note: SQLite doesn't support DROP COLUMN directly
-                """
-            ),
-            Migration(
-                version="004",
-                name="add_id3_metadata_columns",
-                description="Add comprehensive ID3 metadata columns",
-                up_sql="""
-                    ALTER TABLE music_files ADD COLUMN title TEXT;
-                    ALTER TABLE music_files ADD COLUMN artist TEXT;
-                    ALTER TABLE music_files ADD COLUMN album TEXT;
-                    ALTER TABLE music_files ADD COLUMN albumartist TEXT;
-                    ALTER TABLE music_files ADD COLUMN date TEXT;
-                    ALTER TABLE music_files ADD COLUMN year TEXT;
-                    ALTER TABLE music_files ADD COLUMN genre TEXT;
-                    ALTER TABLE music_files ADD COLUMN composer TEXT;
-                    ALTER TABLE music_files ADD COLUMN tracknumber TEXT;
-                    ALTER TABLE music_files ADD COLUMN discnumber TEXT;
-                    ALTER TABLE music_files ADD COLUMN comment TEXT;
-                    ALTER TABLE music_files ADD COLUMN initialkey TEXT;
-                    ALTER TABLE music_files ADD COLUMN bpm_from_tags TEXT;
-                    ALTER TABLE music_files ADD COLUMN website TEXT;
-                    ALTER TABLE music_files ADD COLUMN isrc TEXT;
-                    ALTER TABLE music_files ADD COLUMN language TEXT;
-                    ALTER TABLE music_files ADD COLUMN organization TEXT;
-                    ALTER TABLE music_files ADD COLUMN copyright TEXT;
-                    ALTER TABLE music_files ADD COLUMN encodedby TEXT;
-                    ALTER TABLE music_files ADD COLUMN id3_metadata TEXT;
-                """,
-                down_sql="""
-                    -- Note: SQLite doesn't support DROP COLUMN directly
-                """
-            ),
-            Migration(
-                version="005",
-                name="add_analysis_tracking_columns",
-                description="Add columns for tracking analysis status and preventing reanalysis",
-                up_sql="""
-                    ALTER TABLE music_files ADD COLUMN analysis_status TEXT DEFAULT 'pending';
-                    ALTER TABLE music_files ADD COLUMN id3_tags_written INTEGER DEFAULT 0;
-                    ALTER TABLE music_files ADD COLUMN prevent_reanalysis INTEGER DEFAULT 0;
-                """,
-                down_sql="""
-                    -- Note: SQLite doesn't support DROP COLUMN directly
-                """
-            )
-        ]
+        return _topo_sort(_MIGRATIONS)
+    
+    def is_up_to_date(self) -> bool:
+        """Check whether every known migration is recorded as completed.
+        
+        One aggregate over schema_migrations, compared with the count and
+        latest version of the catalog, so a process starting against an
+        up-to-date database learns it without the per-version pending
+        query. The record lives in the migrations table rather than PRAGMA
+        user_version, which DatabaseManager uses for its own schema.
+        """
+        with self._read_cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
+                           (self.migrations_table,))
+            if cursor.fetchone() is None:
+                return not self.migrations
+            cursor.execute(self._completed_summary_sql)
+            completed, latest = cursor.fetchone()
+        return (completed, latest) == (len(self.migrations),
+                                       max((m.version for m in self.migrations), default=None))
     
     def get_pending_migrations(self) -> List[Migration]:
         """Get migrations that haven't been executed yet"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute(f'''
-                SELECT version FROM {self.migrations_table} 
-                WHERE status = 'completed'
-            ''')
-            completed_versions = {row[0] for row in cursor.fetchall()}
+        self._init_migrations_table()
+        if not self.migrations:
+            return []
+        
+        # Only ask about the known versions; version is the primary key, so
+        # each IN value is an index seek rather than a scan of the history
+        sql = self._pending_sql.get(len(self.migrations))
+        if sql is None:
+            placeholders = ','.join('?' * len(self.migrations))
+            sql = self._pending_sql[len(self.migrations)] = (
+                f"{self._completed_versions_sql} AND version IN ({placeholders})")
+        with self._read_cursor() as cursor:
+            cursor.execute(sql, [m.version for m in self.migrations])
+            completed_versions = {row[0] for row in cursor}
         
         return [m for m in self.migrations if m.version not in completed_versions]
     
     def get_migration_status(self, version: str) -> Optional[MigrationStatus]:
         """Get the status of a specific migration"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute(f'''
-                SELECT status FROM {self.migrations_table} 
-                WHERE version = ?
-            ''', (version,))
+        self._init_migrations_table()
+        with self._read_cursor() as cursor:
+            cursor.execute(self._status_sql, (version,))
             result = cursor.fetchone()
             return MigrationStatus(result[0]) if result else None
     
     def execute_migration(self, migration: Migration) -> bool:
         """Execute a single migration"""
         logger.info(f"Executing migration {migration.version}: {migration.name}")
+        self._init_migrations_table()
         
-        start_time = datetime.now()
+        executed_at = datetime.now().isoformat(timespec='seconds')
+        start_ns = time.perf_counter_ns()
         
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
+            with self._cursor() as cursor:
+                # Execute the migration SQL and record its completion in one transaction
+                cursor.execute('BEGIN')
+                self._run_migration_body(cursor, self._without_existing_columns(cursor, migration.up_sql))
                 
-                # Record migration start
-                cursor.execute(f'''
-                    INSERT OR REPLACE INTO {self.migrations_table} 
-                    (version, name, description, status, executed_at)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (
+                # Record successful completion
+                execution_time = (time.perf_counter_ns() - start_ns) / 1e6
+                cursor.execute(self._record_migration_sql, (
                     migration.version,
                     migration.name,
                     migration.description,
-                    MigrationStatus.RUNNING.value,
-                    start_time.isoformat()
-                ))
-                conn.commit()
-                
-                # Execute the migration SQL
-                cursor.executescript(migration.up_sql)
-                conn.commit()
-                
-                # Record successful completion
-                execution_time = (datetime.now() - start_time).total_seconds() * 1000
-                cursor.execute(f'''
-                    UPDATE {self.migrations_table} 
-                    SET status = ?, execution_time_ms = ?
-                    WHERE version = ?
-                ''', (
                     MigrationStatus.COMPLETED.value,
+                    executed_at,
                     execution_time,
-                    migration.version
+                    None
                 ))
-                conn.commit()
+                cursor.execute('COMMIT')
+                self._schema_cache = None
                 
                 logger.info(f"Migration {migration.version} completed successfully in {execution_time:.2f}ms")
                 return True
@@ -217,64 +371,115 @@ class DatabaseMigrator:
             
             # Record failure
             try:
-                with sqlite3.connect(self.db_path) as conn:
-                    cursor = conn.cursor()
-                    cursor.execute(f'''
-                        UPDATE {self.migrations_table} 
-                        SET status = ?, error_message = ?
-                        WHERE version = ?
-                    ''', (
+                with self._cursor() as cursor:
+                    if self._conn.in_transaction:
+                        cursor.execute('ROLLBACK')
+                    cursor.execute(self._record_migration_sql, (
+                        migration.version,
+                        migration.name,
+                        migration.description,
                         MigrationStatus.FAILED.value,
-                        str(e),
-                        migration.version
+                        executed_at,
+                        None,
+                        str(e)
                     ))
-                    conn.commit()
             except Exception as record_error:
                 logger.error(f"Failed to record migration failure: {record_error}")
             
             return False
     
+    @staticmethod
+    def _run_migration_body(cursor: sqlite3.Cursor, sql: str):
+        """Run a migration script statement by statement under a savepoint.
+        
+        Unlike executescript, this never commits the caller's transaction, so
+        the script joins whatever BEGIN the caller opened. A failing statement
+        undoes the whole script before the error is re-raised.
+        """
+        statements = [statement.strip() for statement in _SQL_COMMENT_RE.sub('', sql).split(';')]
+        cursor.execute('SAVEPOINT migration_body')
+        try:
+            for statement in statements:
+                if statement:
+                    cursor.execute(statement)
+        except Exception:
+            cursor.execute('ROLLBACK TO migration_body')
+            cursor.execute('RELEASE migration_body')
+            raise
+        cursor.execute('RELEASE migration_body')
+    
+    @staticmethod
+    def _without_existing_columns(cursor: sqlite3.Cursor, up_sql: str) -> str:
+        """Drop ADD COLUMN statements for columns the table already has.
+        
+        Databases created by DatabaseManager already have these columns, and
+        a migration retried after a partial failure may have added some.
+        """
+        columns: Dict[str, set] = {}
+        
+        def keep_if_missing(match):
+            table, column = match.group(1), match.group(2)
+            if table not in columns:
+                cursor.execute(f"PRAGMA table_info({table})")
+                columns[table] = {row[1] for row in cursor}
+            if column in columns[table]:
+                return ''
+            return match.group(0)
+        
+        return _ADD_COLUMN_RE.sub(keep_if_missing, up_sql)
+    
     def rollback_migration(self, migration: Migration) -> bool:
         """Rollback a migration"""
         logger.info(f"Rolling back migration {migration.version}: {migration.name}")
+        self._init_migrations_table()
         
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # Execute rollback SQL
-                if migration.down_sql.strip():
-                    cursor.executescript(migration.down_sql)
-                    conn.commit()
+            with self._cursor() as cursor:
+                # Execute rollback SQL and update the status atomically
+                cursor.execute('BEGIN')
+                self._run_migration_body(cursor, migration.down_sql)
                 
                 # Update status
-                cursor.execute(f'''
-                    UPDATE {self.migrations_table} 
-                    SET status = ?
-                    WHERE version = ?
-                ''', (
+                cursor.execute(self._update_status_sql, (
                     MigrationStatus.ROLLED_BACK.value,
                     migration.version
                 ))
-                conn.commit()
+                cursor.execute('COMMIT')
+                self._migrated_through = None
                 
                 logger.info(f"Migration {migration.version} rolled back successfully")
                 return True
                 
         except Exception as e:
             logger.error(f"Failed to rollback migration {migration.version}: {e}")
+            with self._lock:
+                if self._conn.in_transaction:
+                    self._conn.execute('ROLLBACK')
             return False
     
     def migrate(self) -> bool:
         """Run all pending migrations"""
+        latest = self.migrations[-1].version if self.migrations else None
+        if latest is not None and self._migrated_through == latest:
+            return True
+        if self.is_up_to_date():
+            self._migrated_through = latest
+            return True
+        
         pending = self.get_pending_migrations()
         
         if not pending:
             logger.info("No pending migrations")
+            self._migrated_through = latest
             return True
         
         logger.info(f"Found {len(pending)} pending migrations")
         
+        if len(pending) > 1 and self._migrate_batch(pending):
+            logger.info(f"Migration process completed: {len(pending)}/{len(pending)} successful")
+            self._migrated_through = latest
+            return True
+        
         success_count = 0
         for migration in pending:
             if self.execute_migration(migration):
@@ -284,56 +489,96 @@ class DatabaseMigrator:
                 break
         
         logger.info(f"Migration process completed: {success_count}/{len(pending)} successful")
-        return success_count == len(pending)
+        if success_count == len(pending):
+            self._migrated_through = latest
+            return True
+        return False
+    
+    def _migrate_batch(self, pending: List[Migration]) -> bool:
+        """Run all pending migrations in a single transaction.
+        
+        Returns False after rolling everything back if any of them fails, so
+        that migrate() can rerun them one at a time to isolate the failure.
+        """
+        self._init_migrations_table()
+        executed_at = datetime.now().isoformat(timespec='seconds')
+        batch_start_ns = time.perf_counter_ns()
+        
+        try:
+            with self._cursor() as cursor:
+                cursor.execute('BEGIN IMMEDIATE')
+                
+                records = []
+                for m in pending:
+                    start_ns = time.perf_counter_ns()
+                    self._run_migration_body(cursor, self._without_existing_columns(cursor, m.up_sql))
+                    records.append((m.version, m.name, m.description, MigrationStatus.COMPLETED.value,
+                                    executed_at, (time.perf_counter_ns() - start_ns) / 1e6, None))
+                
+                cursor.executemany(self._record_migration_sql, records)
+                cursor.execute('COMMIT')
+                self._schema_cache = None
+                
+                execution_time = (time.perf_counter_ns() - batch_start_ns) / 1e6
+                logger.info(f"Ran {len(pending)} migrations in one batch in {execution_time:.2f}ms")
+                return True
+                
+        except Exception as e:
+            logger.warning(f"Batched migration failed ({e}), retrying migrations one at a time")
+            with self._lock:
+                if self._conn.in_transaction:
+                    self._conn.execute('ROLLBACK')
+            return False
     
     def get_migration_history(self) -> List[Dict[str, Any]]:
         """Get the complete migration history"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute(f'''
-                SELECT version, name, description, status, executed_at, 
-                       execution_time_ms, error_message, created_at
-                FROM {self.migrations_table}
-                ORDER BY version
-            ''')
+        self._init_migrations_table()
+        with self._read_cursor() as cursor:
+            cursor.execute(self._history_sql)
             
-            columns = [desc[0] for desc in cursor.description]
-            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+            return [dict(row) for row in cursor]
     
     def validate_schema(self) -> Dict[str, Any]:
         """Validate the current database schema"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Get table information
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-            tables = [row[0] for row in cursor.fetchall()]
-            
-            # Get music_files table structure
-            cursor.execute("PRAGMA table_info(music_files)")
-            music_files_columns = [row[1] for row in cursor.fetchall()]
-            
-            # Check for required columns
-            required_columns = [
-                'id', 'filename', 'file_path', 'camelot_key', 'bpm', 
-                'energy_level', 'cover_art', 'cover_art_extracted', 'rating'
-            ]
-            
-            missing_columns = [col for col in required_columns if col not in music_files_columns]
+        with self._read_cursor() as cursor:
+            # The schema cookie changes with every schema change, so the
+            # table scans below only rerun after the schema actually changed
+            schema_version = cursor.execute("PRAGMA schema_version").fetchone()[0]
+            if self._schema_cache is None or self._schema_cache[0] != schema_version:
+                # Get table information
+                cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+                tables = [row[0] for row in cursor]
+                
+                # Get music_files table structure
+                cursor.execute("PRAGMA table_info(music_files)")
+                music_files_columns = [row[1] for row in cursor]
+                
+                self._schema_cache = (schema_version, tables, music_files_columns)
             
-            return {
-                "tables": tables,
-                "music_files_columns": music_files_columns,
-                "missing_required_columns": missing_columns,
-                "is_valid": len(missing_columns) == 0,
-                "last_checked": datetime.now().isoformat()
-            }
+            _, tables, music_files_columns = self._schema_cache
+        
+        # Check for required columns
+        missing_columns = sorted(_REQUIRED_COLUMNS.difference(music_files_columns))
+        
+        return {
+            "tables": list(tables),
+            "music_files_columns": list(music_files_columns),
+            "missing_required_columns": missing_columns,
+            "is_valid": len(missing_columns) == 0,
+            "last_checked": datetime.now().isoformat()
+        }
     
     def backup_database(self, backup_path: str) -> bool:
         """Create a backup of the database"""
         try:
-            import shutil
-            shutil.copy2(self.db_path, backup_path)
+            # SQLite's online backup copies a consistent snapshot, including
+            # pages still in the WAL, which a plain file copy could miss
+            dst = sqlite3.connect(backup_path)
+            try:
+                with self._lock:
+                    self._conn.backup(dst, pages=1024)
+            finally:
+                dst.close()
             logger.info(f"Database backed up to {backup_path}")
             return True
         except Exception as e:
@@ -343,8 +588,15 @@ class DatabaseMigrator:
     def restore_database(self, backup_path: str) -> bool:
         """Restore database from backup"""
         try:
-            import shutil
-            shutil.copy2(backup_path, self.db_path)
+            # Copy pages into the open connection, so it stays valid afterwards
+            src = sqlite3.connect(backup_path)
+            try:
+                with self._lock:
+                    src.backup(self._conn, pages=1024)
+                    self._schema_cache = None
+                    self._migrated_through = None
+            finally:
+                src.close()
             logger.info(f"Database restored from {backup_path}")
             return True
         except Exception as e:
@@ -355,13 +607,21 @@ def run_migrations(db_path: str) -> bool:
     """Convenience function to run migrations"""
     migrator = DatabaseMigrator(db_path)
     
-    # Create backup before migration
-    backup_path = f"{db_path}.backup.{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-    if migrator.backup_database(backup_path):
-        logger.info(f"Backup created: {backup_path}")
-    
-    # Run migrations
-    success = migrator.migrate()
+    try:
+        # Most starts find nothing to do; don't back up the library for those
+        if migrator.is_up_to_date():
+            logger.info("No pending migrations")
+            return True
+        
+        # Create backup before migration
+        backup_path = f"{db_path}.backup.{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        if migrator.backup_database(backup_path):
+            logger.info(f"Backup created: {backup_path}")
+        
+        # Run migrations
+        success = migrator.migrate()
+    finally:
+        migrator.close()
     
     if success:
         logger.info("All migrations completed successfully")
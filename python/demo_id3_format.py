@@ -4,11 +4,19 @@ Demonstration script showing the exact ID3 tag format being applied.
 This script shows examples of how files will be renamed and tagged.
 """
 
+import sys
+
+from constants import CAMELOT_TRACK_NUMBERS
+
+
 def demonstrate_id3_format():
     """Demonstrate the ID3 tag format being applied."""
     
-    print("🎵 Mixed In Key - ID3 Tag Format Demonstration")
-    print("=" * 50)
+    # Collected and written out in one go at the end
+    lines = [
+        "🎵 Mixed In Key - ID3 Tag Format Demonstration",
+        "=" * 50,
+    ]
     
     # Example song data
     example_songs = [
@@ -50,8 +58,7 @@ def demonstrate_id3_format():
         }
     ]
     
-    print("\n📁 FILE RENAMING EXAMPLES:")
-    print("-" * 30)
+    lines += ["\n📁 FILE RENAMING EXAMPLES:", "-" * 30]
     
     for song in example_songs:
         # Extract song name (remove artist prefix)
@@ -67,12 +74,13 @@ def demonstrate_id3_format():
         # Create new filename
         new_filename = f"{int(song['bpm'])}BPM_{song['camelot_key']}_{clean_song_name}.mp3"
         
-        print(f"Original: {song['original_title']}.mp3")
-        print(f"New:     {new_filename}")
-        print()
+        lines += [
+            f"Original: {song['original_title']}.mp3",
+            f"New:     {new_filename}",
+            "",
+        ]
     
-    print("\n📝 ID3 TAG EXAMPLES:")
-    print("-" * 30)
+    lines += ["\n📝 ID3 TAG EXAMPLES:", "-" * 30]
     
     for song in example_songs:
         # Extract song name
@@ -88,43 +96,50 @@ def demonstrate_id3_format():
         comment = f"{song['camelot_key']} - Energy {song['energy_level']}"
         
         # Calculate track number from camelot key
-        track_num = int(''.join(filter(str.isdigit, song['camelot_key'])))
+        track_num = CAMELOT_TRACK_NUMBERS[song['camelot_key']]
         
-        print(f"🎵 {song['original_title']}")
-        print(f"   Title:     {new_title}")
-        print(f"   Comment:   {comment}")
-        print(f"   Track #:   {track_num}")
-        print(f"   Artist:    {song['artist']} (preserved)")
-        print(f"   Album:     {song['album']} (preserved)")
-        print(f"   Genre:     {song['genre']} (preserved)")
-        print()
+        lines += [
+            f"🎵 {song['original_title']}",
+            f"   Title:     {new_title}",
+            f"   Comment:   {comment}",
+            f"   Track #:   {track_num}",
+            f"   Artist:    {song['artist']} (preserved)",
+            f"   Album:     {song['album']} (preserved)",
+            f"   Genre:     {song['genre']} (preserved)",
+            "",
+        ]
     
-    print("\n🔧 TECHNICAL DETAILS:")
-    print("-" * 30)
-    print("• Title format: {BPM}BPM_{CamelotKey}_{SongName}")
-    print("• Comment format: {CamelotKey} - Energy {Level}")
-    print("• Track number: Extracted from Camelot key (1-12)")
-    print("• Original metadata: Artist, Album, Genre preserved")
-    print("• File renaming: Automatic after ID3 tag updates")
-    print("• Database sync: File paths updated automatically")
+    lines += [
+        "\n🔧 TECHNICAL DETAILS:",
+        "-" * 30,
+        "• Title format: {BPM}BPM_{CamelotKey}_{SongName}",
+        "• Comment format: {CamelotKey} - Energy {Level}",
+        "• Track number: Extracted from Camelot key (1-12)",
+        "• Original metadata: Artist, Album, Genre preserved",
+        "• File renaming: Automatic after ID3 tag updates",
+        "• Database sync: File paths updated automatically",
+    ]
     
-    print("\n📊 CAMELOT WHEEL TRACK NUMBERS:")
-    print("-" * 30)
+    lines += ["\n📊 CAMELOT WHEEL TRACK NUMBERS:", "-" * 30]
     camelot_keys = ["1A", "2A", "3A", "4A", "5A", "6A", "7A", "8A", "9A", "10A", "11A", "12A"]
-    for key in camelot_keys:
-        track_num = int(''.join(filter(str.isdigit, key)))
-        print(f"  {key} → Track {track_num}")
+    lines += [f"  {key} → Track {CAMELOT_TRACK_NUMBERS[key]}" for key in camelot_keys]
+    
+    lines += [
+        "\n🎯 WHAT HAPPENS AUTOMATICALLY:",
+        "-" * 30,
+        "1. Song is analyzed for key, BPM, and energy",
+        "2. ID3 tags are updated with new format",
+        "3. File is renamed to new format",
+        "4. Database is updated with new file path",
+        "5. All operations happen in the Python backend",
+    ]
     
-    print("\n🎯 WHAT HAPPENS AUTOMATICALLY:")
-    print("-" * 30)
-    print("1. Song is analyzed for key, BPM, and energy")
-    print("2. ID3 tags are updated with new format")
-    print("3. File is renamed to new format")
-    print("4. Database is updated with new file path")
-    print("5. All operations happen in the Python backend")
+    lines += [
+        "\n✨ READY TO USE!",
+        "The system will automatically apply this format to every analyzed song.",
+    ]
     
-    print("\n✨ READY TO USE!")
-    print("The system will automatically apply this format to every analyzed song.")
+    sys.stdout.write("\n".join(lines) + "\n")
 
 if __name__ == "__main__":
     demonstrate_id3_format()
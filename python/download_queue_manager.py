@@ -3,12 +3,16 @@ Download Queue Manager for YouTube Music Downloads
 Manages download tasks with priority and status tracking
 """
 
+import heapq
+import itertools
 import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from enum import Enum
-from dataclasses import dataclass
-from typing import List, Optional, Callable
-import queue
+from functools import lru_cache
+from types import MappingProxyType
+from dataclasses import dataclass, field, fields
+from typing import Dict, FrozenSet, Iterable, List, Optional, Callable, Tuple
 import logging
 
 class DownloadPriority(Enum):
@@ -24,6 +28,28 @@ class DownloadStatus(Enum):
     FAILED = "failed"
     CANCELLED = "cancelled"
 
+# Statuses each kind of callback is notified for
+_PROGRESS_EVENTS = frozenset({DownloadStatus.DOWNLOADING})
+_COMPLETION_EVENTS = frozenset({DownloadStatus.COMPLETED})
+_ERROR_EVENTS = frozenset({DownloadStatus.FAILED})
+
+# Statuses a task never leaves on its own; clear_completed_tasks drops these
+_FINAL_STATES = frozenset({DownloadStatus.COMPLETED, DownloadStatus.FAILED, DownloadStatus.CANCELLED})
+
+def _slotted(cls):
+    """Rebuild a dataclass with __slots__ for its fields.
+    
+    Same as dataclass(slots=True), which needs Python 3.10. Field defaults
+    are dropped from the class body since they would clash with the slots;
+    the generated __init__ already carries them.
+    """
+    names = tuple(f.name for f in fields(cls))
+    namespace = {key: value for key, value in cls.__dict__.items()
+                 if key not in names and key not in ('__dict__', '__weakref__')}
+    namespace['__slots__'] = names
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+@_slotted
 @dataclass
 class DownloadTask:
     id: str
@@ -35,39 +61,92 @@ class DownloadTask:
     status: DownloadStatus = DownloadStatus.PENDING
     progress: float = 0.0
     error_message: Optional[str] = None
+    # created_at/started_at/completed_at come from time.monotonic() and are
+    # only meaningful relative to each other; created_wall is the wall-clock
+    # time the task was created, for display
     created_at: float = 0.0
     started_at: Optional[float] = None
     completed_at: Optional[float] = None
+    created_wall: float = 0.0
+    # Set by cancel_download; checked by the download between steps
+    cancel_event: threading.Event = field(default_factory=threading.Event, repr=False, compare=False)
     
     def __post_init__(self):
         if self.created_at == 0.0:
-            self.created_at = time.time()
+            self.created_at = time.monotonic()
+        if self.created_wall == 0.0:
+            self.created_wall = time.time()
 
 class DownloadQueueManager:
-    def __init__(self):
-        self._queue = queue.PriorityQueue()
+    def __init__(self, max_concurrent: int = 3):
+        # (-priority, sequence, task) heap, guarded by _lock; the
+        # scheduler sleeps on _cond until a task is pushed and a download
+        # slot is free, or the worker is stopped. The sequence number is
+        # drawn from _seq under the lock, so equal priorities run first in,
+        # first out and the task itself is never compared. Entries hold the
+        # task object rather than its id, so an entry left behind by a
+        # cancelled and purged task can't start a new task queued later
+        # under the same id.
+        self._heap: List[Tuple[int, int, DownloadTask]] = []
+        self._seq = itertools.count()
+        # Heap entries left behind by cancelled tasks; once they make up
+        # more than half the heap it is rebuilt without them
+        self._cancelled_in_heap = 0
         self._tasks: dict[str, DownloadTask] = {}
-        self._worker_thread: Optional[threading.Thread] = None
-        self._stop_event = threading.Event()
+        # Read-only copy of _tasks, republished whole after every change to
+        # its membership so get_task/get_all_tasks can read without the lock
+        self._tasks_snapshot = MappingProxyType({})
+        # Ids of the tasks in each status, in the order they got there (dicts
+        # as ordered sets); kept in step with _tasks by _set_status_locked
+        self._by_status: dict[DownloadStatus, dict[str, None]] = {status: {} for status in DownloadStatus}
+        # The scheduler thread pops tasks in priority order and hands them to
+        # the executor, keeping at most _max_concurrent of them in flight
+        self._scheduler_thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._max_concurrent = max_concurrent
+        self._active = 0
         self._lock = threading.Lock()
-        self._callbacks: List[Callable[[DownloadTask], None]] = []
+        self._cond = threading.Condition(self._lock)
+        # callback -> statuses it wants to hear about (None for every update)
+        self._callbacks: Dict[Callable[[DownloadTask], None], Optional[FrozenSet[DownloadStatus]]] = {}
+        # Immutable copy of _callbacks.items(), republished by add_callback so
+        # notifications can iterate it without the lock
+        self._callbacks_snapshot: Tuple[Tuple[Callable[[DownloadTask], None], Optional[FrozenSet[DownloadStatus]]], ...] = ()
         self._is_running = False
         
     def add_task(self, task: DownloadTask) -> bool:
         """Add a download task to the queue"""
+        return self.add_tasks((task,))
+    
+    def add_tasks(self, tasks: Iterable[DownloadTask]) -> bool:
+        """Add several download tasks to the queue at once.
+        
+        The lock is taken and the task snapshot republished once for the
+        whole batch, rather than once per task. A task whose id is already
+        known is rejected rather than replacing the existing one, which may
+        still be queued or running; returns False if any task was rejected.
+        """
         try:
+            all_added = True
             with self._lock:
-                self._tasks[task.id] = task
-                # Priority queue uses negative priority for max-heap behavior
-                self._queue.put((-task.priority.value, task.created_at, task.id))
+                for task in tasks:
+                    if task.id in self._tasks:
+                        logging.warning("Download task %s already exists; not adding it again", task.id)
+                        all_added = False
+                        continue
+                    self._tasks[task.id] = task
+                    self._by_status[task.status][task.id] = None
+                    self._push_locked(task)
+                self._publish_tasks_locked()
+                self._cond.notify()
                 
             # Start worker if not running
             if not self._is_running:
                 self.start_worker()
                 
-            return True
+            return all_added
         except Exception as e:
-            logging.error(f"Failed to add download task: {e}")
+            logging.error("Failed to add download tasks: %s", e)
             return False
     
     def remove_task(self, task_id: str) -> bool:
@@ -76,97 +155,193 @@ class DownloadQueueManager:
             with self._lock:
                 if task_id in self._tasks:
                     task = self._tasks[task_id]
-                    task.status = DownloadStatus.CANCELLED
+                    if task.status is DownloadStatus.PENDING:
+                        self._cancelled_in_heap += 1
+                    self._set_status_locked(task, DownloadStatus.CANCELLED)
+                    task.cancel_event.set()
+                    if self._cancelled_in_heap > len(self._heap) // 2:
+                        self._compact_heap_locked()
                     return True
             return False
         except Exception as e:
-            logging.error(f"Failed to remove download task: {e}")
+            logging.error("Failed to remove download task: %s", e)
             return False
     
+    def _push_locked(self, task: DownloadTask):
+        """Queue a task for the scheduler; caller holds _lock.
+        
+        The heap and the task index share _lock, so there is no second lock
+        to take here and no ordering between locks to get wrong.
+        """
+        # Heap uses negative priority for max-heap behavior
+        heapq.heappush(self._heap, (-task.priority.value, next(self._seq), task))
+    
+    def _compact_heap_locked(self):
+        """Drop the entries of cancelled or forgotten tasks from the heap; caller holds _lock"""
+        self._heap = [entry for entry in self._heap if self._is_queued_locked(entry[2])]
+        heapq.heapify(self._heap)
+        self._cancelled_in_heap = 0
+    
+    def _is_queued_locked(self, task: DownloadTask) -> bool:
+        """Whether a heap entry's task is still waiting to run; caller holds _lock"""
+        return self._tasks.get(task.id) is task and task.status is DownloadStatus.PENDING
+    
+    def _set_status_locked(self, task: DownloadTask, status: DownloadStatus):
+        """Change a task's status and the status index; caller holds _lock"""
+        self._by_status[task.status].pop(task.id, None)
+        task.status = status
+        self._by_status[status][task.id] = None
+    
+    def _set_status(self, task: DownloadTask, status: DownloadStatus):
+        """Change a task's status and the status index"""
+        with self._lock:
+            self._set_status_locked(task, status)
+    
+    def _set_status_if_current(self, task: DownloadTask, status: DownloadStatus,
+                               only_from: Optional[DownloadStatus] = None) -> bool:
+        """Like _set_status, but only while the task is still the one queued under its id.
+        
+        A running download can be cleared out of the queue (e.g. cancelled,
+        then purged by clear_completed_tasks); its later status writes must
+        not put it back into the status index. With only_from, the status
+        is also left alone unless it is currently only_from, so a download
+        finishing cannot undo a cancel that landed after its last check.
+        """
+        with self._lock:
+            if self._tasks.get(task.id) is not task:
+                return False
+            if only_from is not None and task.status is not only_from:
+                return False
+            self._set_status_locked(task, status)
+            return True
+    
+    def _publish_tasks_locked(self):
+        """Publish a fresh read-only snapshot of _tasks; caller holds _lock"""
+        self._tasks_snapshot = MappingProxyType(dict(self._tasks))
+    
     def get_task(self, task_id: str) -> Optional[DownloadTask]:
         """Get a task by ID"""
-        with self._lock:
-            return self._tasks.get(task_id)
+        return self._tasks_snapshot.get(task_id)
     
     def get_all_tasks(self) -> List[DownloadTask]:
         """Get all tasks"""
-        with self._lock:
-            return list(self._tasks.values())
+        return list(self._tasks_snapshot.values())
     
     def get_tasks_by_status(self, status: DownloadStatus) -> List[DownloadTask]:
         """Get tasks filtered by status"""
         with self._lock:
-            return [task for task in self._tasks.values() if task.status == status]
+            return [self._tasks[task_id] for task_id in self._by_status[status]]
     
-    def add_callback(self, callback: Callable[[DownloadTask], None]):
-        """Add a callback for task status updates"""
-        self._callbacks.append(callback)
+    def add_callback(self, callback: Callable[[DownloadTask], None],
+                     events: Optional[Iterable[DownloadStatus]] = None):
+        """Add a callback for task status updates, optionally only for the given statuses.
+        
+        Registering the same callback again widens its statuses instead of
+        calling it twice per update.
+        """
+        events = None if events is None else frozenset(events)
+        with self._lock:
+            if callback in self._callbacks:
+                registered = self._callbacks[callback]
+                events = None if registered is None or events is None else registered | events
+            self._callbacks[callback] = events
+            self._callbacks_snapshot = tuple(self._callbacks.items())
     
     def add_progress_callback(self, callback: Callable[[DownloadTask], None]):
-        """Add a callback for task progress updates (alias for add_callback)"""
-        self.add_callback(callback)
+        """Add a callback for task progress updates"""
+        self.add_callback(callback, _PROGRESS_EVENTS)
     
     def add_completion_callback(self, callback: Callable[[DownloadTask], None]):
-        """Add a callback for task completion updates (alias for add_callback)"""
-        self.add_callback(callback)
+        """Add a callback for task completion updates"""
+        self.add_callback(callback, _COMPLETION_EVENTS)
     
     def add_error_callback(self, callback: Callable[[DownloadTask], None]):
-        """Add a callback for task error updates (alias for add_callback)"""
-        self.add_callback(callback)
+        """Add a callback for task error updates"""
+        self.add_callback(callback, _ERROR_EVENTS)
     
     def _notify_callbacks(self, task: DownloadTask):
-        """Notify all callbacks of task updates"""
-        for callback in self._callbacks:
-            try:
-                callback(task)
-            except Exception as e:
-                logging.error(f"Callback error: {e}")
+        """Notify all callbacks of task updates.
+        
+        Callbacks are not expected to raise; one that does is logged, and the
+        callbacks after it miss this update.
+        """
+        # Callbacks run outside _lock, so slow subscribers never hold up
+        # producers or readers of the queue
+        status = task.status
+        try:
+            for callback, events in self._callbacks_snapshot:
+                if events is None or status in events:
+                    callback(task)
+        except Exception as e:
+            logging.error("Callback error: %s", e)
     
     def start_worker(self):
-        """Start the download worker thread"""
-        if self._is_running:
-            return
+        """Start the download scheduler and its pool of download threads"""
+        with self._lock:
+            if self._is_running:
+                return
             
-        self._is_running = True
-        self._stop_event.clear()
-        self._worker_thread = threading.Thread(target=self._worker_loop, daemon=True)
-        self._worker_thread.start()
+            self._is_running = True
+            self._executor = ThreadPoolExecutor(max_workers=self._max_concurrent,
+                                                thread_name_prefix='download')
+        self._scheduler_thread = threading.Thread(target=self._worker_loop, daemon=True)
+        self._scheduler_thread.start()
     
     def stop_worker(self):
-        """Stop the download worker thread"""
-        self._is_running = False
-        self._stop_event.set()
-        if self._worker_thread and self._worker_thread.is_alive():
-            self._worker_thread.join(timeout=5.0)
+        """Stop the download scheduler; downloads already running finish in the background"""
+        with self._cond:
+            self._is_running = False
+            self._cond.notify_all()
+        if self._scheduler_thread and self._scheduler_thread.is_alive():
+            self._scheduler_thread.join(timeout=5.0)
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False)
     
     def _worker_loop(self):
-        """Main worker loop for processing download tasks"""
-        while self._is_running and not self._stop_event.is_set():
+        """Scheduler loop handing queued tasks to the download pool"""
+        while True:
             try:
-                # Get next task from queue
-                try:
-                    _, _, task_id = self._queue.get(timeout=1.0)
-                except queue.Empty:
-                    continue
-                
-                with self._lock:
-                    task = self._tasks.get(task_id)
-                    if not task or task.status == DownloadStatus.CANCELLED:
+                # Wait for a free slot and a task, or for stop_worker(). The
+                # slot comes first so that a higher priority task queued while
+                # every slot was busy is still the next one to start.
+                with self._cond:
+                    while self._is_running and (not self._heap or self._active >= self._max_concurrent):
+                        self._cond.wait()
+                    if not self._is_running:
+                        return
+                    
+                    _, _, task = heapq.heappop(self._heap)
+                    if not self._is_queued_locked(task):
+                        if self._cancelled_in_heap:
+                            self._cancelled_in_heap -= 1
                         continue
+                    
+                    self._active += 1
+                    future = self._executor.submit(self._process_download, task)
                 
-                # Process the download task
-                self._process_download(task)
+                # Outside the lock: an already finished future runs the
+                # callback right here, and it takes the lock itself
+                future.add_done_callback(self._download_finished)
                 
             except Exception as e:
-                logging.error(f"Worker loop error: {e}")
+                logging.error("Worker loop error: %s", e)
                 time.sleep(1.0)
     
+    def _download_finished(self, future: Future):
+        """Free the download slot of a finished task and wake the scheduler"""
+        with self._cond:
+            self._active -= 1
+            self._cond.notify()
+    
     def _process_download(self, task: DownloadTask):
         """Process a single download task"""
         try:
-            # Update task status
-            task.status = DownloadStatus.DOWNLOADING
-            task.started_at = time.time()
+            # Update task status; a task forgotten since it was queued is dropped
+            if not self._set_status_if_current(task, DownloadStatus.DOWNLOADING):
+                return
+            task.started_at = time.monotonic()
             self._notify_callbacks(task)
             
             # Simulate download process (replace with actual download logic)
@@ -176,53 +351,76 @@ class DownloadQueueManager:
             # 3. Handle errors appropriately
             
             # Simulate progress updates
+            report_progress = self._progress_reporter(task)
             for progress in range(0, 101, 10):
-                if task.status == DownloadStatus.CANCELLED:
+                if task.cancel_event.is_set():
                     return
                     
-                task.progress = progress
-                self._notify_callbacks(task)
-                time.sleep(0.1)  # Simulate download time
+                report_progress(progress)
+                # Simulate download time; wakes at once if the task is cancelled
+                task.cancel_event.wait(0.1)
             
-            # Mark as completed
-            task.status = DownloadStatus.COMPLETED
-            task.completed_at = time.time()
+            # Mark as completed, unless it was cancelled since the last check
+            if not self._set_status_if_current(task, DownloadStatus.COMPLETED, DownloadStatus.DOWNLOADING):
+                return
+            task.completed_at = time.monotonic()
             task.progress = 100.0
             self._notify_callbacks(task)
             
         except Exception as e:
-            # Mark as failed
-            task.status = DownloadStatus.FAILED
+            # Mark as failed, unless it was cancelled meanwhile
+            if not self._set_status_if_current(task, DownloadStatus.FAILED, DownloadStatus.DOWNLOADING):
+                return
             task.error_message = str(e)
-            task.completed_at = time.time()
+            task.completed_at = time.monotonic()
             self._notify_callbacks(task)
-            logging.error(f"Download failed for task {task.id}: {e}")
+            logging.error("Download failed for task %s: %s", task.id, e)
+    
+    def _progress_reporter(self, task: DownloadTask) -> Callable[[float], None]:
+        """Progress hook for one download that notifies at most once per 10%.
+        
+        Every value is stored on the task, but callbacks only fire when the
+        progress crosses into a new 10% bucket, however often the
+        downloader reports.
+        """
+        last_bucket = None
+        
+        def report_progress(progress: float):
+            nonlocal last_bucket
+            task.progress = progress
+            bucket = int(progress // 10)
+            if bucket != last_bucket:
+                last_bucket = bucket
+                self._notify_callbacks(task)
+        
+        return report_progress
+    
+    def _remove_task_locked(self, task_id: str):
+        """Forget a task and its status index entry; caller holds _lock"""
+        task = self._tasks.pop(task_id)
+        del self._by_status[task.status][task_id]
+    
+    def _purge(self, statuses: Iterable[DownloadStatus]):
+        """Forget every task in one of the given statuses"""
+        with self._lock:
+            for status in statuses:
+                for task_id in list(self._by_status[status]):
+                    self._remove_task_locked(task_id)
+            self._publish_tasks_locked()
     
     def clear_completed_tasks(self):
         """Remove all completed tasks from the queue"""
-        with self._lock:
-            completed_ids = [
-                task_id for task_id, task in self._tasks.items() 
-                if task.status in [DownloadStatus.COMPLETED, DownloadStatus.FAILED, DownloadStatus.CANCELLED]
-            ]
-            for task_id in completed_ids:
-                del self._tasks[task_id]
+        self._purge(_FINAL_STATES)
     
     def get_queue_stats(self) -> dict:
         """Get queue statistics"""
         with self._lock:
-            total = len(self._tasks)
-            pending = len([t for t in self._tasks.values() if t.status == DownloadStatus.PENDING])
-            downloading = len([t for t in self._tasks.values() if t.status == DownloadStatus.DOWNLOADING])
-            completed = len([t for t in self._tasks.values() if t.status == DownloadStatus.COMPLETED])
-            failed = len([t for t in self._tasks.values() if t.status == DownloadStatus.FAILED])
-            
             return {
-                'total': total,
-                'pending': pending,
-                'downloading': downloading,
-                'completed': completed,
-                'failed': failed,
+                'total': len(self._tasks),
+                'pending': len(self._by_status[DownloadStatus.PENDING]),
+                'downloading': len(self._by_status[DownloadStatus.DOWNLOADING]),
+                'completed': len(self._by_status[DownloadStatus.COMPLETED]),
+                'failed': len(self._by_status[DownloadStatus.FAILED]),
                 'is_running': self._is_running
             }
     
@@ -231,10 +429,9 @@ class DownloadQueueManager:
         """Check if the worker is running"""
         return self._is_running
     
-    def add_download(self, task: DownloadTask) -> str:
-        """Add a download task and return its ID"""
-        self.add_task(task)
-        return task.id
+    def add_download(self, task: DownloadTask) -> Optional[str]:
+        """Add a download task and return its ID, or None if it was not added"""
+        return task.id if self.add_task(task) else None
     
     def get_all_downloads(self) -> List[DownloadTask]:
         """Get all download tasks (alias for get_all_tasks)"""
@@ -249,39 +446,41 @@ class DownloadQueueManager:
         with self._lock:
             if task_id in self._tasks:
                 task = self._tasks[task_id]
-                if task.status == DownloadStatus.FAILED:
-                    task.status = DownloadStatus.PENDING
+                if task.status is DownloadStatus.FAILED:
+                    self._set_status_locked(task, DownloadStatus.PENDING)
                     task.error_message = None
                     task.progress = 0.0
                     # Re-add to queue
-                    self._queue.put((-task.priority.value, task.created_at, task.id))
+                    self._push_locked(task)
+                    self._cond.notify()
                     return True
         return False
     
     def clear_completed_downloads(self):
         """Clear completed downloads"""
-        with self._lock:
-            completed_ids = [
-                task_id for task_id, task in self._tasks.items() 
-                if task.status == DownloadStatus.COMPLETED
-            ]
-            for task_id in completed_ids:
-                del self._tasks[task_id]
+        self._purge((DownloadStatus.COMPLETED,))
     
     def clear_failed_downloads(self):
         """Clear failed downloads"""
-        with self._lock:
-            failed_ids = [
-                task_id for task_id, task in self._tasks.items() 
-                if task.status == DownloadStatus.FAILED
-            ]
-            for task_id in failed_ids:
-                del self._tasks[task_id]
+        self._purge((DownloadStatus.FAILED,))
     
     def update_max_concurrent_downloads(self, max_concurrent: int):
-        """Update maximum concurrent downloads (placeholder)"""
-        # This would be implemented if we had concurrent download support
-        pass
+        """Update maximum concurrent downloads.
+        
+        A running pool is replaced by one of the new size; downloads already
+        in flight finish on the old pool and still count against the limit.
+        """
+        with self._cond:
+            self._max_concurrent = max_concurrent
+            old_executor = self._executor
+            if old_executor is not None:
+                self._executor = ThreadPoolExecutor(max_workers=max_concurrent,
+                                                    thread_name_prefix='download')
+            self._cond.notify()
+        if old_executor is not None:
+            old_executor.shutdown(wait=False)
 
-# Global instance
-download_queue_manager = DownloadQueueManager()
+@lru_cache(maxsize=None)
+def get_download_queue_manager() -> DownloadQueueManager:
+    """Get the shared download queue manager, creating it on first use."""
+    return DownloadQueueManager()
@@ -4,6 +4,7 @@ from typing import Dict, Any, Tuple, List, Union, Optional
 from mutagen.easyid3 import EasyID3  # type: ignore
 from mutagen.id3 import ID3, COMM, ID3NoHeaderError  # type: ignore
 import os
+from constants import CAMELOT_TRACK_NUMBERS
 
 # Try to import Essentia with proper error handling
 try:
@@ -606,10 +607,13 @@ class MusicAnalyzer:
             if analysis.get('camelot_key'):
                 camelot_key = analysis['camelot_key']
                 try:
-                    # Extract number from camelot key (e.g., "8A" -> 8, "11B" -> 11)
-                    track_num = int(''.join(filter(str.isdigit, camelot_key)))
-                    # Ensure it's within valid range (1-12)
-                    track_num = max(1, min(12, track_num))
+                    # Look up the number in the camelot key (e.g., "8A" -> 8, "11B" -> 11)
+                    track_num = CAMELOT_TRACK_NUMBERS.get(camelot_key)
+                    if track_num is None:
+                        # Non-standard key: extract whatever number it has
+                        track_num = int(''.join(filter(str.isdigit, camelot_key)))
+                        # Ensure it's within valid range (1-12)
+                        track_num = max(1, min(12, track_num))
                     tags['tracknumber'] = [str(track_num)]
                 except (ValueError, TypeError):
                     # Fallback to track 1 if parsing fails
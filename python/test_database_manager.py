@@ -0,0 +1,597 @@
+"""
+Database Manager Test Suite
+===========================
+
+Unit tests for the SQLite-backed music library in database_manager.py.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+from unittest.mock import patch
+
+import database_manager
+from database_manager import DatabaseManager
+
+
+class DatabaseManagerTestCase(unittest.TestCase):
+    """Base class creating a throwaway database per test."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, 'test_library.db')
+        self.db = DatabaseManager(self.db_path)
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def make_file(self, name: str, content: bytes = b'audio') -> str:
+        """Create a dummy audio file on disk and return its path."""
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+
+class TestSchemaVersion(DatabaseManagerTestCase):
+    """Test the user_version gate around schema creation."""
+
+    def test_schema_created_once(self):
+        """A new database is stamped; reopening it skips schema creation."""
+        with self.db.get_connection() as conn:
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+        self.assertEqual(version, DatabaseManager.SCHEMA_VERSION)
+
+        with patch.object(DatabaseManager, '_create_schema') as create_schema:
+            reopened = DatabaseManager(self.db_path)
+            reopened.close()
+            create_schema.assert_not_called()
+
+
+class TestTrackIdIndex(DatabaseManagerTestCase):
+    """Test the in-memory track_id index used for scan-time dedup."""
+
+    def test_load_track_id_index(self):
+        """Index maps every stored track_id to its row id."""
+        path = self.make_file('song.mp3')
+        file_id = self.db.add_music_file({'filename': 'song.mp3', 'file_path': path})
+        track_id = self.db.generate_unique_track_id(path, 'song.mp3')
+        self.assertTrue(self.db.update_track_id(str(file_id), track_id))
+
+        # Rows without a track_id are left out of the index
+        self.db.add_music_file({'filename': 'other.mp3', 'file_path': self.make_file('other.mp3')})
+
+        self.assertEqual(self.db.load_track_id_index(), {track_id: file_id})
+
+    def test_track_id_is_stable_hash(self):
+        """Track IDs combine the cleaned filename with a 12-digit content key hash."""
+        path = self.make_file('My Song!.mp3')
+        track_id = self.db.generate_unique_track_id(path, 'My Song!.mp3')
+
+        self.assertRegex(track_id, r'^My Songmp3_[0-9a-f]{12}$')
+        self.assertEqual(self.db.generate_unique_track_id(path, 'My Song!.mp3'), track_id)
+
+    def test_track_id_hash_is_md5_of_path_size_and_mtime(self):
+        """Track IDs keep the MD5 hash so IDs already stored in libraries stay valid."""
+        path = self.make_file('song.mp3')
+        stat = os.stat(path)
+        expected = hashlib.md5(f"{path}:{stat.st_size}:{stat.st_mtime}".encode()).hexdigest()[:12]
+
+        self.assertEqual(self.db.generate_unique_track_id(path, 'song.mp3'), f"songmp3_{expected}")
+
+
+class TestBulkInsert(DatabaseManagerTestCase):
+    """Test the batched add_music_files API."""
+
+    def test_add_music_files_inserts_and_updates(self):
+        """New paths are inserted, known paths updated, ids returned in input order."""
+        existing_path = self.make_file('existing.mp3')
+        existing_id = self.db.add_music_file({'filename': 'existing.mp3', 'file_path': existing_path})
+        new_path = self.make_file('new.mp3')
+
+        ids = self.db.add_music_files([
+            {'filename': 'new.mp3', 'file_path': new_path, 'camelot_key': '8A', 'cue_points': [1.5]},
+            {'filename': 'existing.mp3', 'file_path': existing_path, 'camelot_key': '5B'},
+        ])
+
+        self.assertEqual(ids[1], existing_id)
+        self.assertNotEqual(ids[0], existing_id)
+        self.assertEqual(self.db.get_music_file_by_id(ids[0])['file_path'], new_path)
+        self.assertEqual(self.db.get_music_file_by_path(existing_path)['camelot_key'], '5B')
+        self.assertEqual(len(self.db.get_all_music_files()), 2)
+
+    def test_add_music_files_empty(self):
+        """An empty batch is a no-op."""
+        self.assertEqual(self.db.add_music_files([]), [])
+
+
+class TestFileHashReuse(DatabaseManagerTestCase):
+    """Test that unchanged files are not re-hashed on update."""
+
+    def test_unchanged_file_is_not_rehashed(self):
+        """Stored hash is reused while size and mtime match, recomputed after an edit."""
+        path = self.make_file('song.mp3', b'original')
+        file_data = {'filename': 'song.mp3', 'file_path': path}
+        self.db.add_music_file(file_data)
+        original_hash = self.db.get_music_file_by_path(path)['file_hash']
+
+        with patch.object(self.db, 'calculate_file_hash', wraps=self.db.calculate_file_hash) as spy:
+            self.db.add_music_file(file_data)
+            spy.assert_not_called()
+
+            with open(path, 'wb') as f:
+                f.write(b'changed content')
+            os.utime(path, (0, 0))
+            self.db.add_music_file(file_data)
+            spy.assert_called_once_with(path)
+
+        self.assertNotEqual(self.db.get_music_file_by_path(path)['file_hash'], original_hash)
+
+
+class TestLibraryStats(DatabaseManagerTestCase):
+    """Test the library statistics summary."""
+
+    def test_library_stats(self):
+        """Totals, status counts, key distribution and found duration are reported."""
+        self.db.add_music_files([
+            {'filename': 'a.mp3', 'file_path': self.make_file('a.mp3'), 'camelot_key': '8A', 'duration': 1800.0},
+            {'filename': 'b.mp3', 'file_path': self.make_file('b.mp3'), 'camelot_key': '8A', 'duration': 1800.0},
+            {'filename': 'c.mp3', 'file_path': self.make_file('c.mp3'), 'camelot_key': '5B',
+             'duration': 600.0, 'status': 'missing'},
+        ])
+
+        stats = self.db.get_library_stats()
+
+        self.assertEqual(stats['total_files'], 3)
+        self.assertEqual(stats['status_counts'], {'found': 2, 'missing': 1})
+        self.assertEqual(stats['key_distribution'], {'8A': 2})
+        self.assertEqual(stats['total_duration_hours'], 1.0)
+
+
+class TestMetadataUpdate(DatabaseManagerTestCase):
+    """Test manual metadata edits."""
+
+    def test_update_reuses_sql_for_same_fields(self):
+        """Edits to the same fields share one cached statement regardless of key order."""
+        file_id = self.db.add_music_file({'filename': 'a.mp3', 'file_path': self.make_file('a.mp3')})
+
+        first = self.db.update_music_file_metadata(str(file_id), {'bpm': '128', 'camelot_key': '8A'})
+        second = self.db.update_music_file_metadata(str(file_id), {'camelot_key': '9A', 'bpm': 126, 'unknown': 1})
+
+        self.assertEqual((first['bpm'], first['camelot_key']), (128.0, '8A'))
+        self.assertEqual((second['bpm'], second['camelot_key']), (126.0, '9A'))
+        self.assertEqual(len(self.db._update_sql_cache), 1)
+
+    def test_cue_point_edit_stored_like_scan(self):
+        """Edited cue points are stored in the same JSON form as scanned ones."""
+        cue_points = [{'time': 12.5, 'label': 'Drop é'}]
+        file_id = self.db.add_music_file({'filename': 'a.mp3', 'file_path': self.make_file('a.mp3')})
+
+        record = self.db.update_music_file_metadata(str(file_id), {'cue_points': cue_points})
+
+        self.assertEqual(record['cue_points'], database_manager._json_dumps(cue_points))
+
+    def test_update_file_path_returns_record(self):
+        """Renaming returns the updated row, or None for an unknown id."""
+        file_id = self.db.add_music_file({'filename': 'a.mp3', 'file_path': self.make_file('a.mp3')})
+        new_path = os.path.join(self.tmp_dir, 'renamed.mp3')
+
+        record = self.db.update_music_file_path(file_id, new_path)
+
+        self.assertEqual((record['id'], record['file_path'], record['filename']), (file_id, new_path, 'renamed.mp3'))
+        self.assertIsNone(self.db.update_music_file_path(999, new_path))
+
+    def test_updates_without_returning_support(self):
+        """On SQLite before 3.35 updates re-select the row instead of using RETURNING."""
+        file_id = self.db.add_music_file({'filename': 'a.mp3', 'file_path': self.make_file('a.mp3')})
+        new_path = os.path.join(self.tmp_dir, 'renamed.mp3')
+
+        with patch('database_manager._HAS_RETURNING', False):
+            record = self.db.update_music_file_metadata(str(file_id), {'camelot_key': '8A'})
+            renamed = self.db.update_music_file_path(file_id, new_path)
+            missing = self.db.update_music_file_metadata('999', {'camelot_key': '8A'})
+
+        self.assertEqual((record['id'], record['camelot_key']), (file_id, '8A'))
+        self.assertEqual((renamed['file_path'], renamed['camelot_key']), (new_path, '8A'))
+        self.assertIsNone(missing)
+
+    def test_add_without_returning_support(self):
+        """On SQLite before 3.35 the upsert looks the id up again instead of using RETURNING."""
+        path = self.make_file('a.mp3')
+        file_id = self.db.add_music_file({'filename': 'a.mp3', 'file_path': path})
+
+        with patch('database_manager._HAS_RETURNING', False):
+            same_id = self.db.add_music_file({'filename': 'a.mp3', 'file_path': path, 'camelot_key': '8A'})
+            new_id = self.db.add_music_file({'filename': 'b.mp3', 'file_path': self.make_file('b.mp3')})
+
+        self.assertEqual(same_id, file_id)
+        self.assertNotEqual(new_id, file_id)
+        self.assertEqual(self.db.get_music_file_by_id(str(file_id))['camelot_key'], '8A')
+
+    def test_update_without_known_fields(self):
+        """Updates naming no editable field are rejected."""
+        file_id = self.db.add_music_file({'filename': 'a.mp3', 'file_path': self.make_file('a.mp3')})
+        self.assertIsNone(self.db.update_music_file_metadata(str(file_id), {'unknown': 1}))
+
+
+class TestAnalysisMarkers(DatabaseManagerTestCase):
+    """Test the per-track analysis status updates."""
+
+    def test_analysis_lifecycle(self):
+        """Markers update the row by path and report whether it existed."""
+        path = self.make_file('a.mp3')
+        self.db.add_music_file({'filename': 'a.mp3', 'file_path': path})
+
+        self.assertTrue(self.db.mark_analysis_started(path))
+        self.assertEqual(self.db.get_music_file_by_path(path)['analysis_status'], 'analyzing')
+
+        self.assertTrue(self.db.mark_analysis_completed(path, {'camelot_key': '8A', 'bpm': 124.0}))
+        self.assertTrue(self.db.mark_id3_tags_written(path))
+        self.assertTrue(self.db.set_prevent_reanalysis(path))
+        row = self.db.get_music_file_by_path(path)
+        self.assertEqual((row['analysis_status'], row['camelot_key'], row['bpm']), ('completed', '8A', 124.0))
+        self.assertEqual((row['analysis_attempts'], row['id3_tags_written'], row['prevent_reanalysis']), (1, 1, 1))
+
+        self.assertTrue(self.db.mark_analysis_failed(path, 'decode error'))
+        self.assertEqual(self.db.get_music_file_by_path(path)['error_message'], 'decode error')
+
+        self.assertFalse(self.db.mark_analysis_started('/nowhere.mp3'))
+
+
+class TestBatch(DatabaseManagerTestCase):
+    """Test grouping writes into one transaction with batch()."""
+
+    def test_batch_commits_once(self):
+        """Writes inside a batch are committed together when it exits."""
+        paths = [self.make_file(f'{i}.mp3') for i in range(3)]
+        self.db.add_music_files([{'filename': os.path.basename(p), 'file_path': p} for p in paths])
+
+        with self.db.batch():
+            for path in paths:
+                self.assertTrue(self.db.mark_analysis_started(path))
+            self.assertTrue(self.db._conn.in_transaction)
+
+        self.assertFalse(self.db._conn.in_transaction)
+        statuses = {f['analysis_status'] for f in self.db.get_all_music_files(fields=('analysis_status',))}
+        self.assertEqual(statuses, {'analyzing'})
+
+    def test_batch_rolls_back_on_error(self):
+        """An exception inside the batch discards all of its writes."""
+        path = self.make_file('a.mp3')
+        self.db.add_music_file({'filename': 'a.mp3', 'file_path': path})
+
+        with self.assertRaises(RuntimeError):
+            with self.db.batch():
+                self.db.mark_analysis_started(path)
+                self.db.add_music_files([{'filename': 'b.mp3', 'file_path': self.make_file('b.mp3')}])
+                raise RuntimeError('abort')
+
+        self.assertEqual(self.db.get_music_file_by_path(path)['analysis_status'], 'pending')
+        self.assertEqual(len(self.db.get_all_music_files()), 1)
+
+
+class TestSkipAnalysisBatch(DatabaseManagerTestCase):
+    """Test the batched skip-analysis lookup."""
+
+    def test_batch_matches_single_lookups(self):
+        """Each path gets the same decision should_skip_analysis gives it."""
+        done_path = self.make_file('done.mp3')
+        pending_path = self.make_file('pending.mp3')
+        self.db.add_music_files([
+            {'filename': 'done.mp3', 'file_path': done_path, 'camelot_key': '8A',
+             'bpm': 124.0, 'energy_level': 6, 'duration': 300.0},
+            {'filename': 'pending.mp3', 'file_path': pending_path},
+        ])
+        paths = [done_path, pending_path, '/nowhere.mp3']
+
+        results = self.db.should_skip_analysis_batch(paths)
+
+        self.assertEqual([results[path]['reason'] for path in paths], ['has_metadata', 'none', 'not_found'])
+        for path in paths:
+            self.assertEqual(results[path]['should_skip'], self.db.should_skip_analysis(path)['should_skip'])
+
+    def test_boolean_checks_match_detailed_ones(self):
+        """The boolean fast paths agree with the dict-returning methods."""
+        rows = [
+            {'filename': 'full.mp3', 'camelot_key': '8A', 'bpm': 124.0, 'energy_level': 6, 'duration': 300.0},
+            {'filename': 'no_bpm.mp3', 'camelot_key': '8A', 'energy_level': 6, 'duration': 300.0},
+            {'filename': 'empty_key.mp3', 'bpm': 124.0, 'energy_level': 6, 'duration': 300.0},
+            {'filename': 'prevented.mp3', 'prevent_reanalysis': 1},
+            {'filename': 'tagged.mp3', 'analysis_status': 'completed', 'id3_tags_written': 1},
+        ]
+        for row in rows:
+            row['file_path'] = self.make_file(row['filename'])
+        self.db.add_music_files(rows)
+
+        for path in [row['file_path'] for row in rows] + ['/nowhere.mp3']:
+            self.assertEqual(self.db.is_analysis_skippable(path), self.db.should_skip_analysis(path)['should_skip'], path)
+            self.assertEqual(self.db.has_complete_metadata(path),
+                             self.db.check_song_has_metadata(path).get('has_complete_metadata', False), path)
+
+
+class TestCoverArt(DatabaseManagerTestCase):
+    """Test cover art storage and lookup."""
+
+    def test_cover_art_lookup(self):
+        """Cover art is returned only once it has been marked extracted."""
+        path = self.make_file('a.mp3')
+        self.db.add_music_file({'filename': 'a.mp3', 'file_path': path, 'cover_art': 'stale'})
+
+        self.assertFalse(self.db.has_cover_art(path))
+        self.assertIsNone(self.db.get_cover_art(path))
+
+        self.assertTrue(self.db.update_cover_art(path, 'aGVsbG8='))
+        self.assertTrue(self.db.has_cover_art(path))
+        self.assertEqual(self.db.get_cover_art(path), 'aGVsbG8=')
+        self.assertFalse(self.db.has_cover_art('/nowhere.mp3'))
+
+
+class TestDuplicateByHash(DatabaseManagerTestCase):
+    """Test content-hash duplicate lookup."""
+
+    def test_exclude_path_finds_other_copy(self):
+        """The checked file itself is skipped in favour of another copy."""
+        first = self.make_file('a.mp3', b'same audio')
+        second = self.make_file('b.mp3', b'same audio')
+        self.db.add_music_files([{'filename': 'a.mp3', 'file_path': first},
+                                 {'filename': 'b.mp3', 'file_path': second}])
+        file_hash = self.db.calculate_file_hash(first)
+
+        self.assertEqual(self.db.find_duplicate_by_hash(file_hash, exclude_path=first)['file_path'], second)
+        self.assertEqual(self.db.find_duplicate_by_hash(file_hash, exclude_path=second)['file_path'], first)
+        self.assertIsNotNone(self.db.find_duplicate_by_hash(file_hash))
+        self.assertIsNone(self.db.find_duplicate_by_hash(''))
+
+
+class _StubBlake3:
+    """Stand-in for blake3.blake3 when the package is not installed."""
+
+    AUTO = -1
+
+    def __init__(self, data: bytes = b'', max_threads: int = 1):
+        self._hash = hashlib.sha256(data)
+
+    def update_mmap(self, path: str):
+        with open(path, 'rb') as f:
+            self._hash.update(f.read())
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+try:
+    from blake3 import blake3 as blake3_impl
+except ImportError:
+    blake3_impl = _StubBlake3
+
+
+class TestFileHashAlgorithms(DatabaseManagerTestCase):
+    """Test both content-hash paths of calculate_file_hash."""
+
+    def test_blake3_path_hashes_content(self):
+        """With blake3 the digest is the 64-digit BLAKE3 hash of the file content."""
+        path = self.make_file('a.mp3', b'some audio')
+        with patch('database_manager.BLAKE3_AVAILABLE', True), \
+                patch('database_manager.blake3', blake3_impl, create=True):
+            file_hash = self.db.calculate_file_hash(path)
+
+        self.assertEqual(file_hash, blake3_impl(b'some audio').hexdigest())
+        self.assertEqual(len(file_hash), 64)
+
+    def test_md5_fallback_hashes_content(self):
+        """Without blake3 the digest is the 32-digit MD5 of the file content."""
+        path = self.make_file('a.mp3', b'some audio')
+        with patch('database_manager.BLAKE3_AVAILABLE', False):
+            file_hash = self.db.calculate_file_hash(path)
+
+        self.assertEqual(file_hash, hashlib.md5(b'some audio').hexdigest())
+
+
+class _StubOrjson:
+    """Stand-in for the orjson module when the package is not installed."""
+
+    JSONDecodeError = ValueError
+
+    @staticmethod
+    def dumps(value) -> bytes:
+        return json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode()
+
+    @staticmethod
+    def loads(text):
+        return json.loads(text)
+
+
+try:
+    import orjson as orjson_impl
+except ImportError:
+    orjson_impl = _StubOrjson
+
+
+class TestJsonEncoding(DatabaseManagerTestCase):
+    """Test that the orjson and json paths store the same text."""
+
+    VALUE = {'cue_points': [{'time': 12.5, 'label': 'Drop é'}], 'loop': None, 'ok': True}
+
+    def test_orjson_and_fallback_encode_identically(self):
+        """Both encoders produce the same string, which decodes back to the value."""
+        with patch('database_manager.ORJSON_AVAILABLE', True), \
+                patch('database_manager.orjson', orjson_impl, create=True):
+            fast = database_manager._json_dumps(self.VALUE)
+            self.assertEqual(database_manager._json_loads(fast), self.VALUE)
+        with patch('database_manager.ORJSON_AVAILABLE', False):
+            fallback = database_manager._json_dumps(self.VALUE)
+            self.assertEqual(database_manager._json_loads(fallback), self.VALUE)
+
+        self.assertEqual(fast, fallback)
+
+
+class TestChunkedIteration(DatabaseManagerTestCase):
+    """Test the keyset-paged iter_* methods."""
+
+    def lock_free_in_other_thread(self) -> bool:
+        acquired = []
+
+        def try_lock():
+            if self.db._lock.acquire(timeout=1):
+                acquired.append(True)
+                self.db._lock.release()
+
+        worker = threading.Thread(target=try_lock)
+        worker.start()
+        worker.join()
+        return bool(acquired)
+
+    def test_iterators_release_lock_between_chunks(self):
+        """Other threads get the lock while a partly consumed iterator is open."""
+        ids = self.db.add_music_files([{'filename': name, 'file_path': self.make_file(name)}
+                                       for name in ('a.mp3', 'b.mp3', 'c.mp3')])
+        playlist_id = self.db.create_playlist('Set')
+        self.db.add_songs_to_playlist(playlist_id, ids)
+
+        with patch('database_manager._ITER_CHUNK_SIZE', 1):
+            for rows, key, expected in (
+                    (self.db.iter_all_music_files(fields=['filename']), 'filename', ['a.mp3', 'b.mp3', 'c.mp3']),
+                    (self.db.iter_playlist_songs(playlist_id), 'id', ids)):
+                first = next(rows)
+                self.assertTrue(self.lock_free_in_other_thread())
+                self.assertEqual([first[key]] + [row[key] for row in rows], expected)
+
+    def test_writes_between_pages(self):
+        """Each page is a fresh query, so rows written between pages are picked up."""
+        paths = [self.make_file(name) for name in ('a.mp3', 'b.mp3', 'c.mp3', 'd.mp3')]
+        self.db.add_music_files([{'filename': os.path.basename(path), 'file_path': path} for path in paths[:3]])
+
+        with patch('database_manager._ITER_CHUNK_SIZE', 1):
+            rows = self.db.iter_all_music_files(fields=['filename'])
+            self.assertEqual(next(rows), {'filename': 'a.mp3'})
+            self.db.delete_music_file_by_path(paths[1])
+            self.db.add_music_file({'filename': 'd.mp3', 'file_path': paths[3]})
+            self.assertEqual([row['filename'] for row in rows], ['c.mp3', 'd.mp3'])
+
+        self.assertEqual([row['filename'] for row in self.db.get_all_music_files(fields=['filename'])],
+                         ['a.mp3', 'c.mp3', 'd.mp3'])
+
+
+class TestVerifyFileLocations(DatabaseManagerTestCase):
+    """Test the found/missing sweep over the library."""
+
+    def add_files(self, count: int) -> List[str]:
+        paths = [self.make_file(f'{index}.mp3') for index in range(count)]
+        self.db.add_music_files([{'filename': os.path.basename(path), 'file_path': path} for path in paths])
+        return paths
+
+    def test_few_paths_are_checked_inline(self):
+        """Small libraries are checked without starting a thread pool."""
+        paths = self.add_files(2)
+        os.remove(paths[0])
+
+        with patch('database_manager.ThreadPoolExecutor') as pool:
+            self.assertEqual(self.db.verify_file_locations(), (1, 1))
+        pool.assert_not_called()
+        self.assertEqual(self.db.get_music_file_by_path(paths[0])['status'], 'missing')
+
+    def test_pool_sized_to_path_count(self):
+        """Larger libraries use a pool no bigger than the number of paths."""
+        paths = self.add_files(database_manager._MIN_PARALLEL_STATS + 1)
+        os.remove(paths[-1])
+
+        with patch('database_manager.ThreadPoolExecutor', wraps=ThreadPoolExecutor) as pool:
+            self.assertEqual(self.db.verify_file_locations(), (len(paths) - 1, 1))
+        pool.assert_called_once_with(max_workers=len(paths))
+
+
+class TestDeleteCascade(DatabaseManagerTestCase):
+    """Test that deleting a track removes it from playlists via the foreign key."""
+
+    def test_delete_removes_playlist_items(self):
+        """Playlist items cascade when their track is deleted by id or by path."""
+        first = self.db.add_music_file({'filename': 'a.mp3', 'file_path': self.make_file('a.mp3')})
+        second_path = self.make_file('b.mp3')
+        second = self.db.add_music_file({'filename': 'b.mp3', 'file_path': second_path})
+        playlist_id = self.db.create_playlist('Set')
+        self.db.add_song_to_playlist(playlist_id, first)
+        self.db.add_song_to_playlist(playlist_id, second)
+
+        self.assertTrue(self.db.delete_music_file_by_id(str(first)))
+        self.assertEqual([song['id'] for song in self.db.get_playlist_songs(playlist_id)], [second])
+
+        self.assertTrue(self.db.delete_music_file_by_path(second_path))
+        self.assertEqual(self.db.get_playlist_songs(playlist_id), [])
+
+
+class TestPlaylistCriteria(DatabaseManagerTestCase):
+    """Test storage of smart playlist query criteria."""
+
+    def stored_criteria(self, playlist_id: int) -> str:
+        with self.db.get_connection() as conn:
+            return conn.execute('SELECT query_criteria FROM playlists WHERE id = ?', (playlist_id,)).fetchone()[0]
+
+    def test_criteria_stored_like_other_json_columns(self):
+        """Created and updated criteria are encoded with _json_dumps."""
+        criteria = {'camelot_key': '8A', 'genre': 'Électro'}
+        playlist_id = self.db.create_playlist('Smart', is_query_based=True, query_criteria=criteria)
+        self.assertEqual(self.stored_criteria(playlist_id), database_manager._json_dumps(criteria))
+
+        criteria['bpm_min'] = 120
+        self.assertTrue(self.db.update_playlist(playlist_id, query_criteria=criteria))
+        self.assertEqual(self.stored_criteria(playlist_id), database_manager._json_dumps(criteria))
+
+
+class TestPlaylistSongs(DatabaseManagerTestCase):
+    """Test the playlist song listing."""
+
+    def test_add_songs_appends_in_order(self):
+        """Bulk adds continue numbering after the songs already in the playlist."""
+        ids = [self.db.add_music_file({'filename': f'{i}.mp3', 'file_path': self.make_file(f'{i}.mp3')})
+               for i in range(3)]
+        playlist_id = self.db.create_playlist('Set')
+        self.db.add_song_to_playlist(playlist_id, ids[2])
+
+        self.assertTrue(self.db.add_songs_to_playlist(playlist_id, ids[:2]))
+
+        songs = self.db.get_playlist_songs(playlist_id)
+        self.assertEqual([(song['id'], song['position']) for song in songs],
+                         [(ids[2], 1), (ids[0], 2), (ids[1], 3)])
+
+    def test_cover_art_only_on_request(self):
+        """Cover art is left out of playlist songs unless asked for."""
+        file_id = self.db.add_music_file({'filename': 'a.mp3', 'file_path': self.make_file('a.mp3'),
+                                          'cover_art': 'aGVsbG8=', 'cue_points': [2.0]})
+        playlist_id = self.db.create_playlist('Set')
+        self.db.add_song_to_playlist(playlist_id, file_id)
+
+        song, = self.db.get_playlist_songs(playlist_id)
+        self.assertNotIn('cover_art', song)
+        self.assertEqual((song['id'], song['position'], song['cue_points']), (file_id, 1, [2.0]))
+
+        song, = self.db.get_playlist_songs(playlist_id, include_cover_art=True)
+        self.assertEqual(song['cover_art'], 'aGVsbG8=')
+
+    def test_delete_playlist_removes_items(self):
+        """Deleting a playlist cascades to its items but keeps the tracks."""
+        file_id = self.db.add_music_file({'filename': 'a.mp3', 'file_path': self.make_file('a.mp3')})
+        playlist_id = self.db.create_playlist('Set')
+        self.db.add_song_to_playlist(playlist_id, file_id)
+
+        self.assertTrue(self.db.delete_playlist(playlist_id))
+        self.assertFalse(self.db.delete_playlist(playlist_id))
+
+        with self.db.get_connection() as conn:
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM playlist_items').fetchone()[0], 0)
+        self.assertIsNotNone(self.db.get_music_file_by_id(str(file_id)))
+
+    def test_delete_unknown_track(self):
+        """Deleting a missing track reports False."""
+        self.assertFalse(self.db.delete_music_file_by_id('999'))
+        self.assertFalse(self.db.delete_music_file_by_path('/nowhere.mp3'))
+
+
+if __name__ == '__main__':
+    unittest.main()
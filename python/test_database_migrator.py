@@ -0,0 +1,326 @@
+"""
+Database Migrator Test Suite
+============================
+
+Unit tests for the schema migrations in database_migrator.py.
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from database_migrator import DatabaseMigrator, Migration, MigrationStatus, _topo_sort, run_migrations
+
+
+class DatabaseMigratorTestCase(unittest.TestCase):
+    """Base class creating a throwaway pre-migration database per test."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, 'test_library.db')
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute('''
+                CREATE TABLE music_files (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    filename TEXT NOT NULL,
+                    file_path TEXT NOT NULL UNIQUE,
+                    camelot_key TEXT,
+                    bpm REAL,
+                    energy_level INTEGER
+                )
+            ''')
+        conn.close()
+        self.migrator = DatabaseMigrator(self.db_path)
+
+    def tearDown(self):
+        self.migrator.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def music_file_columns(self) -> set:
+        with sqlite3.connect(self.db_path) as conn:
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(music_files)')}
+        conn.close()
+        return columns
+
+
+class TestConnection(DatabaseMigratorTestCase):
+    """Test the migrator's shared connection."""
+
+    def test_read_connection_rejects_writes(self):
+        with self.migrator._read_cursor() as cursor:
+            with self.assertRaises(sqlite3.OperationalError):
+                cursor.execute('CREATE TABLE scratch (id INTEGER)')
+
+    def test_reads_do_not_wait_for_writer_lock(self):
+        self.migrator.get_migration_history()
+        results = []
+
+        # Hold the writer's lock, as a running migration would, while
+        # another thread reads the history
+        with self.migrator._lock:
+            reader = threading.Thread(target=lambda: results.append(self.migrator.get_migration_history()))
+            reader.start()
+            reader.join(timeout=5)
+
+        self.assertEqual(results, [[]])
+
+    def test_migrations_table_created_on_first_use(self):
+        self.migrator.validate_schema()
+        self.assertNotIn('schema_migrations', self.migrator.validate_schema()['tables'])
+
+        self.migrator.get_migration_history()
+        self.assertIn('schema_migrations', self.migrator.validate_schema()['tables'])
+
+    def test_existing_migrations_table_not_recreated(self):
+        self.migrator.get_migration_history()
+        other = DatabaseMigrator(self.db_path)
+        try:
+            with patch.object(other, '_cursor') as writer_cursor:
+                self.assertEqual(other.get_migration_history(), [])
+            writer_cursor.assert_not_called()
+        finally:
+            other.close()
+
+    def test_connection_is_tuned(self):
+        with self.migrator._cursor() as cursor:
+            self.assertEqual(cursor.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+            self.assertEqual(cursor.execute('PRAGMA synchronous').fetchone()[0], 1)
+            self.assertEqual(cursor.execute('PRAGMA busy_timeout').fetchone()[0], 5000)
+
+
+class TestBuiltinMigrations(DatabaseMigratorTestCase):
+    """Test the built-in migration catalog."""
+
+    def test_migrate_from_scratch(self):
+        self.assertTrue(self.migrator.migrate())
+        self.assertTrue(self.migrator.validate_schema()['is_valid'])
+        self.assertTrue({'track_id', 'id3_metadata', 'prevent_reanalysis'} <= self.music_file_columns())
+
+        history = self.migrator.get_migration_history()
+        self.assertEqual([m['version'] for m in history], ['001', '002', '003', '004', '005'])
+
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("INSERT INTO music_files (filename, file_path, track_id) VALUES ('a', '/a', 't1')")
+            with self.assertRaises(sqlite3.IntegrityError):
+                conn.execute("INSERT INTO music_files (filename, file_path, track_id) VALUES ('b', '/b', 't1')")
+        conn.close()
+
+    def test_rollback_with_comment_only_script(self):
+        self.assertTrue(self.migrator.migrate())
+        self.assertTrue(self.migrator.rollback_migration(self.migrator.migrations[0]))
+        self.assertEqual(self.migrator.get_migration_status('001'), MigrationStatus.ROLLED_BACK)
+
+    def test_existing_columns_are_skipped(self):
+        with sqlite3.connect(self.db_path) as conn:
+            conn.executescript('''
+                ALTER TABLE music_files ADD COLUMN cover_art TEXT;
+                ALTER TABLE music_files ADD COLUMN track_id TEXT;
+            ''')
+        conn.close()
+
+        self.assertTrue(self.migrator.migrate())
+        self.assertTrue(self.migrator.validate_schema()['is_valid'])
+
+
+class TestMigrate(DatabaseMigratorTestCase):
+    """Test running migrations and recording their status."""
+
+    def setUp(self):
+        super().setUp()
+        self.migrator.migrations = [
+            Migration(
+                version='001',
+                name='add_rating_column',
+                description='Add rating column',
+                up_sql='ALTER TABLE music_files ADD COLUMN rating INTEGER DEFAULT 0;',
+                down_sql=''
+            ),
+            Migration(
+                version='002',
+                name='add_tag_columns',
+                description='Add tag columns',
+                up_sql='''
+                    ALTER TABLE music_files ADD COLUMN title TEXT;
+                    ALTER TABLE music_files ADD COLUMN artist TEXT;
+                ''',
+                down_sql=''
+            ),
+        ]
+
+    def test_migrate_records_history(self):
+        self.assertTrue(self.migrator.migrate())
+        self.assertTrue({'rating', 'title', 'artist'} <= self.music_file_columns())
+
+        history = self.migrator.get_migration_history()
+        self.assertEqual([m['version'] for m in history], ['001', '002'])
+        self.assertTrue(all(m['status'] == 'completed' for m in history))
+
+    def test_migrate_twice_is_noop(self):
+        self.assertTrue(self.migrator.migrate())
+        self.assertEqual(self.migrator.get_pending_migrations(), [])
+        self.assertTrue(self.migrator.migrate())
+
+    def test_migrated_instance_skips_pending_query(self):
+        self.assertTrue(self.migrator.migrate())
+        with patch.object(self.migrator, 'get_pending_migrations') as get_pending:
+            self.assertTrue(self.migrator.migrate())
+        get_pending.assert_not_called()
+
+    def test_new_migration_is_still_picked_up(self):
+        self.assertTrue(self.migrator.migrate())
+        self.migrator.migrations.append(Migration(
+            version='003',
+            name='add_album_column',
+            description='Add album column',
+            up_sql='ALTER TABLE music_files ADD COLUMN album TEXT;',
+            down_sql=''
+        ))
+        self.assertTrue(self.migrator.migrate())
+        self.assertIn('album', self.music_file_columns())
+
+    def test_rollback_marks_status(self):
+        self.assertTrue(self.migrator.migrate())
+        self.assertTrue(self.migrator.rollback_migration(self.migrator.migrations[-1]))
+        self.assertEqual(self.migrator.get_migration_status('002'), MigrationStatus.ROLLED_BACK)
+        self.assertEqual([m.version for m in self.migrator.get_pending_migrations()], ['002'])
+
+    def test_failed_batch_falls_back_to_single_migrations(self):
+        self.migrator.migrations.append(Migration(
+            version='003',
+            name='broken',
+            description='Fails',
+            up_sql='ALTER TABLE no_such_table ADD COLUMN other TEXT;',
+            down_sql=''
+        ))
+
+        self.assertFalse(self.migrator.migrate())
+        # The migrations before the broken one still get applied
+        self.assertTrue({'rating', 'title', 'artist'} <= self.music_file_columns())
+        self.assertEqual(self.migrator.get_migration_status('002'), MigrationStatus.COMPLETED)
+        self.assertEqual(self.migrator.get_migration_status('003'), MigrationStatus.FAILED)
+
+    def test_failed_migration_is_rolled_back(self):
+        broken = Migration(
+            version='900',
+            name='broken',
+            description='Adds a column, then fails',
+            up_sql='''
+                ALTER TABLE music_files ADD COLUMN half_done TEXT;
+                ALTER TABLE no_such_table ADD COLUMN other TEXT;
+            ''',
+            down_sql=''
+        )
+
+        self.assertFalse(self.migrator.execute_migration(broken))
+        self.assertNotIn('half_done', self.music_file_columns())
+        self.assertEqual(self.migrator.get_migration_status('900'), MigrationStatus.FAILED)
+
+
+class TestUpToDate(DatabaseMigratorTestCase):
+    """Test the persisted up-to-date check new processes start with."""
+
+    def fresh_migrator(self) -> DatabaseMigrator:
+        migrator = DatabaseMigrator(self.db_path)
+        self.addCleanup(migrator.close)
+        return migrator
+
+    def test_new_instance_skips_pending_query(self):
+        self.assertFalse(self.migrator.is_up_to_date())
+        self.assertTrue(self.migrator.migrate())
+
+        migrator = self.fresh_migrator()
+        self.assertTrue(migrator.is_up_to_date())
+        with patch.object(migrator, 'get_pending_migrations') as get_pending:
+            self.assertTrue(migrator.migrate())
+        get_pending.assert_not_called()
+
+    def test_rollback_seen_by_new_instance(self):
+        self.assertTrue(self.migrator.migrate())
+        self.assertTrue(self.migrator.rollback_migration(self.migrator.migrations[-1]))
+        self.assertFalse(self.fresh_migrator().is_up_to_date())
+
+    def test_run_migrations_backs_up_only_when_migrating(self):
+        def backups():
+            return [name for name in os.listdir(self.tmp_dir) if '.backup.' in name]
+
+        self.assertTrue(run_migrations(self.db_path))
+        self.assertEqual(len(backups()), 1)
+        self.assertTrue(run_migrations(self.db_path))
+        self.assertEqual(len(backups()), 1)
+
+
+class TestValidateSchema(DatabaseMigratorTestCase):
+    """Test schema validation and its schema_version-keyed cache."""
+
+    def test_missing_columns_sorted(self):
+        result = self.migrator.validate_schema()
+        self.assertFalse(result['is_valid'])
+        self.assertEqual(result['missing_required_columns'], ['cover_art', 'cover_art_extracted', 'rating'])
+
+    def test_schema_change_invalidates_cache(self):
+        self.assertFalse(self.migrator.validate_schema()['is_valid'])
+
+        # Changed behind the migrator's back, on another connection
+        with sqlite3.connect(self.db_path) as conn:
+            conn.executescript('''
+                ALTER TABLE music_files ADD COLUMN cover_art TEXT;
+                ALTER TABLE music_files ADD COLUMN cover_art_extracted INTEGER DEFAULT 0;
+                ALTER TABLE music_files ADD COLUMN rating INTEGER DEFAULT 0;
+            ''')
+        conn.close()
+
+        self.assertTrue(self.migrator.validate_schema()['is_valid'])
+
+
+class TestBackup(DatabaseMigratorTestCase):
+    """Test backing up and restoring through the SQLite backup API."""
+
+    def test_backup_and_restore(self):
+        backup_path = os.path.join(self.tmp_dir, 'backup.db')
+        self.assertTrue(self.migrator.backup_database(backup_path))
+
+        with self.migrator._cursor() as cursor:
+            cursor.execute('ALTER TABLE music_files ADD COLUMN rating INTEGER DEFAULT 0')
+        self.assertIn('rating', self.music_file_columns())
+
+        self.assertTrue(self.migrator.restore_database(backup_path))
+        self.assertNotIn('rating', self.music_file_columns())
+        # The migrator's own connection is still usable after the restore
+        self.assertTrue(self.migrator.validate_schema()['tables'])
+
+
+class TestTopoSort(unittest.TestCase):
+    """Test dependency ordering of migrations."""
+
+    @staticmethod
+    def migration(version: str, *dependencies: str) -> Migration:
+        return Migration(version=version, name=version, description='', up_sql='', down_sql='',
+                         dependencies=dependencies)
+
+    def test_version_order_without_dependencies(self):
+        ordered = _topo_sort([self.migration('010'), self.migration('002'), self.migration('001')])
+        self.assertEqual([m.version for m in ordered], ['001', '002', '010'])
+
+    def test_dependencies_run_first(self):
+        ordered = _topo_sort([
+            self.migration('001', '003'),
+            self.migration('002'),
+            self.migration('003'),
+        ])
+        self.assertEqual([m.version for m in ordered], ['002', '003', '001'])
+
+    def test_cycle_raises(self):
+        with self.assertRaises(ValueError):
+            _topo_sort([self.migration('001', '002'), self.migration('002', '001')])
+
+    def test_unknown_dependency_raises(self):
+        with self.assertRaises(ValueError):
+            _topo_sort([self.migration('001', '999')])
+
+
+if __name__ == '__main__':
+    unittest.main()
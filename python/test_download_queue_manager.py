@@ -0,0 +1,434 @@
+"""
+Download Queue Manager Test Suite
+=================================
+
+Unit tests for the priority download queue in download_queue_manager.py.
+"""
+
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from download_queue_manager import (
+    DownloadPriority,
+    DownloadQueueManager,
+    DownloadStatus,
+    DownloadTask,
+)
+
+
+def make_task(task_id: str, priority: DownloadPriority = DownloadPriority.NORMAL) -> DownloadTask:
+    return DownloadTask(id=task_id, url=f'https://example.com/{task_id}', title=task_id,
+                        artist='Artist', download_path='/tmp', priority=priority)
+
+
+class TestDownloadTask(unittest.TestCase):
+    """Test the task record itself."""
+
+    def test_slotted_with_defaults(self):
+        task = make_task('a')
+        self.assertFalse(hasattr(task, '__dict__'))
+        self.assertIs(task.status, DownloadStatus.PENDING)
+        self.assertIsNot(task.cancel_event, make_task('b').cancel_event)
+        with self.assertRaises(AttributeError):
+            task.unknown = True
+
+
+class DownloadQueueTestCase(unittest.TestCase):
+    """Base class with a manager whose downloads finish instantly."""
+
+    def setUp(self):
+        self.manager = DownloadQueueManager()
+        self.processed = []
+        self.done = threading.Event()
+        self.expected = 0
+
+        def process(task):
+            self.manager._set_status(task, DownloadStatus.COMPLETED)
+            self.processed.append(task.id)
+            if len(self.processed) >= self.expected:
+                self.done.set()
+
+        patcher = patch.object(self.manager, '_process_download', side_effect=process)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.manager.stop_worker)
+
+    def add_without_starting(self, *tasks: DownloadTask):
+        """Queue tasks before the worker runs, so their order is up to the queue."""
+        with patch.object(self.manager, 'start_worker'):
+            for task in tasks:
+                self.manager.add_task(task)
+
+    def run_until_processed(self, count: int):
+        self.expected = count
+        self.manager.start_worker()
+        self.assertTrue(self.done.wait(timeout=5))
+
+
+class TestScheduling(DownloadQueueTestCase):
+    """Test the order tasks are handed to the worker in."""
+
+    def test_higher_priority_first(self):
+        self.manager.update_max_concurrent_downloads(1)
+        self.add_without_starting(
+            make_task('low', DownloadPriority.LOW),
+            make_task('urgent', DownloadPriority.URGENT),
+            make_task('normal'),
+        )
+        self.run_until_processed(3)
+        self.assertEqual(self.processed, ['urgent', 'normal', 'low'])
+
+    def test_equal_priority_first_in_first_out(self):
+        self.manager.update_max_concurrent_downloads(1)
+        tasks = [make_task('c'), make_task('b'), make_task('a')]
+        for task in tasks:
+            task.created_at = 1.0
+        self.add_without_starting(*tasks)
+        self.run_until_processed(3)
+        self.assertEqual(self.processed, ['c', 'b', 'a'])
+
+    def test_batch_keeps_priority_order(self):
+        self.manager.update_max_concurrent_downloads(1)
+        with patch.object(self.manager, 'start_worker'):
+            self.assertTrue(self.manager.add_tasks([
+                make_task('low', DownloadPriority.LOW),
+                make_task('high', DownloadPriority.HIGH),
+            ]))
+        self.run_until_processed(2)
+        self.assertEqual(self.processed, ['high', 'low'])
+
+    def test_duplicate_id_rejected_while_pending(self):
+        first = make_task('a')
+        self.add_without_starting(first)
+        with patch.object(self.manager, 'start_worker'), self.assertLogs(level='WARNING'):
+            self.assertFalse(self.manager.add_task(make_task('a')))
+
+        self.assertIs(self.manager.get_task('a'), first)
+        self.assertEqual(len(self.manager._heap), 1)
+        self.run_until_processed(1)
+        self.assertEqual(self.processed, ['a'])
+
+    def test_duplicate_id_rejected_while_running(self):
+        manager = DownloadQueueManager()
+        first = make_task('a')
+        with patch.object(manager, 'start_worker'):
+            manager.add_task(first)
+        manager._set_status(first, DownloadStatus.DOWNLOADING)
+
+        with patch.object(manager, 'start_worker'), self.assertLogs(level='WARNING'):
+            self.assertFalse(manager.add_tasks([make_task('a'), make_task('b')]))
+        self.assertIs(manager.get_task('a'), first)
+        self.assertIsNotNone(manager.get_task('b'))
+
+        manager._set_status(first, DownloadStatus.COMPLETED)
+        stats = manager.get_queue_stats()
+        self.assertEqual((stats['downloading'], stats['completed'], stats['pending']), (0, 1, 1))
+
+    def test_cancelled_task_skipped(self):
+        self.add_without_starting(make_task('a'), make_task('b'))
+        self.manager.cancel_download('a')
+        self.run_until_processed(1)
+        self.assertEqual(self.processed, ['b'])
+
+    def test_requeued_id_runs_once_after_cancel_and_purge(self):
+        """A stale heap entry from a cancelled, purged task doesn't run its successor."""
+        self.manager.update_max_concurrent_downloads(1)
+        self.add_without_starting(make_task('x'), make_task('y'), make_task('z'))
+        self.manager.cancel_download('x')
+        self.manager.clear_completed_tasks()
+        self.add_without_starting(make_task('x'))
+
+        self.run_until_processed(3)
+        time.sleep(0.1)
+        self.assertEqual(self.processed, ['y', 'z', 'x'])
+
+    def test_idle_worker_wakes_for_new_task(self):
+        self.expected = 1
+        self.manager.start_worker()
+        self.manager.add_task(make_task('late'))
+        self.assertTrue(self.done.wait(timeout=5))
+        self.assertEqual(self.processed, ['late'])
+
+    def test_cancel_sets_event(self):
+        task = make_task('a')
+        self.add_without_starting(task)
+        self.assertTrue(self.manager.cancel_download('a'))
+        self.assertTrue(task.cancel_event.is_set())
+        self.assertIs(task.status, DownloadStatus.CANCELLED)
+
+    def test_cancelled_entries_compacted_out_of_heap(self):
+        self.add_without_starting(*(make_task(task_id) for task_id in 'abcd'))
+        self.manager.cancel_download('a')
+        self.manager.cancel_download('b')
+        self.assertEqual(len(self.manager._heap), 4)
+
+        self.manager.cancel_download('c')
+        self.assertEqual([entry[2].id for entry in self.manager._heap], ['d'])
+        self.run_until_processed(1)
+        self.assertEqual(self.processed, ['d'])
+
+    def test_stop_worker_wakes_idle_worker(self):
+        self.manager.start_worker()
+        self.manager.stop_worker()
+        self.assertFalse(self.manager._scheduler_thread.is_alive())
+
+
+class TestConcurrency(unittest.TestCase):
+    """Test the bounded pool downloads run on."""
+
+    def setUp(self):
+        self.manager = DownloadQueueManager(max_concurrent=2)
+        self.started = threading.Semaphore(0)
+        self.release = threading.Event()
+        self.running = []
+
+        def process(task):
+            self.running.append(task.id)
+            self.started.release()
+            self.release.wait(timeout=5)
+            self.manager._set_status(task, DownloadStatus.COMPLETED)
+
+        patcher = patch.object(self.manager, '_process_download', side_effect=process)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.manager.stop_worker)
+        self.addCleanup(self.release.set)
+
+    def wait_started(self, count: int):
+        for _ in range(count):
+            self.assertTrue(self.started.acquire(timeout=5))
+
+    def test_downloads_run_in_parallel_up_to_limit(self):
+        for task_id in 'abc':
+            self.manager.add_task(make_task(task_id))
+
+        self.wait_started(2)
+        self.assertFalse(self.started.acquire(timeout=0.2))
+        self.assertEqual(sorted(self.running), ['a', 'b'])
+
+        self.release.set()
+        self.wait_started(1)
+        self.assertEqual(self.running[-1], 'c')
+
+    def test_raising_limit_starts_waiting_tasks(self):
+        for task_id in 'abc':
+            self.manager.add_task(make_task(task_id))
+        self.wait_started(2)
+
+        self.manager.update_max_concurrent_downloads(3)
+        self.wait_started(1)
+        self.assertEqual(sorted(self.running), ['a', 'b', 'c'])
+
+
+class TestProcessDownload(unittest.TestCase):
+    """Test the download step itself."""
+
+    def test_cancel_stops_running_download(self):
+        manager = DownloadQueueManager()
+        task = make_task('a')
+        manager.add_progress_callback(lambda t: t.progress >= 10 and manager.cancel_download(t.id))
+
+        with patch.object(manager, 'start_worker'):
+            manager.add_task(task)
+        manager._process_download(task)
+
+        self.assertIs(task.status, DownloadStatus.CANCELLED)
+        self.assertEqual(task.progress, 10)
+
+    def test_cancel_after_last_check_stays_cancelled(self):
+        manager = DownloadQueueManager()
+        task = make_task('a')
+        manager.add_progress_callback(lambda t: t.progress >= 100 and manager.cancel_download(t.id))
+        completed = []
+        manager.add_completion_callback(completed.append)
+
+        with patch.object(manager, 'start_worker'):
+            manager.add_task(task)
+        manager._process_download(task)
+
+        self.assertIs(task.status, DownloadStatus.CANCELLED)
+        self.assertEqual(completed, [])
+
+    def test_cancel_wakes_download_immediately(self):
+        manager = DownloadQueueManager()
+        task = make_task('a')
+        notified = []
+
+        def cancel_on_second_notification(t):
+            # The first notification is the switch to DOWNLOADING, the
+            # second the 0% progress report just before the first wait
+            notified.append(t.progress)
+            if len(notified) == 2:
+                manager.cancel_download(t.id)
+
+        manager.add_progress_callback(cancel_on_second_notification)
+        with patch.object(manager, 'start_worker'):
+            manager.add_task(task)
+        started = time.monotonic()
+        manager._process_download(task)
+
+        # Without the wake-up this would sit out the whole 0.1s step
+        self.assertLess(time.monotonic() - started, 0.05)
+        self.assertIs(task.status, DownloadStatus.CANCELLED)
+
+
+class TestForgottenTasks(unittest.TestCase):
+    """Test status writes for tasks cleared out of the queue while running."""
+
+    def test_purged_running_task_stays_out_of_index(self):
+        manager = DownloadQueueManager()
+        task = make_task('a')
+        with patch.object(manager, 'start_worker'):
+            manager.add_task(task)
+
+        def purge_mid_download(t):
+            if t.progress >= 10 and manager.get_task(t.id):
+                manager.cancel_download(t.id)
+                manager.clear_completed_tasks()
+                t.cancel_event.clear()
+
+        manager.add_progress_callback(purge_mid_download)
+        manager._process_download(task)
+
+        self.assertIsNone(manager.get_task('a'))
+        self.assertEqual(manager.get_tasks_by_status(DownloadStatus.COMPLETED), [])
+        stats = manager.get_queue_stats()
+        self.assertEqual((stats['total'], stats['completed'], stats['downloading']), (0, 0, 0))
+
+
+class TestQueueStats(DownloadQueueTestCase):
+    """Test the status counts behind get_queue_stats."""
+
+    def assertStats(self, **expected):
+        stats = self.manager.get_queue_stats()
+        self.assertEqual({key: stats[key] for key in expected}, expected)
+
+    def test_counts_follow_status_changes(self):
+        self.add_without_starting(make_task('a'), make_task('b'), make_task('c'))
+        self.assertStats(total=3, pending=3, completed=0)
+
+        self.manager.cancel_download('c')
+        self.run_until_processed(2)
+        self.assertStats(total=3, pending=0, completed=2)
+
+        self.manager.clear_completed_tasks()
+        self.assertStats(total=0, pending=0, completed=0)
+
+    def test_retry_moves_failed_back_to_pending(self):
+        task = make_task('a')
+        self.add_without_starting(task)
+        self.manager._set_status(task, DownloadStatus.FAILED)
+        self.assertStats(pending=0, failed=1)
+
+        self.assertTrue(self.manager.retry_download('a'))
+        self.assertStats(pending=1, failed=0)
+
+        self.manager.clear_failed_downloads()
+        self.assertStats(total=1, pending=1)
+
+    def test_tasks_by_status_in_arrival_order(self):
+        tasks = [make_task('a'), make_task('b'), make_task('c')]
+        self.add_without_starting(*tasks)
+        self.manager._set_status(tasks[0], DownloadStatus.FAILED)
+        self.manager._set_status(tasks[2], DownloadStatus.FAILED)
+
+        self.assertEqual([t.id for t in self.manager.get_tasks_by_status(DownloadStatus.FAILED)], ['a', 'c'])
+        self.assertEqual([t.id for t in self.manager.get_tasks_by_status(DownloadStatus.PENDING)], ['b'])
+
+
+class TestTaskSnapshot(DownloadQueueTestCase):
+    """Test the read-only task snapshot behind get_task and get_all_tasks."""
+
+    def test_reads_do_not_wait_for_lock(self):
+        self.add_without_starting(make_task('a'))
+        results = []
+
+        with self.manager._lock:
+            reader = threading.Thread(target=lambda: results.append(self.manager.get_task('a')))
+            reader.start()
+            reader.join(timeout=5)
+
+        self.assertEqual([t.id for t in results], ['a'])
+
+    def test_batch_published_once(self):
+        with patch.object(self.manager, '_publish_tasks_locked',
+                          wraps=self.manager._publish_tasks_locked) as publish:
+            self.manager.add_tasks([make_task('a'), make_task('b'), make_task('c')])
+        publish.assert_called_once()
+        self.assertEqual(len(self.manager.get_all_tasks()), 3)
+
+    def test_snapshot_follows_membership_changes(self):
+        self.add_without_starting(make_task('a'), make_task('b'))
+        self.assertEqual([t.id for t in self.manager.get_all_tasks()], ['a', 'b'])
+
+        self.manager._set_status(self.manager.get_task('a'), DownloadStatus.COMPLETED)
+        self.manager.clear_completed_downloads()
+        self.assertIsNone(self.manager.get_task('a'))
+        self.assertEqual([t.id for t in self.manager.get_all_tasks()], ['b'])
+
+
+class TestCallbacks(unittest.TestCase):
+    """Test callback registration and event filtering."""
+
+    def setUp(self):
+        self.manager = DownloadQueueManager()
+        self.task = make_task('a')
+        self.calls = []
+
+    def notify(self, status: DownloadStatus):
+        self.task.status = status
+        self.manager._notify_callbacks(self.task)
+
+    def test_callbacks_only_see_their_events(self):
+        self.manager.add_progress_callback(lambda task: self.calls.append(('progress', task.status)))
+        self.manager.add_completion_callback(lambda task: self.calls.append(('complete', task.status)))
+        self.manager.add_error_callback(lambda task: self.calls.append(('error', task.status)))
+
+        self.notify(DownloadStatus.DOWNLOADING)
+        self.notify(DownloadStatus.COMPLETED)
+        self.assertEqual(self.calls, [('progress', DownloadStatus.DOWNLOADING),
+                                      ('complete', DownloadStatus.COMPLETED)])
+
+    def test_same_callback_registered_twice_fires_once(self):
+        def callback(task):
+            self.calls.append(task.status)
+
+        self.manager.add_progress_callback(callback)
+        self.manager.add_completion_callback(callback)
+
+        self.notify(DownloadStatus.DOWNLOADING)
+        self.notify(DownloadStatus.COMPLETED)
+        self.notify(DownloadStatus.FAILED)
+        self.assertEqual(self.calls, [DownloadStatus.DOWNLOADING, DownloadStatus.COMPLETED])
+
+    def test_progress_notifications_coalesced(self):
+        self.manager.add_progress_callback(lambda task: self.calls.append(task.progress))
+        self.task.status = DownloadStatus.DOWNLOADING
+
+        report_progress = self.manager._progress_reporter(self.task)
+        for tenth in range(0, 1001):
+            report_progress(tenth / 10)
+
+        self.assertEqual(self.calls, [float(p) for p in range(0, 101, 10)])
+        self.assertEqual(self.task.progress, 100.0)
+
+    def test_raising_callback_is_logged(self):
+        def broken(task):
+            raise RuntimeError('boom')
+
+        self.manager.add_callback(broken)
+        with self.assertLogs(level='ERROR') as logs:
+            self.notify(DownloadStatus.DOWNLOADING)
+        self.assertIn('boom', logs.output[0])
+
+    def test_unfiltered_callback_sees_everything(self):
+        self.manager.add_callback(lambda task: self.calls.append(task.status))
+        self.notify(DownloadStatus.DOWNLOADING)
+        self.notify(DownloadStatus.FAILED)
+        self.assertEqual(self.calls, [DownloadStatus.DOWNLOADING, DownloadStatus.FAILED])
+
+
+if __name__ == '__main__':
+    unittest.main()